@@ -4,19 +4,45 @@
  */
 
 const { ChromaClient } = require('chromadb');
+const fs = require('fs');
 const path = require('path');
 
+// Alias file written by scripts/embed.py: maps the collection name to its live version
+const COLLECTION_ALIAS_FILE = process.env.COLLECTION_ALIAS_FILE ||
+  path.join(__dirname, '..', '..', 'storage', 'index', 'collection-alias.json');
+
 // Cache for ChromaDB client and collection
 let chromaClient = null;
 let chromaCollection = null;
 let chromaInitialized = false;
 
+/**
+ * Resolve the live collection version for an alias (see services/collection_versions.py)
+ * Before the first versioned build there is no alias entry and the alias itself is the collection
+ */
+function resolveCollectionName(alias) {
+  try {
+    const entry = JSON.parse(fs.readFileSync(COLLECTION_ALIAS_FILE, 'utf-8'))[alias];
+    if (entry && entry.collection) {
+      return entry.collection;
+    }
+  } catch (error) {
+    if (error.code !== 'ENOENT') {
+      console.log(`⚠️  Could not read collection alias file ${COLLECTION_ALIAS_FILE}: ${error.message}`);
+    }
+  }
+  return alias;
+}
+
 /**
  * Initialize ChromaDB client using HTTP API
  * NOTE: Requires ChromaDB server to be running (python services/chromadb_api.py)
  */
 async function initializeChromaDB() {
-  if (chromaClient && chromaInitialized) {
+  const collectionName = resolveCollectionName(process.env.CHROMA_COLLECTION_NAME || 'asker_fotball_docs');
+  
+  // Reuse the cached collection until the alias is switched to a new version
+  if (chromaClient && chromaInitialized && chromaCollection.name === collectionName) {
     return { client: chromaClient, collection: chromaCollection };
   }
   
@@ -32,7 +58,6 @@ async function initializeChromaDB() {
     
     // Get the collection (should already exist from embed.py)
     const collections = await chromaClient.listCollections();
-    const collectionName = process.env.CHROMA_COLLECTION_NAME || 'asker_fotball_docs';
     
     chromaCollection = collections.find(c => c.name === collectionName);
     
@@ -118,6 +143,7 @@ async function searchVectorDB(query, limit = 5, apiKey = null) {
     
     // Format results
     const formattedResults = [];
+    const space = (chroma.collection.metadata || {})['hnsw:space'] || 'l2';
     
     if (results.ids && results.ids[0]) {
       for (let i = 0; i < results.ids[0].length; i++) {
@@ -125,8 +151,9 @@ async function searchVectorDB(query, limit = 5, apiKey = null) {
         const distance = results.distances[0][i];
         const document = results.documents[0][i];
         
-        // Convert distance to similarity score (lower distance = higher similarity)
-        const similarityScore = Math.max(0, 1 - distance);
+        // Convert distance to similarity score according to the collection's distance space
+        // (Chroma's l2 distance is squared, i.e. 2 - 2cos for normalized embeddings)
+        const similarityScore = Math.max(0, space === 'l2' ? 1 - distance / 2 : 1 - distance);
         
         formattedResults.push({
           id: results.ids[0][i],
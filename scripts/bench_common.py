@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Helpers shared by the benchmark scripts: reading query logs and golden
+sets, and nearest-rank percentiles of latency samples.
+"""
+
+import json
+
+def load_jsonl(path):
+    """Read a JSONL file, skipping blank lines; lines that are not JSON are kept as text."""
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                items.append(line)
+    return items
+
+def load_queries(path):
+    """Queries from a JSONL log (query/title field) or plain text lines."""
+    queries = []
+    for item in load_jsonl(path):
+        if isinstance(item, dict):
+            queries.append(item.get('query') or item.get('title'))
+        else:
+            queries.append(item)
+    return [q for q in queries if isinstance(q, str) and q.strip()]
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Compare the memory footprint of the compact ChunkStore with a list of dicts.
+The chunks in storage/chunks are replicated (with unique ids and text) up
+to each requested size, loaded both ways from JSONL lines, and measured
+with tracemalloc. Lookup and iteration speed are reported as well, and the
+results are written to storage/metrics/ as JSON.
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Search service modules
+sys.path.insert(0, str(Path(__file__).parent.parent / "services"))
+from chunk_store import ChunkStore
+
+CHUNKS_DIR = Path(__file__).parent.parent / "storage" / "chunks"
+METRICS_DIR = Path(__file__).parent.parent / "storage" / "metrics"
+
+def load_seed_chunks(chunks_dir):
+    """Read the real chunks used as templates."""
+    chunks = []
+    for jsonl_file in sorted(Path(chunks_dir).glob("*.jsonl")):
+        with open(jsonl_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    chunks.append(json.loads(line))
+    if not chunks:
+        raise FileNotFoundError(f"No chunks found in {chunks_dir}")
+    return chunks
+
+def synthetic_lines(seed_chunks, size):
+    """
+    JSONL lines for size chunks: copies of the seed chunks on numbered
+    copies of their pages, so titles/urls repeat per page as in a real crawl
+    and every chunk has its own id and text.
+    """
+    lines = []
+    copy = 0
+    while len(lines) < size:
+        for chunk in seed_chunks:
+            if len(lines) >= size:
+                break
+            page, n = chunk["chunk_id"].split("_chunk_")
+            item = dict(chunk)
+            item["chunk_id"] = f"{page}-{copy}_chunk_{n}"
+            item["url"] = f"{chunk.get('url', '')}?copy={copy}"
+            item["content"] = f"{chunk.get('content', '')} [{copy}]"
+            lines.append(json.dumps(item, ensure_ascii=False))
+        copy += 1
+    return lines
+
+def measure(build):
+    """Build a structure and return it with the bytes it retains and the build time."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    structure = build()
+    build_s = time.perf_counter() - started
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return structure, retained, build_s
+
+def time_lookups(lookup, ids, repeat):
+    """Microseconds per lookup by chunk id."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for chunk_id in ids:
+            lookup(chunk_id)
+    return (time.perf_counter() - started) * 1e6 / (repeat * len(ids))
+
+def benchmark(lines, lookups, repeat):
+    """Measure list-of-dicts and ChunkStore for one set of JSONL lines."""
+    ids = [json.loads(line)["chunk_id"] for line in lines[::max(1, len(lines) // lookups)]][:lookups]
+    
+    dicts, dict_bytes, dict_build_s = measure(lambda: [json.loads(line) for line in lines])
+    by_id = {chunk["chunk_id"]: chunk for chunk in dicts}
+    dict_lookup_us = time_lookups(lambda chunk_id: by_id[chunk_id]["content"], ids, repeat)
+    del dicts, by_id
+    
+    store, store_bytes, store_build_s = measure(lambda: ChunkStore.from_chunks(json.loads(line) for line in lines))
+    store_lookup_us = time_lookups(lambda chunk_id: store.text(store.row(chunk_id)), ids, repeat)
+    store_record_us = time_lookups(store.get_by_id, ids, repeat)
+    started = time.perf_counter()
+    for _ in store.documents():
+        pass
+    scan_ms = (time.perf_counter() - started) * 1000
+    
+    return {
+        "chunks": len(lines),
+        "text_bytes": sum(len(json.loads(line).get("content", "").encode("utf-8")) for line in lines),
+        "list_of_dicts": {
+            "bytes": dict_bytes,
+            "bytes_per_chunk": round(dict_bytes / len(lines), 1),
+            "build_s": round(dict_build_s, 3),
+            "lookup_us": round(dict_lookup_us, 3)
+        },
+        "chunk_store": {
+            "bytes": store_bytes,
+            "bytes_per_chunk": round(store_bytes / len(lines), 1),
+            "estimated_bytes": store.memory_bytes(),
+            "build_s": round(store_build_s, 3),
+            "lookup_us": round(store_lookup_us, 3),
+            "record_lookup_us": round(store_record_us, 3),
+            "text_scan_ms": round(scan_ms, 2)
+        },
+        "reduction": round(1 - store_bytes / dict_bytes, 4) if dict_bytes else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark: ChunkStore vs list of dicts")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated chunk counts")
+    parser.add_argument("--lookups", type=int, default=1000, help="Chunk ids looked up per size")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=str(METRICS_DIR / "chunk-store-memory.json"))
+    args = parser.parse_args()
+    
+    print("🧪 Chunk store memory benchmark")
+    print("=" * 70)
+    seed = load_seed_chunks(CHUNKS_DIR)
+    print(f"📁 {len(seed)} seed chunks from {CHUNKS_DIR}\n")
+    
+    results = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        print(f"📊 {size} chunks...")
+        results.append(benchmark(synthetic_lines(seed, size), args.lookups, args.repeat))
+    
+    print(f"\n{'chunks':>8}{'dicts MB':>10}{'store MB':>10}{'saved':>8}{'dict µs':>9}{'store µs':>10}{'record µs':>11}")
+    for r in results:
+        d, s = r["list_of_dicts"], r["chunk_store"]
+        print(f"{r['chunks']:>8}{d['bytes'] / 1e6:>10.1f}{s['bytes'] / 1e6:>10.1f}{r['reduction']:>8.0%}"
+              f"{d['lookup_us']:>9.2f}{s['lookup_us']:>10.2f}{s['record_lookup_us']:>11.2f}")
+    
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "seed_chunks": len(seed),
+        "lookups": args.lookups,
+        "repeat": args.repeat,
+        "results": results
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Report written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Load-test and retrieval benchmark for the Asker Fotball search service.
+Replays a query log against the in-process ChromaDBSearchService or the
+HTTP API at one or more concurrency levels, and reports latency
+percentiles, throughput, memory and retrieval quality (recall@k and MRR
+against a golden set). Results are written to storage/metrics/ as JSON.
+
+Use --offline to run without network, model downloads or Chroma: chunks
+are embedded with the stub provider into an in-memory NumPy index.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import statistics
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
+
+# Search service modules
+sys.path.insert(0, str(Path(__file__).parent.parent / "services"))
+from chromadb_service import ChromaDBSearchService, CHUNKS_DIR, SEARCH_ERRORS, get_chromadb_service
+from embedding_providers import StubEmbeddingProvider
+from vector_backends import NumpyVectorBackend
+
+# Shared benchmark helpers (scripts/bench_common.py)
+from bench_common import load_jsonl, load_queries, percentile
+
+METRICS_DIR = Path(__file__).parent.parent / "storage" / "metrics"
+GOLDEN_FILE = Path(__file__).parent.parent / "config" / "search-golden.jsonl"
+
+def memory_usage(pid=None):
+    """Current and peak resident set size in MB (from /proc, else getrusage)."""
+    status = Path(f"/proc/{pid or 'self'}/status")
+    if status.exists():
+        fields = {}
+        for line in status.read_text().splitlines():
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "VmHWM"):
+                fields[key] = round(int(value.split()[0]) / 1024, 1)
+        return {"rss_mb": fields.get("VmRSS"), "peak_rss_mb": fields.get("VmHWM")}
+    if pid:
+        return {"rss_mb": None, "peak_rss_mb": None}
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return {"rss_mb": None, "peak_rss_mb": round(peak_mb, 1)}
+
+class ServiceTarget:
+    """Calls ChromaDBSearchService.search in this process."""
+    
+    name = "service"
+    
+    def __init__(self, service, rerank=None):
+        self.service = service
+        self.rerank = rerank
+    
+    def search(self, query, k, mode):
+        return self.service.search(query, max_results=k, mode=mode, rerank=self.rerank)
+    
+    def reset(self):
+        # Each concurrency level starts with cold query and result caches
+        self.service.query_cache.clear()
+        self.service.result_cache.clear()
+    
+    def failures(self, mode):
+        # search() logs failures and returns [], so they only show up in the error counter
+        return SEARCH_ERRORS[mode].value
+    
+    def stats(self):
+        return {"query_cache": self.service.query_cache.stats(),
+                "result_cache": self.service.result_cache.stats()}
+
+class HttpTarget:
+    """Calls POST /search on a running API server."""
+    
+    name = "http"
+    
+    def __init__(self, url, timeout, rerank=None):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.rerank = rerank
+    
+    def search(self, query, k, mode):
+        payload = {"query": query, "max_results": k, "mode": mode}
+        if self.rerank is not None:
+            payload["rerank"] = self.rerank
+        body = json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.url}/search", data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())['results']
+    
+    def reset(self):
+        pass
+    
+    def failures(self, mode):
+        # Failed requests raise (HTTP error status or timeout) and are counted by run_load
+        return 0
+    
+    def stats(self):
+        try:
+            with urllib.request.urlopen(f"{self.url}/stats", timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, ValueError):
+            return {}
+
+def run_load(target, queries, k, mode, concurrency, repeat):
+    """Replay queries repeat times with a closed loop of concurrency workers."""
+    workload = queries * repeat
+    
+    def timed(query):
+        started = time.perf_counter()
+        try:
+            target.search(query, k, mode)
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - started) * 1000, ok
+    
+    target.reset()
+    failures_before = target.failures(mode)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, workload))
+    wall = time.perf_counter() - started
+    swallowed = int(target.failures(mode) - failures_before)
+    
+    latencies = [ms for ms, ok in outcomes if ok]
+    summary = {
+        "concurrency": concurrency,
+        "requests": len(workload),
+        "errors": sum(1 for _, ok in outcomes if not ok) + swallowed,
+        "wall_s": round(wall, 3),
+        "qps": round(len(workload) / wall, 2) if wall else 0.0
+    }
+    if latencies:
+        summary.update({
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "max_ms": round(max(latencies), 3)
+        })
+    return summary
+
+def result_key(result, field):
+    """Identifier of a search result used to match golden labels."""
+    if field == "chunk_id":
+        return result.get('chunk_id')
+    return (result.get('metadata') or {}).get(field)
+
+def evaluate(target, golden, k, mode):
+    """Recall@k and MRR of the target against golden relevance labels."""
+    per_query = []
+    for item in golden:
+        if item.get('relevant_ids'):
+            field, relevant = "chunk_id", set(item['relevant_ids'])
+        else:
+            field, relevant = "url", set(item.get('relevant_urls', []))
+        if not relevant:
+            continue
+        
+        try:
+            results = target.search(item['query'], k, mode)
+        except Exception:
+            results = []
+        ranked = [result_key(r, field) for r in results[:k]]
+        
+        found = relevant & set(ranked)
+        first_hit = next((rank for rank, key in enumerate(ranked, 1) if key in relevant), None)
+        per_query.append({
+            "query": item['query'],
+            "recall": round(len(found) / len(relevant), 4),
+            "reciprocal_rank": round(1.0 / first_hit, 4) if first_hit else 0.0,
+            "first_hit_rank": first_hit
+        })
+    
+    if not per_query:
+        return {"golden_queries": 0}
+    return {
+        "golden_queries": len(per_query),
+        "k": k,
+        "recall_at_k": round(statistics.mean(q['recall'] for q in per_query), 4),
+        "mrr": round(statistics.mean(q['reciprocal_rank'] for q in per_query), 4),
+        "per_query": per_query
+    }
+
+def build_target(args):
+    """Create the search target and report how long setup took."""
+    if args.target == "http":
+        return HttpTarget(args.url, args.timeout, args.rerank), {}
+    
+    started = time.perf_counter()
+    if args.offline:
+        provider = StubEmbeddingProvider()
+        collection = NumpyVectorBackend.from_chunks_dir(CHUNKS_DIR, provider)
+        service = ChromaDBSearchService(collection=collection, embedding_provider=provider)
+    else:
+        service = get_chromadb_service()
+    service.wait_for_warmup()
+    setup = {
+        "setup_s": round(time.perf_counter() - started, 3),
+        "startup": service.startup.report(),
+        "embedding_provider": getattr(service.embedding_provider, "model_name", "")
+    }
+    return ServiceTarget(service, args.rerank), setup
+
+def compare(report, baseline_path):
+    """Print the change of key numbers against an earlier report."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    
+    print(f"\n📈 Compared with {baseline_path} ({baseline.get('created_at', '?')}):")
+    previous = {level['concurrency']: level for level in baseline.get('load', [])}
+    for level in report['load']:
+        before = previous.get(level['concurrency'])
+        if not before or 'p95_ms' not in before or 'p95_ms' not in level:
+            continue
+        print(f"  c={level['concurrency']:<3} p95 {before['p95_ms']:.2f} → {level['p95_ms']:.2f} ms, "
+              f"QPS {before['qps']:.1f} → {level['qps']:.1f}")
+    old_quality, new_quality = baseline.get('quality', {}), report['quality']
+    if 'recall_at_k' in old_quality and 'recall_at_k' in new_quality:
+        print(f"  recall@k {old_quality['recall_at_k']:.3f} → {new_quality['recall_at_k']:.3f}, "
+              f"MRR {old_quality['mrr']:.3f} → {new_quality['mrr']:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark latency, throughput and retrieval quality of the search service")
+    parser.add_argument("--target", choices=["service", "http"], default="service",
+                        help="Search in this process or through the HTTP API")
+    parser.add_argument("--url", default="http://localhost:5001", help="API base URL for --target http")
+    parser.add_argument("--timeout", type=float, default=30.0, help="HTTP timeout in seconds")
+    parser.add_argument("--pid", type=int, help="API server process id, to report its memory with --target http")
+    parser.add_argument("--queries", help="Query log to replay: JSONL (query/title field) or text lines "
+                                          "(default: golden set queries)")
+    parser.add_argument("--golden", default=str(GOLDEN_FILE),
+                        help="JSONL golden set with query and relevant_urls or relevant_ids")
+    parser.add_argument("--mode", choices=["vector", "bm25", "hybrid"], default="vector")
+    parser.add_argument("--rerank", action="store_true", default=None,
+                        help="Re-rank with the cross-encoder (default: the service's RERANK_DEFAULT)")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the query log per level")
+    parser.add_argument("--offline", action="store_true",
+                        help="Stub embeddings and an in-memory NumPy index; no network or Chroma needed")
+    parser.add_argument("--label", default="", help="Free-text label stored with the results")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--output", help="Report path (default: storage/metrics/search-benchmark-<timestamp>.json)")
+    args = parser.parse_args()
+    
+    if args.offline and args.target == "http":
+        parser.error("--offline only applies to --target service")
+    
+    print("🧪 Search service benchmark")
+    print("=" * 70)
+    
+    memory_before = memory_usage()
+    target, setup = build_target(args)
+    memory_loaded = memory_usage()
+    if setup:
+        print(f"⏱️  Setup: {setup['setup_s']:.2f} s ({setup['embedding_provider']})")
+    
+    golden = [g for g in load_jsonl(args.golden) if isinstance(g, dict)] if Path(args.golden).exists() else []
+    queries = load_queries(args.queries) if args.queries else [g['query'] for g in golden]
+    if not queries:
+        parser.error("No queries to replay; pass --queries or a golden set")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    print(f"🔍 {len(queries)} queries × {args.repeat}, mode={args.mode}, k={args.k}, target={target.name}\n")
+    
+    load = []
+    print(f"{'conc':>5}{'QPS':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for concurrency in levels:
+        summary = run_load(target, queries, args.k, args.mode, concurrency, args.repeat)
+        load.append(summary)
+        print(f"{concurrency:>5}{summary['qps']:>10.1f}{summary.get('p50_ms', 0):>10.2f}"
+              f"{summary.get('p95_ms', 0):>10.2f}{summary.get('p99_ms', 0):>10.2f}{summary['errors']:>8}")
+    
+    quality = evaluate(target, golden, args.k, args.mode)
+    if quality.get('golden_queries'):
+        print(f"\n🎯 recall@{args.k}: {quality['recall_at_k']:.3f}, MRR: {quality['mrr']:.3f} "
+              f"({quality['golden_queries']} golden queries)")
+    
+    memory = {"client_before_setup": memory_before, "client_after_setup": memory_loaded,
+              "client_end": memory_usage()}
+    if args.pid:
+        memory["server"] = memory_usage(args.pid)
+    
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "label": args.label,
+        "target": target.name,
+        "url": args.url if args.target == "http" else None,
+        "offline": args.offline,
+        "mode": args.mode,
+        "rerank": args.rerank,
+        "k": args.k,
+        "queries": len(queries),
+        "repeat": args.repeat,
+        "cpu_count": os.cpu_count(),
+        "setup": setup,
+        "load": load,
+        "quality": quality,
+        "memory": memory,
+        "target_stats": target.stats()
+    }
+    
+    output = Path(args.output) if args.output else \
+        METRICS_DIR / f"search-benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Report written to {output}")
+    
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Compare vector backends for the Asker Fotball search service.
+Measures query latency of Chroma, the exact NumPy backend and optional
+quantized NumPy backends, and reports recall@k and vector memory using
+exact search as ground truth.
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+
+import chromadb
+from chromadb.config import Settings
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
+
+# Search service modules
+sys.path.insert(0, str(Path(__file__).parent.parent / "services"))
+from embedding_providers import get_embedding_provider, with_embedding_store
+from vector_backends import NumpyVectorBackend, QuantizedVectorBackend
+from chromadb_service import CHROMA_DIR, COLLECTION_NAME
+from collection_versions import resolve_collection_name
+
+# Shared benchmark helpers (scripts/bench_common.py)
+from bench_common import load_queries, percentile
+
+METRICS_DIR = Path(__file__).parent.parent / "storage" / "metrics"
+
+DEFAULT_QUERIES = [
+    'OBOS akademi pris',
+    'Hvem er treneren for G15',
+    'Når spiller A-laget',
+    'Føyka stadion adresse',
+    'Asker fotball historie',
+    'Sesongkort billetter',
+    'Kontakt klubben',
+    'Resultater A-laget'
+]
+
+def time_queries(backend, embeddings, k, repeat):
+    """Time single-query calls; returns latencies in ms and the last result ids."""
+    latencies = []
+    ids = []
+    for _ in range(repeat):
+        ids = []
+        for embedding in embeddings:
+            started = time.perf_counter()
+            result = backend.query(query_embeddings=[embedding], n_results=k,
+                                   include=["documents", "metadatas", "distances"])
+            latencies.append((time.perf_counter() - started) * 1000)
+            ids.append(result["ids"][0])
+    return latencies, ids
+
+def recall_at_k(result_ids, truth_ids, k):
+    """Mean fraction of the exact top-k found in each result list."""
+    scores = []
+    for found, truth in zip(result_ids, truth_ids):
+        truth = set(truth[:k])
+        if truth:
+            scores.append(len(truth & set(found[:k])) / len(truth))
+    return sum(scores) / len(scores) if scores else 0.0
+
+def summarize(name, latencies, recall, extra=None):
+    summary = {
+        "backend": name,
+        "queries": len(latencies),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "recall_at_k": round(recall, 4)
+    }
+    summary.update(extra or {})
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Chroma and NumPy vector backends")
+    parser.add_argument("--queries", help="JSONL or text file with queries")
+    parser.add_argument("-k", type=int, default=5, help="Results per query")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions per query")
+    parser.add_argument("--quantization", default="int8,binary",
+                        help="Comma-separated quantized modes to compare (int8, binary; empty to skip)")
+    parser.add_argument("--rescore-factor", type=int, default=4,
+                        help="Candidates re-scored in full precision per result")
+    parser.add_argument("--output", default=str(METRICS_DIR / "vector-backends.json"))
+    args = parser.parse_args()
+    
+    print("🧪 Vector backend comparison")
+    print("=" * 70)
+    
+    client = chromadb.PersistentClient(path=str(CHROMA_DIR), settings=Settings(anonymized_telemetry=False))
+    collection = client.get_collection(resolve_collection_name(COLLECTION_NAME))
+    exact = NumpyVectorBackend.from_collection(collection)
+    print(f"📁 Collection: {collection.name} ({collection.count()} vectors)")
+    
+    queries = load_queries(args.queries) if args.queries else DEFAULT_QUERIES
+    provider = with_embedding_store(get_embedding_provider())
+    embeddings = provider.embed(queries)
+    print(f"🔍 Queries: {len(queries)}, k={args.k}, repeat={args.repeat}\n")
+    
+    # Ground truth from exact search
+    exact_latencies, truth = time_queries(exact, embeddings, args.k, args.repeat)
+    chroma_latencies, chroma_ids = time_queries(collection, embeddings, args.k, args.repeat)
+    
+    # Batched exact search: one matmul for all queries
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        exact.query(query_embeddings=embeddings, n_results=args.k)
+    batch_ms = (time.perf_counter() - started) * 1000 / (args.repeat * len(queries))
+    
+    results = [
+        summarize("chroma", chroma_latencies, recall_at_k(chroma_ids, truth, args.k)),
+        summarize("numpy", exact_latencies, 1.0, {
+            "batched_ms_per_query": round(batch_ms, 4),
+            "vector_bytes": exact.memory_bytes()
+        })
+    ]
+    
+    # Quantized variants share the exact matrix for re-scoring
+    for mode in [m.strip() for m in args.quantization.split(",") if m.strip()]:
+        quantized = QuantizedVectorBackend.from_backend(exact, mode=mode, rescore_factor=args.rescore_factor)
+        latencies, ids = time_queries(quantized, embeddings, args.k, args.repeat)
+        memory = quantized.memory_report()
+        results.append(summarize(f"numpy-{mode}", latencies, recall_at_k(ids, truth, args.k), {
+            "rescore_factor": args.rescore_factor,
+            "vector_bytes": memory["resident_bytes"],
+            "code_bytes": memory["code_bytes"],
+            "bytes_saved": memory["bytes_saved"],
+            "compression_ratio": memory["compression_ratio"]
+        }))
+    
+    print(f"{'backend':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'recall@k':>10}")
+    for r in results:
+        print(f"{r['backend']:<16}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['recall_at_k']:>10.3f}")
+    
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "collection": COLLECTION_NAME,
+        "vectors": collection.count(),
+        "k": args.k,
+        "repeat": args.repeat,
+        "queries": len(queries),
+        "results": results
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Report written to {output}")
+
+if __name__ == "__main__":
+    main()
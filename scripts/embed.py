@@ -5,8 +5,15 @@ Reads chunks from storage/chunks/*.jsonl and stores embeddings in ChromaDB.
 """
 
 import os
+import sys
 import json
 import glob
+import time
+import queue
+import logging
+import argparse
+import threading
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -20,107 +27,97 @@ except ImportError:
     print("❌ ChromaDB not installed. Run: pip install chromadb")
     exit(1)
 
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    print("⚠️  sentence-transformers not available. Install with: pip install sentence-transformers")
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Embedding providers are shared with the search service
+sys.path.insert(0, str(Path(__file__).parent.parent / "services"))
+from embedding_providers import get_embedding_provider, with_embedding_store
+from vector_backends import NumpyVectorBackend, QuantizedVectorBackend, NUMPY_SNAPSHOT_DIR, VECTOR_QUANTIZATION
+from collection_versions import (
+    versioned_name, resolve_collection_name, resolve_collection_version, write_alias, collect_garbage,
+    COLLECTION_KEEP_VERSIONS
+)
+from index_config import hnsw_metadata, index_settings_differ
+from chunk_fields import chunk_metadata
+from near_duplicates import find_near_duplicates, DEDUP_ENABLED, DEDUP_THRESHOLD
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    print("⚠️  OpenAI not available. Install with: pip install openai")
-    OPENAI_AVAILABLE = False
+# Provider modules report progress through logging
+logging.basicConfig(level=logging.INFO, format="%(message)s")
 
 # Configuration
 CHUNKS_DIR = Path(__file__).parent.parent / "storage" / "chunks"
 CHROMA_DIR = Path(__file__).parent.parent / "storage" / "index" / "chroma"
-EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "local")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
 COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "asker_fotball_docs")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_QUEUE_SIZE = int(os.getenv("EMBED_QUEUE_SIZE", "4"))
+SMOKE_QUERY = "Asker Fotball"
+DEDUP_REPORT = Path(__file__).parent.parent / "storage" / "metrics" / "dedup-report.json"
 
-class EmbeddingProvider:
-    """Base class for embedding providers."""
-    
-    def embed(self, texts):
-        """Generate embeddings for a list of texts."""
-        raise NotImplementedError
-
-class LocalEmbeddingProvider(EmbeddingProvider):
-    """Local embedding provider using sentence-transformers."""
-    
-    def __init__(self):
-        if not SENTENCE_TRANSFORMERS_AVAILABLE:
-            raise ImportError("sentence-transformers not available")
-        
-        print("🔄 Loading local embedding model...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        print("✅ Local embedding model loaded")
-    
-    def embed(self, texts):
-        """Generate embeddings using sentence-transformers."""
-        return self.model.encode(texts).tolist()
-
-class OpenAIEmbeddingProvider(EmbeddingProvider):
-    """OpenAI embedding provider."""
-    
-    def __init__(self, api_key, model="text-embedding-3-small"):
-        if not OPENAI_AVAILABLE:
-            raise ImportError("OpenAI library not available")
-        
-        if not api_key or api_key == "your_openai_api_key_here":
-            raise ValueError("OpenAI API key not set")
-        
-        self.client = openai.OpenAI(api_key=api_key)
-        self.model = model
-        print(f"✅ OpenAI client initialized with model: {model}")
-    
-    def embed(self, texts):
-        """Generate embeddings using OpenAI API."""
-        response = self.client.embeddings.create(
-            model=self.model,
-            input=texts
-        )
-        return [data.embedding for data in response.data]
-
-def get_embedding_provider():
-    """Get the appropriate embedding provider based on configuration."""
-    if EMBEDDING_PROVIDER == "openai":
-        try:
-            return OpenAIEmbeddingProvider(OPENAI_API_KEY, OPENAI_MODEL)
-        except (ImportError, ValueError) as e:
-            print(f"⚠️  OpenAI provider failed: {e}")
-            print("🔄 Falling back to local embeddings...")
-            return LocalEmbeddingProvider()
-    else:
-        return LocalEmbeddingProvider()
-
-def read_all_chunks():
-    """Read all chunks from JSONL files."""
+def list_chunk_files():
+    """List the JSONL chunk files to ingest."""
     if not CHUNKS_DIR.exists():
         raise FileNotFoundError(f"Chunks directory not found: {CHUNKS_DIR}")
     
-    jsonl_files = list(CHUNKS_DIR.glob("*.jsonl"))
+    jsonl_files = sorted(CHUNKS_DIR.glob("*.jsonl"))
     if not jsonl_files:
         raise FileNotFoundError(f"No JSONL files found in {CHUNKS_DIR}")
     
-    chunks = []
-    for jsonl_file in jsonl_files:
-        print(f"📖 Reading {jsonl_file.name}...")
+    return jsonl_files
+
+def iter_chunks(verbose=True):
+    """Yield chunks one at a time from the JSONL files."""
+    for jsonl_file in list_chunk_files():
+        if verbose:
+            print(f"📖 Reading {jsonl_file.name}...")
         with open(jsonl_file, 'r', encoding='utf-8') as f:
             for line in f:
                 line = line.strip()
                 if line:
                     try:
-                        chunk = json.loads(line)
-                        chunks.append(chunk)
+                        yield json.loads(line)
                     except json.JSONDecodeError as e:
                         print(f"⚠️  Error parsing line in {jsonl_file}: {e}")
+
+def deduplicate_chunks(threshold=DEDUP_THRESHOLD):
+    """
+    Find near-duplicate chunks in a first pass over the files and write the report.
+    
+    Returns the DedupResult; representatives are embedded with their
+    duplicates recorded in the metadata, duplicates are not embedded.
+    """
+    started = time.monotonic()
+    result = find_near_duplicates(iter_chunks(verbose=False), threshold=threshold)
+    report = result.report()
+    report["created_at"] = datetime.now().isoformat()
+    report["seconds"] = round(time.monotonic() - started, 2)
+    DEDUP_REPORT.parent.mkdir(parents=True, exist_ok=True)
+    with open(DEDUP_REPORT, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
     
-    return chunks
+    print(f"🧬 Near-duplicates (Jaccard ≥ {threshold}): {report['collapsed']} of {report['chunks']} chunks "
+          f"collapsed into {report['groups']} groups in {report['seconds']:.1f}s")
+    for group in report["duplicate_groups"][:5]:
+        print(f"   {group['chunk_id']} ← {', '.join(d['chunk_id'] for d in group['duplicates'][:3])}"
+              f"{' …' if len(group['duplicates']) > 3 else ''}")
+    print(f"📝 Dedup report written to: {DEDUP_REPORT}")
+    return result
+
+def representative_chunks(chunks, dedup):
+    """Drop duplicate chunks and attach each representative's duplicates."""
+    for chunk in chunks:
+        if dedup.is_alias(chunk["chunk_id"]):
+            continue
+        duplicates = dedup.aliases_for(chunk["chunk_id"])
+        yield {**chunk, "duplicates": duplicates} if duplicates else chunk
+
+def iter_batches(items, batch_size):
+    """Group an iterable into lists of at most batch_size items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 def setup_chroma_client():
     """Setup ChromaDB client."""
@@ -138,97 +135,365 @@ def setup_chroma_client():
     
     return client
 
+def collection_metadata(embedding_provider):
+    """Collection-level metadata recording which model produced the vectors and the index settings."""
+    return {
+        "description": "Asker Fotball documentation chunks",
+        "embedding_model": getattr(embedding_provider, "model_name", embedding_provider.__class__.__name__),
+        **hnsw_metadata()
+    }
+
+class IngestPipeline:
+    """
+    Streaming ingestion: read → encode → write.
+    
+    Chunks are encoded in fixed-size batches on the calling thread while a
+    writer thread adds the previous batches to Chroma. A bounded queue between
+    the two keeps at most queue_size encoded batches in memory.
+    """
+    
+    _DONE = object()
+    
+    def __init__(self, collection, embedding_provider, method="add",
+                 batch_size=EMBED_BATCH_SIZE, queue_size=EMBED_QUEUE_SIZE):
+        self.collection = collection
+        self.embedding_provider = embedding_provider
+        self.write = getattr(collection, method)
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.batches = 0
+        self.encode_seconds = 0.0
+        self.write_seconds = 0.0
+        self._error = None
+        self._started_at = None
+    
+    def run(self, chunks):
+        """Ingest an iterable of (chunk, metadata) pairs; returns chunks written."""
+        self._started_at = time.monotonic()
+        writer = threading.Thread(target=self._write_loop, name="chroma-writer", daemon=True)
+        writer.start()
+        
+        try:
+            for batch in iter_batches(chunks, self.batch_size):
+                if self._error:
+                    break
+                
+                texts = [chunk["content"] for chunk, _ in batch]
+                started = time.monotonic()
+                embeddings = self.embedding_provider.embed(texts)
+                self.encode_seconds += time.monotonic() - started
+                
+                self._put((
+                    [chunk["chunk_id"] for chunk, _ in batch],
+                    embeddings,
+                    [metadata for _, metadata in batch],
+                    texts
+                ))
+        finally:
+            self._put(self._DONE)
+            writer.join()
+        
+        if self._error:
+            raise self._error
+        
+        elapsed = time.monotonic() - self._started_at
+        rate = self.written / elapsed if elapsed > 0 else 0.0
+        print(f"📈 Ingested {self.written} chunks in {elapsed:.1f}s ({rate:.1f} chunks/s; "
+              f"encode {self.encode_seconds:.1f}s, write {self.write_seconds:.1f}s)")
+        return self.written
+    
+    def _put(self, item):
+        """Queue an item for the writer, giving up if the writer has died."""
+        while True:
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if self._error:
+                    return
+    
+    def _write_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is self._DONE:
+                return
+            if self._error:
+                continue
+            
+            ids, embeddings, metadatas, texts = item
+            try:
+                started = time.monotonic()
+                self.write(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=texts)
+                self.write_seconds += time.monotonic() - started
+            except Exception as e:
+                self._error = e
+                continue
+            
+            self.written += len(ids)
+            self.batches += 1
+            elapsed = time.monotonic() - self._started_at
+            rate = self.written / elapsed if elapsed > 0 else 0.0
+            print(f"✅ Wrote batch {self.batches} ({self.written} chunks, {rate:.1f} chunks/s, "
+                  f"queue {self.queue.qsize()}/{self.queue.maxsize})")
+
 def store_embeddings_in_chroma(chunks, embedding_provider, client):
-    """Store embeddings in ChromaDB."""
-    collection_name = COLLECTION_NAME
+    """
+    Build a new collection version from an iterable of chunks.
     
-    # Delete existing collection if it exists
-    try:
-        client.delete_collection(collection_name)
-        print(f"🗑️  Deleted existing collection: {collection_name}")
-    except Exception:
-        # Collection might not exist, that's okay
-        pass
+    The live collection is left untouched; publish_collection() switches the
+    alias over once the new version has passed its smoke check.
+    """
+    collection_name = versioned_name(COLLECTION_NAME)
     
     # Create new collection
-    print(f"📁 Creating collection: {collection_name}")
+    metadata = collection_metadata(embedding_provider)
+    print(f"📁 Creating collection: {collection_name} (space {metadata['hnsw:space']}, M {metadata['hnsw:M']}, "
+          f"construction_ef {metadata['hnsw:construction_ef']}, search_ef {metadata['hnsw:search_ef']})")
     collection = client.create_collection(
         name=collection_name,
-        metadata={"description": "Asker Fotball documentation chunks"}
+        metadata=metadata
     )
     
-    # Prepare data
-    texts = [chunk["content"] for chunk in chunks]
-    ids = [chunk["chunk_id"] for chunk in chunks]
-    metadatas = []
-    
-    for chunk in chunks:
-        metadata = {
-            "title": chunk["title"],
-            "url": chunk["url"],
-            "breadcrumbs": json.dumps(chunk["breadcrumbs"]),
-            "idx": chunk["idx"],
-            "total_chunks": chunk["total_chunks"],
-            "original_word_count": chunk["original_word_count"],
-            "chunk_word_count": chunk["chunk_word_count"],
-            "source_file": chunk["chunk_id"].split("_chunk_")[0]
-        }
-        metadatas.append(metadata)
-    
-    # Generate embeddings
-    print(f"🔄 Generating embeddings for {len(texts)} chunks...")
-    embeddings = embedding_provider.embed(texts)
-    
-    # Add to collection in batches
-    batch_size = 100
-    for i in range(0, len(ids), batch_size):
-        batch_ids = ids[i:i + batch_size]
-        batch_embeddings = embeddings[i:i + batch_size]
-        batch_metadatas = metadatas[i:i + batch_size]
-        batch_texts = texts[i:i + batch_size]
-        
-        collection.add(
-            ids=batch_ids,
-            embeddings=batch_embeddings,
-            metadatas=batch_metadatas,
-            documents=batch_texts
-        )
-        
-        batch_num = (i // batch_size) + 1
-        total_batches = (len(ids) + batch_size - 1) // batch_size
-        print(f"✅ Added batch {batch_num}/{total_batches}")
+    # Stream chunks through encode and write
+    pipeline = IngestPipeline(collection, embedding_provider)
+    pipeline.run((chunk, chunk_metadata(chunk)) for chunk in chunks)
     
     return collection
 
+def update_embeddings_in_chroma(chunks, embedding_provider, client):
+    """
+    Incrementally sync ChromaDB with an iterable of chunks.
+    
+    Only chunks whose content hash changed (or that are new) are embedded and
+    upserted; chunk_ids no longer present in storage/chunks are deleted.
+    Falls back to a full rebuild when the collection is missing or was built
+    with a different embedding model or HNSW index settings.
+    
+    Returns the collection and whether anything was written to it.
+    """
+    expected = collection_metadata(embedding_provider)
+    expected_model = expected["embedding_model"]
+    live_name = resolve_collection_name(COLLECTION_NAME)
+    try:
+        collection = client.get_collection(live_name)
+    except Exception:
+        print(f"📁 Collection {live_name} not found, running full rebuild")
+        return store_embeddings_in_chroma(chunks, embedding_provider, client), True
+    
+    built_with = (collection.metadata or {}).get("embedding_model")
+    if built_with != expected_model:
+        print(f"🔄 Collection was built with {built_with}, not {expected_model}; running full rebuild")
+        return store_embeddings_in_chroma(chunks, embedding_provider, client), True
+    
+    if index_settings_differ(collection.metadata, expected):
+        built_space = (collection.metadata or {}).get("hnsw:space", "l2")
+        print(f"🔄 Collection was built with other index settings (space {built_space}) than configured "
+              f"(space {expected['hnsw:space']}, M {expected['hnsw:M']}, "
+              f"construction_ef {expected['hnsw:construction_ef']}); running full rebuild")
+        return store_embeddings_in_chroma(chunks, embedding_provider, client), True
+    
+    # Hashes currently stored in the collection
+    existing = collection.get(include=["metadatas"])
+    stored_hashes = {
+        chunk_id: (metadata or {}).get("content_hash")
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+    }
+    
+    # Stream new and changed chunks through the pipeline
+    current_ids = set()
+    counts = {"seen": 0}
+    
+    def changed_chunks():
+        for chunk in chunks:
+            metadata = chunk_metadata(chunk)
+            current_ids.add(chunk["chunk_id"])
+            counts["seen"] += 1
+            if stored_hashes.get(chunk["chunk_id"]) != metadata["content_hash"]:
+                yield chunk, metadata
+    
+    pipeline = IngestPipeline(collection, embedding_provider, method="upsert")
+    changed = pipeline.run(changed_chunks())
+    
+    # Empty or unreadable chunk files would otherwise mark every stored chunk as removed
+    if not counts["seen"]:
+        print("⚠️  No chunks read; leaving the live collection untouched")
+        return collection, False
+    
+    removed = [chunk_id for chunk_id in stored_hashes if chunk_id not in current_ids]
+    unchanged = counts["seen"] - changed
+    print(f"📊 Incremental sync: {changed} new/changed, {unchanged} unchanged, {len(removed)} removed")
+    
+    if removed:
+        batch_size = 100
+        for i in range(0, len(removed), batch_size):
+            collection.delete(ids=removed[i:i + batch_size])
+        print(f"🗑️  Deleted {len(removed)} stale chunks")
+    
+    return collection, bool(changed or removed)
+
+def smoke_check(collection, embedding_provider, expected_count):
+    """Return a problem description if a freshly built collection is not servable, else None."""
+    count = collection.count()
+    if count == 0 or count != expected_count:
+        return f"expected {expected_count} documents, found {count}"
+    
+    query_embedding = embedding_provider.embed([SMOKE_QUERY])[0]
+    results = collection.query(query_embeddings=[query_embedding], n_results=1, include=["distances"])
+    if not results["ids"] or not results["ids"][0]:
+        return f"query '{SMOKE_QUERY}' returned no results"
+    
+    # A stored vector must find itself at distance ~0
+    sample = collection.get(limit=1, include=["embeddings"])
+    hit = collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1, include=["distances"])
+    if hit["distances"][0][0] > 1e-3:
+        return f"stored vector of {sample['ids'][0]} does not retrieve itself"
+    return None
+
+def publish_collection(client, collection, embedding_provider, expected_count, keep_versions, synced_at):
+    """Smoke-check a new collection version, point the alias at it and delete old versions."""
+    problem = smoke_check(collection, embedding_provider, expected_count)
+    if problem:
+        client.delete_collection(collection.name)
+        raise RuntimeError(f"Smoke check failed for {collection.name}: {problem}. "
+                           f"Deleted it; the live collection is unchanged.")
+    print(f"✅ Smoke check passed for {collection.name}")
+    
+    # Atomic switch: running services pick it up via /admin/reload or the alias check
+    write_alias(COLLECTION_NAME, collection.name, synced_at=synced_at)
+    print(f"🔀 Alias {COLLECTION_NAME} → {collection.name}")
+    
+    removed = collect_garbage(client, COLLECTION_NAME, keep=keep_versions)
+    if removed:
+        print(f"🗑️  Deleted {len(removed)} old collection version(s): {', '.join(removed)}")
+
+class CountingIterator:
+    """Iterator wrapper that counts the items it has yielded."""
+    
+    def __init__(self, iterable):
+        self._iterator = iter(iterable)
+        self.count = 0
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        item = next(self._iterator)
+        self.count += 1
+        return item
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Embed chunks into ChromaDB")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=os.getenv("EMBED_INCREMENTAL", "false").lower() == "true",
+        help="Only embed new or changed chunks and delete removed ones"
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        # Quantized backends re-score from the memory-mapped snapshot, so they snapshot by default
+        default=os.getenv(
+            "EMBED_NUMPY_SNAPSHOT",
+            str(VECTOR_QUANTIZATION in QuantizedVectorBackend.MODES)
+        ).lower() == "true",
+        help=f"Also write a NumPy snapshot for VECTOR_BACKEND=numpy to {NUMPY_SNAPSHOT_DIR}"
+    )
+    parser.add_argument(
+        "--dedup",
+        dest="dedup",
+        action="store_true",
+        default=DEDUP_ENABLED,
+        help="Embed one representative per group of near-duplicates of the same section and team"
+    )
+    parser.add_argument(
+        "--no-dedup",
+        dest="dedup",
+        action="store_false",
+        help="Embed every chunk, even when DEDUP_ENABLED is set"
+    )
+    parser.add_argument(
+        "--dedup-threshold",
+        type=float,
+        default=DEDUP_THRESHOLD,
+        help="Estimated Jaccard similarity at which chunks count as near-duplicates"
+    )
+    parser.add_argument(
+        "--keep-versions",
+        type=int,
+        default=COLLECTION_KEEP_VERSIONS,
+        help="Old collection versions to keep besides the live one"
+    )
+    return parser.parse_args()
+
 def main():
     """Main function."""
+    args = parse_args()
     try:
         print("🚀 Starting embedding process...")
         
-        # Get embedding provider
-        embedding_provider = get_embedding_provider()
-        provider_name = embedding_provider.__class__.__name__
+        # Get embedding provider, reusing vectors from the persistent embedding store
+        base_provider = get_embedding_provider()
+        provider_name = base_provider.__class__.__name__
         print(f"🔧 Using embedding provider: {provider_name}")
+        embedding_provider = with_embedding_store(base_provider)
         
-        # Read chunks
-        chunks = read_all_chunks()
-        print(f"📊 Found {len(chunks)} chunks to process")
-        
-        if not chunks:
-            print("❌ No chunks found. Run 'npm run chunk' first.")
-            return
+        # Stream chunks from disk; fail early if there is nothing to read
+        list_chunk_files()
+        if args.dedup:
+            dedup = deduplicate_chunks(args.dedup_threshold)
+            chunks = CountingIterator(representative_chunks(iter_chunks(), dedup))
+        else:
+            chunks = CountingIterator(iter_chunks())
         
         # Setup Chroma client
         client = setup_chroma_client()
         
         # Store embeddings
-        collection = store_embeddings_in_chroma(chunks, embedding_provider, client)
+        if args.incremental:
+            collection, modified = update_embeddings_in_chroma(chunks, embedding_provider, client)
+        else:
+            collection, modified = store_embeddings_in_chroma(chunks, embedding_provider, client), True
+        
+        if not chunks.count:
+            if collection.name != resolve_collection_name(COLLECTION_NAME):
+                client.delete_collection(collection.name)
+            print("❌ No chunks found. Run 'npm run chunk' first.")
+            return
+        
+        # Sync marker of this run; services drop caches derived from older markers.
+        # An incremental run that changed nothing keeps the current one
+        if modified:
+            synced_at = datetime.now().isoformat()
+        else:
+            synced_at = resolve_collection_version(COLLECTION_NAME)[1]
+        
+        # Snapshot first, so services switching to a new version find a matching snapshot
+        if args.snapshot:
+            NumpyVectorBackend.from_collection(collection).save(NUMPY_SNAPSHOT_DIR, synced_at=synced_at)
+            print(f"💾 NumPy snapshot written to: {NUMPY_SNAPSHOT_DIR}")
+        
+        # A full rebuild produced a new version; switch to it only if it is healthy
+        if collection.name != resolve_collection_name(COLLECTION_NAME):
+            publish_collection(client, collection, embedding_provider, chunks.count, args.keep_versions, synced_at)
+        elif modified:
+            # An incremental sync changed the live version in place; move its sync marker
+            write_alias(COLLECTION_NAME, collection.name, synced_at=synced_at)
+            print(f"🔖 Sync marker of {collection.name} → {synced_at}")
         
         print("\n🎉 Embedding process completed successfully!")
         print(f"📁 Chroma database stored at: {CHROMA_DIR}")
-        print(f"📊 Total documents indexed: {len(chunks)}")
-        print(f"🏷️  Collection name: {COLLECTION_NAME}")
-        
+        print(f"📊 Total documents indexed: {collection.count()} ({chunks.count} chunks stored)")
+        print(f"🏷️  Collection name: {COLLECTION_NAME} → {collection.name}")
+        if hasattr(embedding_provider, "store"):
+            store_stats = embedding_provider.store.stats()
+            print(f"💾 Embedding store: {store_stats['hits']} reused, {store_stats['misses']} encoded ({store_stats['path']})")
+        if getattr(base_provider, "windowed_texts", 0):
+            print(f"🪟 Long chunks: {base_provider.windowed_texts} split into {base_provider.windows} windows "
+                  f"of at most {base_provider.max_tokens} tokens and pooled")
+    
     except Exception as e:
         print(f"❌ Embedding process failed: {e}")
         raise
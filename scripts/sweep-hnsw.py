@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Sweep Chroma HNSW settings for the Asker Fotball search index.
+Builds one throwaway collection per combination of distance space, M,
+construction_ef and search_ef, and reports build time, index size, query
+latency and recall@k against exact NumPy search. Results are written to
+storage/metrics/ as JSON (plus a PNG chart when matplotlib is installed),
+so HNSW_* settings can be chosen from measurements.
+
+Vectors come from the live collection, from storage/chunks embedded with
+the stub provider (--source chunks, offline), or are generated
+(--source synthetic) to see how the settings behave at larger scale.
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+from dotenv import load_dotenv
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
+
+# Search service modules
+sys.path.insert(0, str(Path(__file__).parent.parent / "services"))
+from embedding_providers import get_embedding_provider, with_embedding_store, StubEmbeddingProvider
+from vector_backends import NumpyVectorBackend
+from chromadb_service import CHROMA_DIR, CHUNKS_DIR, COLLECTION_NAME
+from collection_versions import resolve_collection_name
+from index_config import hnsw_metadata, HNSW_SPACE, HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF
+
+# Shared benchmark helpers (scripts/bench_common.py)
+from bench_common import load_queries, percentile
+
+METRICS_DIR = Path(__file__).parent.parent / "storage" / "metrics"
+GOLDEN_FILE = Path(__file__).parent.parent / "config" / "search-golden.jsonl"
+
+ADD_BATCH_SIZE = 1000
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+def synthetic_vectors(count, dim, clusters, seed):
+    """Clustered random unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, count)
+    vectors = centers[assignment] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def perturbed_queries(matrix, count, seed):
+    """Queries near stored vectors, for sources without query texts."""
+    rng = np.random.default_rng(seed + 1)
+    rows = rng.choice(len(matrix), size=min(count, len(matrix)), replace=False)
+    queries = matrix[rows] + 0.1 * rng.standard_normal((len(rows), matrix.shape[1])).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def load_source(args):
+    """Exact backend holding the (normalized) vectors plus the query embeddings."""
+    if args.source == "synthetic":
+        matrix = synthetic_vectors(args.count, args.dim, args.clusters, args.seed)
+        ids = [f"v{i}" for i in range(len(matrix))]
+        exact = NumpyVectorBackend(ids, matrix, [""] * len(ids), [{}] * len(ids), name="synthetic", normalized=True)
+        return exact, perturbed_queries(matrix, args.num_queries, args.seed)
+    
+    queries = load_queries(args.queries) if args.queries else load_queries(GOLDEN_FILE)
+    if args.source == "chunks":
+        provider = StubEmbeddingProvider()
+        exact = NumpyVectorBackend.from_chunks_dir(CHUNKS_DIR, provider)
+    else:
+        client = chromadb.PersistentClient(path=str(CHROMA_DIR), settings=Settings(anonymized_telemetry=False))
+        collection = client.get_collection(resolve_collection_name(COLLECTION_NAME))
+        exact = NumpyVectorBackend.from_collection(collection)
+        provider = with_embedding_store(get_embedding_provider())
+    return exact, np.asarray(provider.embed(queries), dtype=np.float32)
+
+def directory_bytes(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+def estimated_index_bytes(count, dim, m):
+    """
+    In-memory size of an hnswlib index: every element stores its vector,
+    label and 2*M level-0 links; a fraction 1/(M-1) of elements also has
+    upper-level link lists of M entries.
+    """
+    level0 = count * (dim * 4 + 2 * m * 4 + 4 + 8)
+    upper = count / max(m - 1, 1) * (m * 4 + 4)
+    return int(level0 + upper)
+
+def build_variant(exact, metadata, workdir):
+    """Create a collection with the given HNSW metadata and add every vector; returns (collection, build seconds)."""
+    client = chromadb.PersistentClient(path=str(workdir), settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name="hnsw_sweep", metadata=metadata)
+    started = time.perf_counter()
+    for start in range(0, exact.count(), ADD_BATCH_SIZE):
+        end = start + ADD_BATCH_SIZE
+        collection.add(ids=exact.ids[start:end], embeddings=exact.matrix[start:end].tolist())
+    return collection, time.perf_counter() - started
+
+def measure_variant(collection, queries, truth, k, repeat):
+    """Single-query latencies in ms and mean recall@k against the exact top-k."""
+    latencies = []
+    recalls = []
+    for _ in range(repeat):
+        for embedding, expected in zip(queries, truth):
+            started = time.perf_counter()
+            result = collection.query(query_embeddings=[embedding.tolist()], n_results=k, include=["distances"])
+            latencies.append((time.perf_counter() - started) * 1000)
+            expected = set(expected[:k])
+            if expected:
+                recalls.append(len(expected & set(result["ids"][0])) / len(expected))
+    return latencies, (sum(recalls) / len(recalls) if recalls else 0.0)
+
+def release_clients():
+    """Drop cached Chroma systems so temporary directories can be removed."""
+    try:
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+    except (ImportError, AttributeError):
+        pass
+
+def recommend(results, target_recall):
+    """Fastest variant (by p95) reaching target_recall, else the one with the best recall."""
+    good = [r for r in results if r["recall_at_k"] >= target_recall]
+    if good:
+        return min(good, key=lambda r: (r["p95_ms"], r["build_s"]))
+    return max(results, key=lambda r: (r["recall_at_k"], -r["p95_ms"]))
+
+def write_chart(results, path, k):
+    """Recall vs p95 latency, and build time vs index size, one point per variant."""
+    figure, (left, right) = plt.subplots(1, 2, figsize=(13, 5))
+    for r in results:
+        label = f"{r['space']} M{r['M']} c{r['construction_ef']} s{r['search_ef']}"
+        left.scatter(r["p95_ms"], r["recall_at_k"])
+        left.annotate(label, (r["p95_ms"], r["recall_at_k"]), fontsize=7)
+        right.scatter(r["estimated_index_bytes"] / 1e6, r["build_s"])
+        right.annotate(label, (r["estimated_index_bytes"] / 1e6, r["build_s"]), fontsize=7)
+    left.set_xlabel("p95 query latency (ms)")
+    left.set_ylabel(f"recall@{k}")
+    right.set_xlabel("estimated index size (MB)")
+    right.set_ylabel("build time (s)")
+    figure.tight_layout()
+    figure.savefig(path, dpi=120)
+    plt.close(figure)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep Chroma HNSW settings: latency, build time, size and recall")
+    parser.add_argument("--source", choices=["collection", "chunks", "synthetic"], default="collection",
+                        help="Vectors to index: the live collection, stub-embedded chunks (offline) or generated")
+    parser.add_argument("--queries", help="JSONL or text file with queries (default: golden set queries)")
+    parser.add_argument("--count", type=int, default=20000, help="Vectors for --source synthetic")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension for --source synthetic")
+    parser.add_argument("--clusters", type=int, default=50, help="Clusters for --source synthetic")
+    parser.add_argument("--num-queries", type=int, default=200, help="Queries for --source synthetic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--spaces", default=HNSW_SPACE, help="Comma-separated distance spaces (cosine, l2, ip)")
+    parser.add_argument("--m", default=f"8,{HNSW_M},32", help="Comma-separated HNSW M values")
+    parser.add_argument("--construction-ef", default=f"{HNSW_CONSTRUCTION_EF},200",
+                        help="Comma-separated construction_ef values")
+    parser.add_argument("--search-ef", default=f"10,{HNSW_SEARCH_EF},100", help="Comma-separated search_ef values")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions per query")
+    parser.add_argument("--target-recall", type=float, default=0.95,
+                        help="Recall@k the recommended variant must reach")
+    parser.add_argument("--output", default=str(METRICS_DIR / "hnsw-sweep.json"))
+    args = parser.parse_args()
+    
+    print("🧪 HNSW settings sweep")
+    print("=" * 70)
+    
+    exact, queries = load_source(args)
+    dim = exact.matrix.shape[1]
+    k = min(args.k, exact.count())
+    truth = exact.query(query_embeddings=queries, n_results=k)["ids"]
+    print(f"📁 Source: {args.source} ({exact.count()} vectors, dim {dim}); {len(queries)} queries, k={k}")
+    
+    variants = list(product(
+        [s.strip() for s in args.spaces.split(",") if s.strip()],
+        int_list(args.m), int_list(args.construction_ef), int_list(args.search_ef)
+    ))
+    print(f"🔧 {len(variants)} variants\n")
+    print(f"{'space':<8}{'M':>4}{'c_ef':>6}{'s_ef':>6}{'build s':>9}{'size MB':>9}{'p50 ms':>9}{'p95 ms':>9}{'recall':>8}")
+    
+    results = []
+    for space, m, construction_ef, search_ef in variants:
+        metadata = hnsw_metadata(space, m, construction_ef, search_ef)
+        workdir = tempfile.mkdtemp(prefix="hnsw-sweep-")
+        try:
+            collection, build_s = build_variant(exact, metadata, workdir)
+            latencies, recall = measure_variant(collection, queries, truth, k, args.repeat)
+            disk_bytes = directory_bytes(workdir)
+        finally:
+            release_clients()
+            shutil.rmtree(workdir, ignore_errors=True)
+        
+        result = {
+            "space": space,
+            "M": m,
+            "construction_ef": construction_ef,
+            "search_ef": search_ef,
+            "build_s": round(build_s, 3),
+            "vectors_per_s": round(exact.count() / build_s, 1) if build_s else None,
+            "estimated_index_bytes": estimated_index_bytes(exact.count(), dim, m),
+            # Chroma flushes HNSW files in batches, so small builds may still sit in its log
+            "disk_bytes": disk_bytes,
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "recall_at_k": round(recall, 4)
+        }
+        results.append(result)
+        print(f"{space:<8}{m:>4}{construction_ef:>6}{search_ef:>6}{result['build_s']:>9.2f}"
+              f"{result['estimated_index_bytes'] / 1e6:>9.2f}{result['p50_ms']:>9.3f}{result['p95_ms']:>9.3f}"
+              f"{result['recall_at_k']:>8.3f}")
+    
+    best = recommend(results, args.target_recall)
+    print(f"\n🏆 Recommended (p95 {best['p95_ms']:.3f} ms, recall@{k} {best['recall_at_k']:.3f}):")
+    print(f"   HNSW_SPACE={best['space']} HNSW_M={best['M']} "
+          f"HNSW_CONSTRUCTION_EF={best['construction_ef']} HNSW_SEARCH_EF={best['search_ef']}")
+    
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "source": args.source,
+        "vectors": exact.count(),
+        "dimension": dim,
+        "queries": len(queries),
+        "k": k,
+        "repeat": args.repeat,
+        "target_recall": args.target_recall,
+        "recommended": best,
+        "results": results
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Report written to {output}")
+    
+    if MATPLOTLIB_AVAILABLE:
+        chart = output.with_suffix(".png")
+        write_chart(results, chart, k)
+        print(f"📊 Chart written to {chart}")
+    else:
+        print("ℹ️  Install matplotlib to also get a chart")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,17 @@ import chromadb
 from chromadb.config import Settings
 from pathlib import Path
 import json
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables (provider selection, API keys)
+load_dotenv()
+
+# Embedding providers are shared with the search service
+sys.path.insert(0, str(Path(__file__).parent.parent / "services"))
+from embedding_providers import get_embedding_provider, with_embedding_store
+from chromadb_service import COLLECTION_NAME
+from collection_versions import resolve_collection_name
 
 def test_chromadb():
     print("🧪 Testing ChromaDB Embeddings")
@@ -21,9 +32,14 @@ def test_chromadb():
         settings=Settings(anonymized_telemetry=False)
     )
     
-    # List collections
-    collections = client.list_collections()
-    print(f"\n📊 Collections found: {len(collections)}")
+    # Query vectors come from the same provider as the index; the embedding
+    # store is read but ad-hoc test queries are not written into it
+    embedding_provider = with_embedding_store(get_embedding_provider(), write_back=False)
+    
+    # Only the live version; superseded versioned builds are not tested
+    collection_name = resolve_collection_name(COLLECTION_NAME)
+    collections = [client.get_collection(collection_name)]
+    print(f"\n📊 Live collection for {COLLECTION_NAME}: {collection_name}")
     
     for collection in collections:
         print(f"\n📁 Collection: {collection.name}")
@@ -55,11 +71,12 @@ def test_chromadb():
         print(f"\n🔍 Testing semantic search:\n")
         
         results_summary = []
+        query_embeddings = embedding_provider.embed(test_queries)
         
-        for query in test_queries:
+        for query, query_embedding in zip(test_queries, query_embeddings):
             try:
                 results = collection.query(
-                    query_texts=[query],
+                    query_embeddings=[query_embedding],
                     n_results=3,
                     include=['metadatas', 'distances']
                 )
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+BM25 lexical index for Asker Fotball
+In-process counterpart of scripts/build-bm25.js, used for hybrid search
+"""
+
+import re
+import math
+import heapq
+from array import array
+from typing import List, Dict, Iterable, Tuple, Optional
+
+# JavaScript's \W is ASCII-only, so this splits on æ/ø/å exactly like the Node index
+_SPLIT_PATTERN = re.compile(r"\W+", re.ASCII)
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split on non-word characters (same as build-bm25.js)"""
+    return [token for token in _SPLIT_PATTERN.split(text.lower()) if token]
+
+class BM25Index:
+    """
+    Array-backed inverted index with precomputed IDF and document lengths
+    
+    Each term maps to a term id; postings for a term are two parallel arrays
+    of document rows and term frequencies. Scoring uses the same k1/b defaults
+    and IDF formula as wink-bm25-text-search.
+    """
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.doc_lengths = array("I")
+        self.vocabulary: Dict[str, int] = {}
+        self.postings_docs: List[array] = []
+        self.postings_tfs: List[array] = []
+        self.idf = array("d")
+        self.avg_doc_length = 0.0
+    
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+    
+    def add(self, doc_id: str, text: str):
+        """Add a document; call finalize() once all documents are added"""
+        row = len(self.doc_ids)
+        tokens = tokenize(text)
+        self.doc_ids.append(doc_id)
+        self.row_of[doc_id] = row
+        self.doc_lengths.append(len(tokens))
+        
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        
+        for token, tf in counts.items():
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                term_id = len(self.vocabulary)
+                self.vocabulary[token] = term_id
+                self.postings_docs.append(array("I"))
+                self.postings_tfs.append(array("I"))
+            self.postings_docs[term_id].append(row)
+            self.postings_tfs[term_id].append(tf)
+    
+    def finalize(self):
+        """Precompute IDF per term and the average document length"""
+        n_docs = len(self.doc_ids)
+        self.avg_doc_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = array("d", (
+            math.log((n_docs - len(docs) + 0.5) / (len(docs) + 0.5) + 1)
+            for docs in self.postings_docs
+        ))
+    
+    def search(self, query: str, limit: int = 10,
+               allowed: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Return up to limit (doc_id, score) pairs, best first
+        
+        When allowed is given, only those documents are scored (e.g. the rows
+        matching a metadata filter).
+        """
+        if not self.doc_ids:
+            return []
+        allowed_rows = None
+        if allowed is not None:
+            allowed_rows = {self.row_of[doc_id] for doc_id in allowed if doc_id in self.row_of}
+            if not allowed_rows:
+                return []
+        
+        k1, b, avg_len = self.k1, self.b, self.avg_doc_length or 1.0
+        scores: Dict[int, float] = {}
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            idf = self.idf[term_id]
+            for row, tf in zip(self.postings_docs[term_id], self.postings_tfs[term_id]):
+                if allowed_rows is not None and row not in allowed_rows:
+                    continue
+                norm = k1 * (1 - b + b * self.doc_lengths[row] / avg_len)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[row], score) for row, score in top]
+    
+    def stats(self) -> Dict[str, float]:
+        """Get index statistics"""
+        return {
+            "documents": len(self.doc_ids),
+            "terms": len(self.vocabulary),
+            "postings": sum(len(docs) for docs in self.postings_docs),
+            "avg_doc_length": round(self.avg_doc_length, 2),
+            "k1": self.k1,
+            "b": self.b
+        }
+    
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, str]], **kwargs) -> "BM25Index":
+        """Build an index from (doc_id, text) pairs"""
+        index = cls(**kwargs)
+        for doc_id, text in documents:
+            index.add(doc_id, text)
+        index.finalize()
+        return index
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60,
+                           weights: List[float] = None) -> Dict[str, float]:
+    """Fuse several ranked id lists with (weighted) reciprocal rank fusion"""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank + 1)
+    return fused
+
+def weighted_score_fusion(score_maps: List[Dict[str, float]], weights: List[float]) -> Dict[str, float]:
+    """Fuse min-max normalized score maps with the given weights"""
+    fused: Dict[str, float] = {}
+    for scores, weight in zip(score_maps, weights):
+        if not scores:
+            continue
+        low, high = min(scores.values()), max(scores.values())
+        spread = (high - low) or 1.0
+        for doc_id, score in scores.items():
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * (score - low) / spread
+    return fused
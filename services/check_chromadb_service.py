@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+ChromaDB Search Service smoke test (npm run chromadb:test)
+Loads .env and configures logging before the service modules read their
+configuration, then runs a health check and a test search
+"""
+
+import logging
+from dotenv import load_dotenv
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
+
+from chromadb_service import ChromaDBSearchService
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+
+if __name__ == "__main__":
+    # Test the service
+    print("🧪 Testing ChromaDB Search Service...")
+    
+    try:
+        service = ChromaDBSearchService()
+        
+        # Health check
+        health = service.health_check()
+        print(f"Health Status: {health['status']}")
+        print(f"Collection Stats: {health['stats']}")
+        
+        # Test search
+        if health['status'] == 'healthy':
+            results = service.search("asker fotball spillere", max_results=3)
+            print(f"\n🔍 Test search results: {len(results)} chunks found")
+            for i, result in enumerate(results):
+                print(f"  {i+1}. {result['chunk_id']} (score: {result['similarity_score']:.3f})")
+    
+    except Exception as e:
+        print(f"❌ Service test failed: {e}")
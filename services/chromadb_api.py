@@ -7,15 +7,32 @@ Simple HTTP API wrapper for ChromaDB search service
 import json
 import logging
 from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from dotenv import load_dotenv
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
 
 from chromadb_service import get_chromadb_service, health_check
+from search_requests import (
+    parse_search_request, parse_batch_request, parse_expand_request, search_kwargs,
+    search_response, batch_response, expand_response, encode_response, admin_authorized
+)
+from metrics import REGISTRY, CONTENT_TYPE, stage_histogram, count_api_error
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SERIALIZE_SECONDS = stage_histogram("serialize")
+
+def search_json(payload: Dict[str, Any]) -> Response:
+    """Encode a search response body, gzipped when large and accepted by the client"""
+    with SERIALIZE_SECONDS.time():
+        body, headers = encode_response(payload, request.headers.get('Accept-Encoding'))
+    return Response(body, status=200, headers=headers, content_type='application/json')
+
 # Create Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -37,48 +54,71 @@ def health():
 def search():
     """Search endpoint"""
     try:
-        data = request.get_json()
-        
-        if not data or 'query' not in data:
-            return jsonify({
-                'error': 'Query is required',
-                'message': 'Please provide a query in the request body'
-            }), 400
-        
-        query = data['query']
-        max_results = data.get('max_results', 5)
-        filter_metadata = data.get('filter_metadata')
+        params, error = parse_search_request(request.get_json(silent=True))
+        if error:
+            count_api_error('/search', 400)
+            return jsonify(error), 400
         
-        if not isinstance(query, str) or not query.strip():
-            return jsonify({
-                'error': 'Invalid query',
-                'message': 'Query must be a non-empty string'
-            }), 400
+        # Perform search
+        service = get_chromadb_service()
+        results = service.search(**search_kwargs(params))
+        if params['window']:
+            results = service.expand_results(results, params['window'])
         
-        if not isinstance(max_results, int) or max_results < 1 or max_results > 50:
-            return jsonify({
-                'error': 'Invalid max_results',
-                'message': 'max_results must be an integer between 1 and 50'
-            }), 400
+        return search_json(search_response(params, results))
+    
+    except Exception as e:
+        count_api_error('/search', 500)
+        logger.error(f"Search error: {e}")
+        return jsonify({
+            'error': 'Search failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    """Batch search endpoint"""
+    try:
+        queries, error = parse_batch_request(request.get_json(silent=True))
+        if error:
+            count_api_error('/search/batch', 400)
+            return jsonify(error), 400
         
         # Perform search
         service = get_chromadb_service()
-        results = service.search(
-            query=query,
-            max_results=max_results,
-            filter_metadata=filter_metadata
-        )
+        batch_results = service.search_batch(queries)
+        if any(q['window'] for q in queries):
+            batch_results = service.expand_batch(queries, batch_results)
         
+        return search_json(batch_response(queries, batch_results))
+    
+    except Exception as e:
+        count_api_error('/search/batch', 500)
+        logger.error(f"Batch search error: {e}")
         return jsonify({
-            'query': query,
-            'results': results,
-            'total_found': len(results)
-        }), 200
+            'error': 'Batch search failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/expand', methods=['POST'])
+def expand():
+    """Chunks by id with their neighbouring chunks"""
+    try:
+        params, error = parse_expand_request(request.get_json(silent=True))
+        if error:
+            count_api_error('/expand', 400)
+            return jsonify(error), 400
+        
+        service = get_chromadb_service()
+        chunks = service.get_chunks(params['chunk_ids'], params['window'])
         
+        return search_json(expand_response(params, chunks))
+    
     except Exception as e:
-        logger.error(f"Search error: {e}")
+        count_api_error('/expand', 500)
+        logger.error(f"Expand error: {e}")
         return jsonify({
-            'error': 'Search failed',
+            'error': 'Expand failed',
             'message': str(e)
         }), 500
 
@@ -95,6 +135,30 @@ def stats():
             'message': str(e)
         }), 500
 
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Switch to the collection version the alias currently points at"""
+    if not admin_authorized(request.headers.get('X-Admin-Token'), request.remote_addr):
+        return jsonify({
+            'error': 'Unauthorized',
+            'message': 'Missing or invalid X-Admin-Token'
+        }), 401
+    
+    try:
+        service = get_chromadb_service()
+        return jsonify(service.reload()), 200
+    except Exception as e:
+        logger.error(f"Reload error: {e}")
+        return jsonify({
+            'error': 'Reload failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint with API information"""
@@ -105,7 +169,11 @@ def root():
             'GET /': 'API information',
             'GET /health': 'Health check',
             'GET /stats': 'Collection statistics',
-            'POST /search': 'Semantic search'
+            'GET /metrics': 'Prometheus metrics',
+            'POST /admin/reload': 'Switch to the collection version the alias points at',
+            'POST /search': 'Semantic search',
+            'POST /search/batch': 'Semantic search for multiple queries',
+            'POST /expand': 'Chunks by id with their neighbouring chunks'
         },
         'search_example': {
             'method': 'POST',
@@ -113,7 +181,11 @@ def root():
             'body': {
                 'query': 'asker fotball spillere',
                 'max_results': 5,
-                'filter_metadata': {'chunk_type': 'player_list'}
+                'mode': 'hybrid',
+                'rerank': True,
+                'filter_metadata': {'team': 'G15'},
+                'window': 1,
+                'fields': ['chunk_id', 'similarity_score', 'metadata.url']
             }
         }
     }), 200
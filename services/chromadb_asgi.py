@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+ChromaDB ASGI API Server
+Asyncio variant of chromadb_api.py with the same endpoints and responses.
+Searches run in a bounded thread pool with per-request deadlines, and
+requests beyond the in-flight limit are shed with 503 instead of queueing.
+
+Run with:
+    uvicorn chromadb_asgi:app --host 0.0.0.0 --port 5001
+"""
+
+import os
+import asyncio
+import logging
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from dotenv import load_dotenv
+
+# Load environment variables before the service modules read their configuration
+load_dotenv()
+
+from chromadb_service import get_chromadb_service, health_check
+from search_requests import (
+    parse_search_request, parse_batch_request, parse_expand_request, search_kwargs,
+    search_response, batch_response, expand_response, encode_response, admin_authorized
+)
+from metrics import REGISTRY, CONTENT_TYPE, stage_histogram, count_api_error
+
+# Configuration
+ASGI_EXECUTOR_THREADS = int(os.getenv("ASGI_EXECUTOR_THREADS", "8"))
+ASGI_MAX_IN_FLIGHT = int(os.getenv("ASGI_MAX_IN_FLIGHT", "32"))
+ASGI_REQUEST_TIMEOUT_MS = int(os.getenv("ASGI_REQUEST_TIMEOUT_MS", "5000"))
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Blocking work (embedding, collection.query) runs here, never on the event loop
+executor = ThreadPoolExecutor(max_workers=ASGI_EXECUTOR_THREADS, thread_name_prefix="search")
+
+class Overloaded(Exception):
+    """Raised when the in-flight request limit is reached"""
+
+class LoadShedder:
+    """
+    Admits at most max_in_flight requests and rejects the rest immediately
+    
+    A request that times out while its work is already running in the
+    executor keeps its slot until that work finishes, so abandoned searches
+    still count against the limit instead of piling up behind new ones.
+    """
+    
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.shed = 0
+        self.abandoned = 0
+    
+    def __enter__(self):
+        # Only touched from the event loop thread, so no lock is needed
+        if self.in_flight >= self.max_in_flight:
+            self.shed += 1
+            raise Overloaded()
+        self.in_flight += 1
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.in_flight -= 1
+    
+    def hold_until_done(self, future: Future, loop: asyncio.AbstractEventLoop):
+        """Keep a slot taken until future completes (called on the event loop thread)"""
+        self.in_flight += 1
+        self.abandoned += 1
+        future.add_done_callback(lambda _: self._release_threadsafe(loop))
+    
+    def _release_threadsafe(self, loop: asyncio.AbstractEventLoop):
+        # Runs on the executor thread; the counters are only changed on the event loop
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(self._release_abandoned)
+    
+    def _release_abandoned(self):
+        self.in_flight -= 1
+        self.abandoned -= 1
+
+shedder = LoadShedder(ASGI_MAX_IN_FLIGHT)
+
+SERIALIZE_SECONDS = stage_histogram("serialize")
+
+def search_json(request: Request, payload: Any) -> Response:
+    """Encode a search response body, gzipped when large and accepted by the client"""
+    with SERIALIZE_SECONDS.time():
+        body, headers = encode_response(payload, request.headers.get('accept-encoding'))
+    return Response(body, headers=headers, media_type='application/json')
+
+async def run_blocking(func: Callable, *args, timeout_ms: int = ASGI_REQUEST_TIMEOUT_MS,
+                       deadline: Optional[float] = None, **kwargs) -> Any:
+    """
+    Run func in the executor with a deadline
+    
+    deadline (event loop time, from request_deadline) is shared by every
+    stage of one request, so each call only gets the budget that is left;
+    without it the call gets timeout_ms of its own. On timeout the pending
+    call is cancelled if it has not started yet; a call that is already
+    running finishes in the background, holding a shedder slot until it
+    does, and its result is discarded.
+    """
+    loop = asyncio.get_running_loop()
+    timeout = timeout_ms / 1000.0 if deadline is None else deadline - loop.time()
+    if timeout <= 0:
+        raise asyncio.TimeoutError()
+    future = executor.submit(func, *args, **kwargs)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if not future.cancel():
+            shedder.hold_until_done(future, loop)
+        raise
+
+def request_timeout_ms(params: Any) -> int:
+    """Deadline of a parsed request (its timeout_ms), capped at the server default"""
+    timeout_ms = params.get('timeout_ms') if isinstance(params, dict) else None
+    return min(timeout_ms, ASGI_REQUEST_TIMEOUT_MS) if timeout_ms else ASGI_REQUEST_TIMEOUT_MS
+
+def request_deadline(timeout_ms: int) -> float:
+    """Event loop time by which a request starting now has to finish"""
+    return asyncio.get_running_loop().time() + timeout_ms / 1000.0
+
+async def read_json(request: Request) -> Any:
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+def overloaded_response() -> JSONResponse:
+    return JSONResponse({
+        'error': 'Service overloaded',
+        'message': 'Too many concurrent requests, please retry shortly'
+    }, status_code=503, headers={'Retry-After': '1'})
+
+def timeout_response(timeout_ms: int) -> JSONResponse:
+    return JSONResponse({
+        'error': 'Search timed out',
+        'message': f'The search did not finish within {timeout_ms} ms'
+    }, status_code=504)
+
+async def health(request: Request) -> JSONResponse:
+    """Health check endpoint"""
+    try:
+        health_status = await run_blocking(health_check)
+        status_code = 200 if health_status['status'] == 'healthy' else 503
+        return JSONResponse(health_status, status_code=status_code)
+    except Exception as e:
+        return JSONResponse({
+            'status': 'unhealthy',
+            'error': str(e) or e.__class__.__name__
+        }, status_code=503)
+
+async def search(request: Request) -> JSONResponse:
+    """Search endpoint"""
+    data = await read_json(request)
+    params, error = parse_search_request(data)
+    if error:
+        count_api_error('/search', 400)
+        return JSONResponse(error, status_code=400)
+    
+    timeout_ms = request_timeout_ms(params)
+    deadline = request_deadline(timeout_ms)
+    try:
+        with shedder:
+            service = await run_blocking(get_chromadb_service, deadline=deadline)
+            results = await run_blocking(service.search, deadline=deadline, **search_kwargs(params))
+            if params['window']:
+                results = await run_blocking(service.expand_results, results, params['window'], deadline=deadline)
+        return search_json(request, search_response(params, results))
+    except Overloaded:
+        count_api_error('/search', 503)
+        return overloaded_response()
+    except asyncio.TimeoutError:
+        count_api_error('/search', 504)
+        return timeout_response(timeout_ms)
+    except Exception as e:
+        count_api_error('/search', 500)
+        logger.error(f"Search error: {e}")
+        return JSONResponse({
+            'error': 'Search failed',
+            'message': str(e)
+        }, status_code=500)
+
+async def search_batch(request: Request) -> JSONResponse:
+    """Batch search endpoint"""
+    data = await read_json(request)
+    queries, error = parse_batch_request(data)
+    if error:
+        count_api_error('/search/batch', 400)
+        return JSONResponse(error, status_code=400)
+    
+    # Every query carries the batch deadline
+    timeout_ms = request_timeout_ms(queries[0])
+    deadline = request_deadline(timeout_ms)
+    try:
+        with shedder:
+            service = await run_blocking(get_chromadb_service, deadline=deadline)
+            batch_results = await run_blocking(service.search_batch, queries, deadline=deadline)
+            if any(q['window'] for q in queries):
+                batch_results = await run_blocking(service.expand_batch, queries, batch_results, deadline=deadline)
+        return search_json(request, batch_response(queries, batch_results))
+    except Overloaded:
+        count_api_error('/search/batch', 503)
+        return overloaded_response()
+    except asyncio.TimeoutError:
+        count_api_error('/search/batch', 504)
+        return timeout_response(timeout_ms)
+    except Exception as e:
+        count_api_error('/search/batch', 500)
+        logger.error(f"Batch search error: {e}")
+        return JSONResponse({
+            'error': 'Batch search failed',
+            'message': str(e)
+        }, status_code=500)
+
+async def expand(request: Request) -> JSONResponse:
+    """Chunks by id with their neighbouring chunks"""
+    data = await read_json(request)
+    params, error = parse_expand_request(data)
+    if error:
+        count_api_error('/expand', 400)
+        return JSONResponse(error, status_code=400)
+    
+    timeout_ms = request_timeout_ms(params)
+    deadline = request_deadline(timeout_ms)
+    try:
+        with shedder:
+            service = await run_blocking(get_chromadb_service, deadline=deadline)
+            chunks = await run_blocking(service.get_chunks, params['chunk_ids'], params['window'], deadline=deadline)
+        return search_json(request, expand_response(params, chunks))
+    except Overloaded:
+        count_api_error('/expand', 503)
+        return overloaded_response()
+    except asyncio.TimeoutError:
+        count_api_error('/expand', 504)
+        return timeout_response(timeout_ms)
+    except Exception as e:
+        count_api_error('/expand', 500)
+        logger.error(f"Expand error: {e}")
+        return JSONResponse({
+            'error': 'Expand failed',
+            'message': str(e)
+        }, status_code=500)
+
+async def stats(request: Request) -> JSONResponse:
+    """Get collection statistics"""
+    try:
+        service = await run_blocking(get_chromadb_service)
+        collection_stats = await run_blocking(service.get_collection_stats)
+        collection_stats['asgi'] = {
+            'in_flight': shedder.in_flight,
+            'max_in_flight': shedder.max_in_flight,
+            'shed_requests': shedder.shed,
+            'abandoned_running': shedder.abandoned,
+            'executor_threads': ASGI_EXECUTOR_THREADS,
+            'request_timeout_ms': ASGI_REQUEST_TIMEOUT_MS
+        }
+        return JSONResponse(collection_stats)
+    except Exception as e:
+        return JSONResponse({
+            'error': 'Failed to get stats',
+            'message': str(e)
+        }, status_code=500)
+
+async def admin_reload(request: Request) -> JSONResponse:
+    """Switch to the collection version the alias currently points at"""
+    if not admin_authorized(request.headers.get('x-admin-token'),
+                            request.client.host if request.client else None):
+        return JSONResponse({
+            'error': 'Unauthorized',
+            'message': 'Missing or invalid X-Admin-Token'
+        }, status_code=401)
+    
+    try:
+        service = await run_blocking(get_chromadb_service)
+        # Loading a new version can take longer than a search deadline
+        result = await asyncio.get_running_loop().run_in_executor(executor, service.reload)
+        return JSONResponse(result)
+    except Exception as e:
+        logger.error(f"Reload error: {e}")
+        return JSONResponse({
+            'error': 'Reload failed',
+            'message': str(e)
+        }, status_code=500)
+
+async def metrics(request: Request) -> Response:
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+async def root(request: Request) -> JSONResponse:
+    """Root endpoint with API information"""
+    return JSONResponse({
+        'service': 'ChromaDB Search API (ASGI)',
+        'version': '1.0.0',
+        'endpoints': {
+            'GET /': 'API information',
+            'GET /health': 'Health check',
+            'GET /stats': 'Collection statistics',
+            'GET /metrics': 'Prometheus metrics',
+            'POST /admin/reload': 'Switch to the collection version the alias points at',
+            'POST /search': 'Semantic search',
+            'POST /search/batch': 'Semantic search for multiple queries',
+            'POST /expand': 'Chunks by id with their neighbouring chunks'
+        },
+        'search_example': {
+            'method': 'POST',
+            'url': '/search',
+            'body': {
+                'query': 'asker fotball spillere',
+                'max_results': 5,
+                'mode': 'hybrid',
+                'rerank': True,
+                'filter_metadata': {'team': 'G15'},
+                'window': 1,
+                'timeout_ms': 2000,
+                'fields': ['chunk_id', 'similarity_score', 'metadata.url']
+            }
+        }
+    })
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Build the service off the event loop so the first request is not slow"""
+    await asyncio.get_running_loop().run_in_executor(executor, get_chromadb_service)
+    yield
+    executor.shutdown(wait=False, cancel_futures=True)
+
+app = Starlette(
+    routes=[
+        Route('/', root, methods=['GET']),
+        Route('/health', health, methods=['GET']),
+        Route('/stats', stats, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+        Route('/admin/reload', admin_reload, methods=['POST']),
+        Route('/search', search, methods=['POST']),
+        Route('/search/batch', search_batch, methods=['POST']),
+        Route('/expand', expand, methods=['POST'])
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    print("🚀 Starting ChromaDB Search API (ASGI)...")
+    print("📡 API will be available at: http://localhost:5001")
+    uvicorn.run(app, host='0.0.0.0', port=5001)
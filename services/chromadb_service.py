@@ -6,105 +6,342 @@ Provides semantic search capabilities for the RAG system
 
 import os
 import json
+import time
 import logging
+import threading
+import contextlib
+import importlib.util
+from collections import OrderedDict
+from concurrent.futures import Future
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-try:
-    import chromadb
-    from chromadb.config import Settings
-    CHROMADB_AVAILABLE = True
-except ImportError:
+# chromadb is imported when the collection is opened; importing this module
+# stays cheap. Entry points load .env and configure logging before importing it.
+CHROMADB_AVAILABLE = importlib.util.find_spec("chromadb") is not None
+if not CHROMADB_AVAILABLE:
     print("❌ ChromaDB not installed. Run: pip install chromadb")
-    CHROMADB_AVAILABLE = False
-
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    print("⚠️  sentence-transformers not available. Install with: pip install sentence-transformers")
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    print("⚠️  OpenAI not available. Install with: pip install openai")
-    OPENAI_AVAILABLE = False
+from embedding_providers import (
+    EmbeddingProvider,
+    LocalEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    get_embedding_provider,
+    import_provider_library,
+    with_embedding_store,
+    SENTENCE_TRANSFORMERS_AVAILABLE,
+    OPENAI_AVAILABLE
+)
+from embedding_store import StoreBackedProvider
+from bm25_index import BM25Index, reciprocal_rank_fusion, weighted_score_fusion
+from vector_backends import create_vector_backend, MetadataFilter, VECTOR_BACKEND
+from metrics import REGISTRY, stage_histogram
+from collection_versions import resolve_collection_version, alias_mtime, COLLECTION_ALIAS_FILE
+from index_config import hnsw_metadata, collection_space, distance_to_similarity, exact_nearest
+from chunk_fields import FILTER_FIELDS
+from chunk_offsets import ChunkOffsetIndex, MAX_CONTEXT_WINDOW
+from chunk_store import ChunkStore
+from result_cache import SemanticResultCache, context_key
+from reranker import (
+    CrossEncoderReranker, RERANK_MODEL_PATH, RERANK_DEFAULT, RERANK_CANDIDATES, RERANK_BUDGET_MS
+)
 
 # Configuration
 CHROMA_DIR = Path(__file__).parent.parent / "storage" / "index" / "chroma"
+CHUNKS_DIR = Path(__file__).parent.parent / "storage" / "chunks"
 COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "asker_fotball_docs")
-EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "local")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "3"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+SEARCH_MODES = ("vector", "bm25", "hybrid")
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "0.5"))
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "4"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "background")  # background, blocking or off
+# How often searches check the collection alias file for a new version (0 disables)
+COLLECTION_ALIAS_CHECK_SECONDS = float(os.getenv("COLLECTION_ALIAS_CHECK_SECONDS", "10"))
+# Filters matching at most this many chunks are scored exactly instead of searching the HNSW graph
+FILTER_EXACT_MAX_CANDIDATES = int(os.getenv("FILTER_EXACT_MAX_CANDIDATES", "500"))
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hot-path metrics (exposed by the API servers at /metrics)
+EMBED_SECONDS = stage_histogram("embed")
+QUERY_SECONDS = stage_histogram("query")
+FORMAT_SECONDS = stage_histogram("format")
+BM25_SECONDS = stage_histogram("bm25")
+RERANK_SECONDS = stage_histogram("rerank")
+FILTER_SECONDS = stage_histogram("filter")
+EXPAND_SECONDS = stage_histogram("expand")
+FILTERED_QUERIES = {
+    strategy: REGISTRY.counter("filtered_queries_total", "Filtered vector queries by how the filter was applied",
+                               strategy=strategy)
+    for strategy in ("exact", "hnsw", "empty")
+}
+RERANK_FALLBACKS = {
+    reason: REGISTRY.counter("rerank_fallbacks_total", "Re-ranking requests answered in first-stage order",
+                             reason=reason)
+    for reason in ("budget", "error", "unavailable")
+}
+SEARCH_SECONDS = {
+    mode: REGISTRY.histogram("search_duration_seconds", "End-to-end latency of search() in seconds", mode=mode)
+    for mode in SEARCH_MODES + ("batch",)
+}
+SEARCH_ERRORS = {
+    mode: REGISTRY.counter("search_errors_total", "Searches that failed and returned no results", mode=mode)
+    for mode in SEARCH_MODES + ("batch",)
+}
+SEARCH_EMPTY = {
+    mode: REGISTRY.counter("search_empty_results_total", "Searches that succeeded with zero results", mode=mode)
+    for mode in SEARCH_MODES
+}
+
 class ChromaDBSearchService:
-    """ChromaDB search service for semantic search"""
+    """
+    ChromaDB search service for semantic search
     
-    def __init__(self):
-        if not CHROMADB_AVAILABLE:
+    A collection (any object with the Chroma query/get/count interface) and
+    an embedding provider can be passed in, e.g. for offline benchmarks;
+    otherwise they are opened from the configuration.
+    """
+    
+    def __init__(self, collection=None, embedding_provider: Optional[EmbeddingProvider] = None):
+        if collection is None and not CHROMADB_AVAILABLE:
             raise ImportError("ChromaDB not available")
         
         self.client = None
-        self.collection = None
-        self.embedding_provider = None
+        self.collection = collection
+        self.collection_name = getattr(collection, "name", None)
+        self.synced_at = None
+        self.embedding_provider = embedding_provider
+        self.query_embedder = None
+        self.query_cache = QueryEmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        self.result_cache = SemanticResultCache()
+        self.reranker = None
+        self.bm25_index = None
+        self.chunk_store = None
+        self._bm25_lock = threading.Lock()
+        self.offset_index = None
+        self._offset_lock = threading.Lock()
+        self.filter_index = None
+        self._filter_lock = threading.Lock()
+        self.startup = StartupTimer()
+        self._warmup_thread = None
+        self._reload_lock = threading.Lock()
+        self._alias_mtime = None
+        self._alias_checked_at = time.monotonic()
         self._initialize()
     
     def _initialize(self):
         """Initialize ChromaDB client and collection"""
         try:
-            # Ensure Chroma directory exists
-            CHROMA_DIR.mkdir(parents=True, exist_ok=True)
+            # Heavy imports are deferred to here so their cost shows up in the report
+            with self.startup.phase("imports"):
+                if self.collection is None:
+                    import chromadb
+                if self.embedding_provider is None:
+                    import_provider_library()
             
-            # Initialize Chroma client
-            self.client = chromadb.PersistentClient(
-                path=str(CHROMA_DIR),
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
-                )
-            )
+            if self.collection is None:
+                with self.startup.phase("client_open"):
+                    self._open_collection()
             
-            # Get or create collection
-            try:
-                self.collection = self.client.get_collection(COLLECTION_NAME)
-                logger.info(f"✅ Connected to existing collection: {COLLECTION_NAME}")
-            except Exception:
-                self.collection = self.client.create_collection(
-                    name=COLLECTION_NAME,
-                    metadata={"description": "Asker Fotball documentation chunks"}
+            # Initialize embedding provider
+            if self.embedding_provider is None:
+                with self.startup.phase("model_load"):
+                    self.embedding_provider = self._get_embedding_provider()
+            query_embedder = self.embedding_provider
+            if MICROBATCH_ENABLED:
+                query_embedder = MicroBatcher(
+                    self.embedding_provider,
+                    window_ms=MICROBATCH_WINDOW_MS,
+                    max_batch_size=MICROBATCH_MAX_SIZE
                 )
-                logger.info(f"✅ Created new collection: {COLLECTION_NAME}")
+                logger.info(f"✅ Query micro-batching enabled ({MICROBATCH_WINDOW_MS} ms window, max {MICROBATCH_MAX_SIZE})")
             
-            # Initialize embedding provider
-            self.embedding_provider = self._get_embedding_provider()
+            # Read through the persistent embedding store without writing queries into it
+            self.query_embedder = with_embedding_store(query_embedder, write_back=False)
+            
+            # Re-ranking is optional: a missing model disables it instead of failing startup
+            if RERANK_MODEL_PATH:
+                try:
+                    with self.startup.phase("reranker_load"):
+                        self.reranker = CrossEncoderReranker(RERANK_MODEL_PATH)
+                except Exception as e:
+                    logger.warning(f"⚠️  Cross-encoder re-ranking disabled: {e}")
             
+            self._start_warmup()
+        
         except Exception as e:
             logger.error(f"❌ Failed to initialize ChromaDB service: {e}")
             raise
     
+    def _start_warmup(self):
+        """Warm up the embedding model according to EMBEDDING_WARMUP, then log the startup report"""
+        if EMBEDDING_WARMUP == "blocking":
+            self._warmup()
+        elif EMBEDDING_WARMUP == "background":
+            self._warmup_thread = threading.Thread(target=self._warmup, name="embedding-warmup", daemon=True)
+            self._warmup_thread.start()
+        else:
+            self.startup.log()
+    
+    def _warmup(self):
+        try:
+            with self.startup.phase("warmup"):
+                self.embedding_provider.warmup()
+                if self.reranker is not None:
+                    self.reranker.warmup()
+                # Postings for the filterable fields, so the first filtered search does not build them
+                self.get_filter_index()
+        except Exception as e:
+            logger.warning(f"⚠️  Embedding warm-up failed: {e}")
+        self.startup.log()
+    
+    def wait_for_warmup(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background warm-up has finished; returns False on timeout"""
+        thread = self._warmup_thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+    
+    def _open_collection(self):
+        """Open the Chroma client and collection, and wrap it in the vector backend"""
+        import chromadb
+        from chromadb.config import Settings
+        
+        # Ensure Chroma directory exists
+        CHROMA_DIR.mkdir(parents=True, exist_ok=True)
+        
+        # Initialize Chroma client
+        self.client = chromadb.PersistentClient(
+            path=str(CHROMA_DIR),
+            settings=Settings(
+                anonymized_telemetry=False,
+                allow_reset=True
+            )
+        )
+        self._alias_mtime = alias_mtime()
+        self.collection_name, self.synced_at, self.collection = self._load_collection()
+    
+    def _load_collection(self):
+        """Resolve the collection alias and open the live version with the configured backend"""
+        name, synced_at = resolve_collection_version(COLLECTION_NAME)
+        
+        # Get or create collection
+        try:
+            collection = self.client.get_collection(name)
+            logger.info(f"✅ Connected to existing collection: {name}")
+        except Exception:
+            if name != COLLECTION_NAME:
+                # The alias points at a version that does not exist; never create it empty
+                raise
+            collection = self.client.create_collection(
+                name=COLLECTION_NAME,
+                metadata={"description": "Asker Fotball documentation chunks", **hnsw_metadata()}
+            )
+            logger.info(f"✅ Created new collection: {COLLECTION_NAME}")
+        
+        # Swap in the configured vector backend (Chroma or exact NumPy)
+        if VECTOR_BACKEND != "chroma":
+            collection = create_vector_backend(collection, VECTOR_BACKEND, synced_at=synced_at)
+            logger.info(f"✅ Using {VECTOR_BACKEND} vector backend")
+        return name, synced_at, collection
+    
+    def reload(self) -> Dict[str, Any]:
+        """
+        Switch to the collection version the alias currently points at
+        
+        The new version is opened (and loaded into the vector backend) before
+        the handle is swapped, so searches keep using the old version until
+        the new one is ready. An incremental sync keeps the version but moves
+        its sync marker; it is reopened the same way. Derived indexes are
+        rebuilt lazily.
+        """
+        if self.client is None:
+            return {"changed": False, "collection": self.collection_name, "reason": "collection was injected"}
+        
+        with self._reload_lock:
+            self._alias_mtime = alias_mtime()
+            previous, previous_synced_at = self.collection_name, self.synced_at
+            name, synced_at = resolve_collection_version(COLLECTION_NAME)
+            if name == previous and synced_at == previous_synced_at:
+                return {"changed": False, "collection": name}
+            
+            started = time.perf_counter()
+            name, synced_at, collection = self._load_collection()
+            self.collection_name, self.synced_at, self.collection = name, synced_at, collection
+            self._reset_derived_indexes()
+            # Cached result lists refer to the old version's chunks, or to the
+            # chunks as they were before the sync
+            self.result_cache.clear()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if name == previous:
+                logger.info(f"🔄 Reloaded {name} after a sync ({previous_synced_at} → {synced_at}) in {elapsed_ms:.0f} ms")
+            else:
+                logger.info(f"🔄 Switched collection {previous} → {name} in {elapsed_ms:.0f} ms")
+            return {"changed": True, "previous": previous, "collection": name, "synced_at": synced_at,
+                    "reload_ms": round(elapsed_ms, 1)}
+    
+    def _reset_derived_indexes(self):
+        """Drop the BM25 index, chunk store, filter postings and offset index; they are rebuilt on next use"""
+        with self._bm25_lock:
+            self.bm25_index = None
+            self.chunk_store = None
+        with self._filter_lock:
+            self.filter_index = None
+        with self._offset_lock:
+            if self.offset_index is not None:
+                self.offset_index.close()
+            self.offset_index = None
+    
+    def _check_alias(self):
+        """Reload when the alias file changed; stats the file at most every COLLECTION_ALIAS_CHECK_SECONDS"""
+        if COLLECTION_ALIAS_CHECK_SECONDS <= 0 or self.client is None:
+            return
+        now = time.monotonic()
+        if now - self._alias_checked_at < COLLECTION_ALIAS_CHECK_SECONDS:
+            return
+        self._alias_checked_at = now
+        if alias_mtime() != self._alias_mtime and not self._reload_lock.locked():
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"❌ Collection reload failed, keeping {self.collection_name}: {e}")
+    
+    def after_fork(self):
+        """
+        Repair per-process state in a worker forked from a preloaded master
+        
+        Model weights and NumPy indexes are shared copy-on-write, but SQLite
+        connections and background threads do not survive fork: the Chroma
+        client is reopened and the micro-batcher thread restarted.
+        """
+        if self.client is not None and VECTOR_BACKEND == "chroma":
+            try:
+                from chromadb.api.client import SharedSystemClient
+                SharedSystemClient.clear_system_cache()
+            except (ImportError, AttributeError):
+                pass
+            self._open_collection()
+        
+        embedder = self.query_embedder
+        if isinstance(embedder, StoreBackedProvider):
+            embedder = embedder.provider
+        if isinstance(embedder, MicroBatcher):
+            embedder.restart()
+    
     def _get_embedding_provider(self):
         """Get the appropriate embedding provider"""
-        if EMBEDDING_PROVIDER == "openai":
-            try:
-                return OpenAIEmbeddingProvider(OPENAI_API_KEY, OPENAI_MODEL)
-            except (ImportError, ValueError) as e:
-                logger.warning(f"⚠️  OpenAI provider failed: {e}")
-                logger.info("🔄 Falling back to local embeddings...")
-                return LocalEmbeddingProvider()
-        else:
-            return LocalEmbeddingProvider()
+        return get_embedding_provider()
     
-    def search(self, query: str, max_results: int = 5, filter_metadata: Optional[Dict] = None) -> List[Dict[str, Any]]:
+    def search(self, query: str, max_results: int = 5, filter_metadata: Optional[Dict] = None,
+               mode: str = "vector", rerank: Optional[bool] = None,
+               rerank_budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         Search for similar chunks using semantic similarity
         
@@ -112,51 +349,464 @@ class ChromaDBSearchService:
             query: Search query
             max_results: Maximum number of results to return
             filter_metadata: Optional metadata filters
-            
+            mode: "vector" (semantic), "bm25" (lexical) or "hybrid" (fused)
+            rerank: Re-rank candidates with the cross-encoder (default RERANK_DEFAULT)
+            rerank_budget_ms: Time budget for re-ranking (default RERANK_BUDGET_MS)
+        
         Returns:
             List of search results with metadata
         """
+        if mode not in SEARCH_MODES:
+            mode = "vector"
+        use_rerank = self._wants_rerank(rerank)
+        self._check_alias()
+        started = time.perf_counter()
         try:
             if not self.collection:
                 raise RuntimeError("Collection not initialized")
             
-            # Generate query embedding
-            query_embedding = self.embedding_provider.embed([query])[0]
+            # Near-duplicate queries are answered from the semantic result cache
+            query_embedding = None
+            cache_context = None
+            if mode != "bm25" and self.result_cache.enabled:
+                query_embedding = self._embed_query(query)
+                cache_context = context_key(mode, filter_metadata, use_rerank)
+                cached = self.result_cache.get(query_embedding, cache_context, max_results)
+                if cached is not None:
+                    logger.info(f"🔍 Served {len(cached)} cached {mode} search results for query: {query[:50]}...")
+                    return cached
             
-            # Search in ChromaDB
-            search_results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=max_results,
-                where=filter_metadata,
-                include=["documents", "metadatas", "distances"]
-            )
+            # Re-ranking fetches a deeper candidate list and cuts it back afterwards
+            n_candidates = max(max_results, RERANK_CANDIDATES) if use_rerank else max_results
+            if mode == "hybrid":
+                results = self._hybrid_search(query, n_candidates, filter_metadata, query_embedding)
+            elif mode == "bm25":
+                results = self._bm25_search(query, n_candidates, filter_metadata)
+            else:
+                results = self._vector_search(query, n_candidates, filter_metadata, query_embedding)
             
-            # Format results
-            results = []
-            if search_results['documents'] and search_results['documents'][0]:
-                for i, (doc, metadata, distance) in enumerate(zip(
-                    search_results['documents'][0],
-                    search_results['metadatas'][0],
-                    search_results['distances'][0]
-                )):
-                    # Convert distance to similarity score (lower distance = higher similarity)
-                    similarity_score = 1.0 - distance
-                    
-                    result = {
-                        'chunk_id': metadata.get('chunk_id', f'unknown_{i}'),
-                        'content': doc,
-                        'metadata': metadata,
-                        'similarity_score': similarity_score,
-                        'distance': distance
-                    }
-                    results.append(result)
+            if use_rerank:
+                budget_ms = RERANK_BUDGET_MS if rerank_budget_ms is None else rerank_budget_ms
+                results = self._rerank(query, results, budget_ms)[:max_results]
             
-            logger.info(f"🔍 Found {len(results)} semantic search results for query: {query[:50]}...")
-            return results
+            # A re-ranking that fell back to first-stage order is not cached, so it is retried
+            if cache_context is not None and results and (not use_rerank or 'rerank_score' in results[0]):
+                self.result_cache.put(query_embedding, cache_context, max_results, results)
             
+            if not results:
+                SEARCH_EMPTY[mode].inc()
+            logger.info(f"🔍 Found {len(results)} {mode} search results for query: {query[:50]}...")
+            return results
+        
         except Exception as e:
+            SEARCH_ERRORS[mode].inc()
             logger.error(f"❌ Search failed: {e}")
             return []
+        finally:
+            SEARCH_SECONDS[mode].observe(time.perf_counter() - started)
+    
+    def _wants_rerank(self, rerank: Optional[bool]) -> bool:
+        """Whether a search should be re-ranked; counts requests that cannot be"""
+        if not (RERANK_DEFAULT if rerank is None else rerank):
+            return False
+        if self.reranker is None:
+            RERANK_FALLBACKS["unavailable"].inc()
+            return False
+        return True
+    
+    def _rerank(self, query: str, results: List[Dict[str, Any]], budget_ms: float) -> List[Dict[str, Any]]:
+        """Re-rank results with the cross-encoder, keeping their order if it fails or runs out of time"""
+        if len(results) < 2:
+            return results
+        try:
+            with RERANK_SECONDS.time():
+                reranked, info = self.reranker.rerank(query, results, budget_ms)
+        except Exception as e:
+            RERANK_FALLBACKS["error"].inc()
+            logger.error(f"❌ Re-ranking failed, keeping first-stage order: {e}")
+            return results
+        if not info["reranked"]:
+            RERANK_FALLBACKS["budget"].inc()
+            logger.info(f"⏱️  Re-ranking budget of {budget_ms:.0f} ms exhausted, keeping first-stage order")
+        return reranked
+    
+    def _vector_search(self, query: str, max_results: int, filter_metadata: Optional[Dict],
+                       query_embedding: Optional[List[float]] = None,
+                       candidate_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Semantic search in ChromaDB"""
+        # Generate query embedding
+        if query_embedding is None:
+            query_embedding = self._embed_query(query)
+        
+        # Search in ChromaDB
+        search_results = self._query([query_embedding], max_results, filter_metadata, candidate_ids)
+        
+        # Format results
+        with FORMAT_SECONDS.time():
+            return self._format_results(search_results, 0)
+    
+    def _bm25_search(self, query: str, max_results: int, filter_metadata: Optional[Dict]) -> List[Dict[str, Any]]:
+        """Lexical search with the in-process BM25 index"""
+        # Only chunks matching the filter are scored; filters the index cannot
+        # evaluate are applied afterwards, so over-fetch for those
+        candidate_ids = self._filter_candidates(filter_metadata)
+        post_filter = filter_metadata if candidate_ids is None else None
+        limit = max_results * HYBRID_CANDIDATES if post_filter else max_results
+        index = self.get_bm25_index()
+        with BM25_SECONDS.time():
+            hits = index.search(query, limit, allowed=candidate_ids)
+        documents = self._get_documents([doc_id for doc_id, _ in hits], post_filter)
+        
+        results = []
+        for doc_id, score in hits:
+            if doc_id not in documents:
+                continue
+            result = dict(documents[doc_id])
+            result.update({'similarity_score': score, 'bm25_score': score})
+            results.append(result)
+        return results[:max_results]
+    
+    def _hybrid_search(self, query: str, max_results: int, filter_metadata: Optional[Dict],
+                       query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Fuse vector and BM25 rankings in one process"""
+        n_candidates = max_results * HYBRID_CANDIDATES
+        candidate_ids = self._filter_candidates(filter_metadata)
+        post_filter = filter_metadata if candidate_ids is None else None
+        vector_results = self._vector_search(query, n_candidates, filter_metadata, query_embedding, candidate_ids)
+        index = self.get_bm25_index()
+        with BM25_SECONDS.time():
+            bm25_hits = index.search(query, n_candidates, allowed=candidate_ids)
+        
+        vector_scores = {r['chunk_id']: r['similarity_score'] for r in vector_results}
+        bm25_scores = dict(bm25_hits)
+        if HYBRID_FUSION == "weighted":
+            fused = weighted_score_fusion(
+                [vector_scores, bm25_scores],
+                [HYBRID_VECTOR_WEIGHT, 1.0 - HYBRID_VECTOR_WEIGHT]
+            )
+        else:
+            fused = reciprocal_rank_fusion(
+                [[r['chunk_id'] for r in vector_results], [doc_id for doc_id, _ in bm25_hits]],
+                k=RRF_K,
+                weights=[HYBRID_VECTOR_WEIGHT * 2, (1.0 - HYBRID_VECTOR_WEIGHT) * 2]
+            )
+        
+        # Lexical-only hits still need their document and metadata
+        documents = {r['chunk_id']: r for r in vector_results}
+        missing = [doc_id for doc_id in bm25_scores if doc_id not in documents]
+        documents.update(self._get_documents(missing, post_filter))
+        
+        results = []
+        for doc_id, score in sorted(fused.items(), key=lambda item: item[1], reverse=True):
+            if doc_id not in documents:
+                # Filtered out by filter_metadata
+                continue
+            result = dict(documents[doc_id])
+            result.update({
+                'similarity_score': score,
+                'hybrid_score': score,
+                'vector_score': vector_scores.get(doc_id),
+                'bm25_score': bm25_scores.get(doc_id)
+            })
+            result.setdefault('distance', None)
+            results.append(result)
+            if len(results) >= max_results:
+                break
+        return results
+    
+    def _get_documents(self, ids: List[str], filter_metadata: Optional[Dict]) -> Dict[str, Dict[str, Any]]:
+        """Fetch documents and metadata for chunk ids, applying filter_metadata"""
+        if not ids:
+            return {}
+        documents = {}
+        # Unfiltered lookups are served from the resident chunk store when it has the chunk
+        if not filter_metadata and self.chunk_store is not None:
+            for chunk_id in ids:
+                row = self.chunk_store.row(chunk_id)
+                if row is not None:
+                    documents[chunk_id] = {**self.chunk_store.get(row), 'distance': None}
+            ids = [chunk_id for chunk_id in ids if chunk_id not in documents]
+            if not ids:
+                return documents
+        fetched = self.collection.get(ids=ids, where=filter_metadata, include=["documents", "metadatas"])
+        for chunk_id, doc, metadata in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+            documents[chunk_id] = {
+                'chunk_id': metadata.get('chunk_id', chunk_id),
+                'content': doc,
+                'metadata': metadata,
+                'distance': None
+            }
+        return documents
+    
+    def get_bm25_index(self) -> BM25Index:
+        """
+        Load the collection into the chunk store and build the BM25 index over it on first use
+        
+        Only chunks stored in the collection are indexed: near-duplicates that
+        ingest collapsed into a representative (and chunks not embedded yet)
+        have no collection metadata and are cited through the representative.
+        The store keeps the stored metadata as is, so results served from it
+        match results fetched from the collection.
+        """
+        if self.bm25_index is None:
+            with self._bm25_lock:
+                if self.bm25_index is None:
+                    self.chunk_store = ChunkStore.from_collection(self.collection)
+                    self.bm25_index = BM25Index.from_documents(self.chunk_store.documents())
+                    logger.info(f"✅ Built BM25 index: {len(self.bm25_index)} chunks, "
+                                f"{len(self.bm25_index.vocabulary)} terms")
+        return self.bm25_index
+    
+    def get_offset_index(self) -> ChunkOffsetIndex:
+        """Open (or build) the byte-offset index over storage/chunks on first use"""
+        if self.offset_index is None:
+            with self._offset_lock:
+                if self.offset_index is None:
+                    self.offset_index = ChunkOffsetIndex.open(CHUNKS_DIR)
+        return self.offset_index
+    
+    def expand_results(self, results: List[Dict[str, Any]], window: int) -> List[Dict[str, Any]]:
+        """Copies of results with the chunks up to window positions before and after each hit under 'neighbors'"""
+        window = min(window, MAX_CONTEXT_WINDOW)
+        if window <= 0 or not results:
+            return results
+        index = self.get_offset_index()
+        with EXPAND_SECONDS.time():
+            expanded = []
+            for result in results:
+                item = dict(result)
+                item['neighbors'] = index.neighbors(result['chunk_id'], window)
+                expanded.append(item)
+            return expanded
+    
+    def expand_batch(self, queries: List[Dict[str, Any]],
+                     batch_results: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """expand_results for each batch query with its own 'window'"""
+        return [self.expand_results(results, q.get('window', 0)) for q, results in zip(queries, batch_results)]
+    
+    def get_chunks(self, chunk_ids: List[str], window: int = 0) -> List[Optional[Dict[str, Any]]]:
+        """Chunks by id from the offset index, each with its neighbours; None for unknown ids"""
+        index = self.get_offset_index()
+        window = min(window, MAX_CONTEXT_WINDOW)
+        chunks = []
+        with EXPAND_SECONDS.time():
+            for chunk_id in chunk_ids:
+                chunk = index.get(chunk_id)
+                if chunk is None:
+                    chunks.append(None)
+                    continue
+                chunks.append({
+                    'chunk_id': chunk['chunk_id'],
+                    'content': chunk.get('content'),
+                    'metadata': {key: chunk.get(key) for key in ('title', 'url', 'idx', 'total_chunks')},
+                    'neighbors': index.neighbors(chunk_id, window)
+                })
+        return chunks
+    
+    def get_filter_index(self):
+        """
+        (ids, MetadataFilter) over the metadata of every chunk in the collection
+        
+        The NumPy backends keep their own; for Chroma the metadata is loaded
+        once, with postings for FILTER_FIELDS built up front, and dropped by
+        reload() when the alias moves to a new version or sync marker.
+        """
+        if isinstance(getattr(self.collection, "filter", None), MetadataFilter):
+            return self.collection.ids, self.collection.filter
+        
+        if self.filter_index is None:
+            with self._filter_lock:
+                if self.filter_index is None:
+                    started = time.perf_counter()
+                    data = self.collection.get(include=["metadatas"])
+                    metadatas = [m or {} for m in data["metadatas"]]
+                    self.filter_index = (list(data["ids"]), MetadataFilter(metadatas, fields=FILTER_FIELDS))
+                    logger.info(f"✅ Built metadata filter index over {len(metadatas)} chunks "
+                                f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return self.filter_index
+    
+    def _filter_candidates(self, filter_metadata: Optional[Dict]) -> Optional[List[str]]:
+        """Ids of the chunks matching filter_metadata, or None when there is no filter or it cannot be evaluated here"""
+        if not filter_metadata:
+            return None
+        try:
+            with FILTER_SECONDS.time():
+                ids, metadata_filter = self.get_filter_index()
+                return [ids[row] for row in metadata_filter.rows(filter_metadata)]
+        except Exception as e:
+            logger.warning(f"⚠️  Metadata filter index cannot evaluate {filter_metadata}, leaving it to the collection: {e}")
+            return None
+    
+    def _query(self, query_embeddings: List[List[float]], n_results: int, filter_metadata: Optional[Dict],
+               candidate_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Nearest neighbours of each query embedding as a Chroma query response
+        
+        The NumPy backends restrict scoring to filtered rows themselves. For
+        Chroma, the filter index resolves the matching chunks first: none
+        means no query at all, a few (up to FILTER_EXACT_MAX_CANDIDATES) are
+        fetched and scored exactly, and only broad filters go to the HNSW
+        search as a where-clause.
+        """
+        if filter_metadata and not isinstance(getattr(self.collection, "filter", None), MetadataFilter):
+            if candidate_ids is None:
+                candidate_ids = self._filter_candidates(filter_metadata)
+            if candidate_ids is not None and not candidate_ids:
+                FILTERED_QUERIES["empty"].inc()
+                return {key: [[] for _ in query_embeddings] for key in ("ids", "documents", "metadatas", "distances")}
+            if candidate_ids is not None and len(candidate_ids) <= FILTER_EXACT_MAX_CANDIDATES:
+                FILTERED_QUERIES["exact"].inc()
+                with QUERY_SECONDS.time():
+                    return self._exact_query(query_embeddings, n_results, candidate_ids)
+            FILTERED_QUERIES["hnsw"].inc()
+        
+        with QUERY_SECONDS.time():
+            return self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=filter_metadata,
+                include=["documents", "metadatas", "distances"]
+            )
+    
+    def _exact_query(self, query_embeddings: List[List[float]], n_results: int,
+                     candidate_ids: List[str]) -> Dict[str, Any]:
+        """Score the candidate chunks exactly, in the collection's distance space"""
+        fetched = self.collection.get(ids=candidate_ids, include=["embeddings", "documents", "metadatas"])
+        space = collection_space(self.collection)
+        response = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_embedding in query_embeddings:
+            positions, distances = exact_nearest(fetched["embeddings"], query_embedding, space, n_results)
+            response["ids"].append([fetched["ids"][p] for p in positions])
+            response["documents"].append([fetched["documents"][p] for p in positions])
+            response["metadatas"].append([fetched["metadatas"][p] for p in positions])
+            response["distances"].append(distances)
+        return response
+    
+    def search_batch(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries with one embedding call and as few
+        collection queries as possible
+        
+        Args:
+            queries: List of dicts with 'query' and optional 'max_results',
+                'filter_metadata', 'mode', 'rerank' and 'rerank_budget_ms'
+        
+        Returns:
+            One result list per query, in input order
+        """
+        if not self.collection:
+            raise RuntimeError("Collection not initialized")
+        if not queries:
+            return []
+        
+        self._check_alias()
+        with SEARCH_SECONDS["batch"].time():
+            return self._search_batch(queries)
+    
+    def _search_batch(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        # Generate the query embeddings in a single provider call; this also
+        # warms the query cache for hybrid queries answered below. Lexical
+        # (bm25) queries need no vector and are left out
+        embeddings: List[Optional[List[float]]] = [None] * len(queries)
+        vector_indices = [i for i, q in enumerate(queries) if q.get('mode', 'vector') != 'bm25']
+        if vector_indices:
+            computed = self._embed_queries([queries[i]['query'] for i in vector_indices])
+            for i, embedding in zip(vector_indices, computed):
+                embeddings[i] = embedding
+        
+        batch_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        
+        # Chroma accepts one where-clause per query call, so group by filter
+        groups: Dict[str, List[int]] = {}
+        for i, q in enumerate(queries):
+            mode = q.get('mode', 'vector')
+            if mode != 'vector' or (RERANK_DEFAULT if q.get('rerank') is None else q['rerank']):
+                batch_results[i] = self.search(
+                    q['query'], q.get('max_results', 5), q.get('filter_metadata'), mode=mode,
+                    rerank=q.get('rerank'), rerank_budget_ms=q.get('rerank_budget_ms')
+                )
+                continue
+            cached = self.result_cache.get(
+                embeddings[i], context_key('vector', q.get('filter_metadata'), False), q.get('max_results', 5)
+            )
+            if cached is not None:
+                batch_results[i] = cached
+                continue
+            filter_key = json.dumps(q.get('filter_metadata'), sort_keys=True)
+            groups.setdefault(filter_key, []).append(i)
+        
+        for indices in groups.values():
+            filter_metadata = queries[indices[0]].get('filter_metadata')
+            n_results = max(queries[i].get('max_results', 5) for i in indices)
+            try:
+                search_results = self._query([embeddings[i] for i in indices], n_results, filter_metadata)
+            except Exception as e:
+                SEARCH_ERRORS["batch"].inc()
+                logger.error(f"❌ Batch search failed for filter {filter_metadata}: {e}")
+                continue
+            
+            with FORMAT_SECONDS.time():
+                for row, i in enumerate(indices):
+                    max_results = queries[i].get('max_results', 5)
+                    batch_results[i] = self._format_results(search_results, row)[:max_results]
+                    if batch_results[i]:
+                        self.result_cache.put(
+                            embeddings[i], context_key('vector', filter_metadata, False), max_results, batch_results[i]
+                        )
+        
+        logger.info(f"🔍 Batch search completed for {len(queries)} queries in {len(groups)} collection queries")
+        return batch_results
+    
+    def _format_results(self, search_results: Dict[str, Any], row: int) -> List[Dict[str, Any]]:
+        """Format one row of a Chroma query response as search results"""
+        results = []
+        if not search_results['documents'] or not search_results['documents'][row]:
+            return results
+        
+        ids = search_results.get('ids') or [[]]
+        space = collection_space(self.collection)
+        for i, (doc, metadata, distance) in enumerate(zip(
+            search_results['documents'][row],
+            search_results['metadatas'][row],
+            search_results['distances'][row]
+        )):
+            # Convert distance to similarity score according to the collection's distance space
+            similarity_score = distance_to_similarity(distance, space)
+            
+            fallback_id = ids[row][i] if row < len(ids) and i < len(ids[row]) else f'unknown_{i}'
+            result = {
+                'chunk_id': metadata.get('chunk_id', fallback_id),
+                'content': doc,
+                'metadata': metadata,
+                'similarity_score': similarity_score,
+                'distance': distance
+            }
+            results.append(result)
+        return results
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several queries, sending only cache misses to the provider"""
+        with EMBED_SECONDS.time():
+            keys = [self.query_cache.make_key(q, self.embedding_provider) for q in queries]
+            embeddings = [self.query_cache.get(key) for key in keys]
+            
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                computed = self.query_embedder.embed([queries[i] for i in missing])
+                for i, embedding in zip(missing, computed):
+                    embeddings[i] = embedding
+                    self.query_cache.put(keys[i], embedding)
+            return embeddings
+    
+    def _embed_query(self, query: str) -> List[float]:
+        """Embed a single query, reusing cached vectors for repeated questions"""
+        with EMBED_SECONDS.time():
+            key = self.query_cache.make_key(query, self.embedding_provider)
+            embedding = self.query_cache.get(key)
+            if embedding is None:
+                embedding = self.query_embedder.embed([query])[0]
+                self.query_cache.put(key, embedding)
+            return embedding
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get collection statistics"""
@@ -165,12 +815,43 @@ class ChromaDBSearchService:
                 return {"error": "Collection not initialized"}
             
             count = self.collection.count()
-            return {
+            stats = {
                 "collection_name": COLLECTION_NAME,
+                "collection_version": self.collection_name,
+                "synced_at": self.synced_at,
                 "total_chunks": count,
                 "embedding_provider": self.embedding_provider.__class__.__name__,
-                "chroma_path": str(CHROMA_DIR)
+                "chroma_path": str(CHROMA_DIR),
+                "vector_backend": VECTOR_BACKEND,
+                "index_settings": {
+                    key: value for key, value in (getattr(self.collection, "metadata", None) or {}).items()
+                    if key.startswith("hnsw:")
+                },
+                "query_cache": self.query_cache.stats(),
+                "result_cache": self.result_cache.stats(),
+                "startup": self.startup.report()
             }
+            embedder = self.query_embedder
+            if isinstance(embedder, StoreBackedProvider):
+                stats["embedding_store"] = embedder.store.stats()
+                embedder = embedder.provider
+            if isinstance(embedder, MicroBatcher):
+                stats["micro_batching"] = embedder.stats()
+            if self.bm25_index is not None:
+                stats["bm25_index"] = self.bm25_index.stats()
+            if self.chunk_store is not None:
+                stats["chunk_store"] = self.chunk_store.stats()
+            if self.filter_index is not None or isinstance(getattr(self.collection, "filter", None), MetadataFilter):
+                ids, metadata_filter = self.get_filter_index()
+                stats["filter_index"] = {
+                    "chunks": len(ids),
+                    "fields": {field: len(metadata_filter.postings(field)) for field in FILTER_FIELDS}
+                }
+            if self.reranker is not None:
+                stats["reranker"] = self.reranker.stats()
+            if self.offset_index is not None:
+                stats["offset_index"] = self.offset_index.stats()
+            return stats
         except Exception as e:
             logger.error(f"❌ Failed to get collection stats: {e}")
             return {"error": str(e)}
@@ -192,65 +873,291 @@ class ChromaDBSearchService:
                 "chromadb_available": CHROMADB_AVAILABLE
             }
 
-class EmbeddingProvider:
-    """Base class for embedding providers"""
+class StartupTimer:
+    """Wall-clock duration of each startup phase, for cold-start budgeting"""
     
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts"""
-        raise NotImplementedError
+    def __init__(self):
+        self.phases: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as the named phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.phases[name] = round(elapsed_ms, 1)
+    
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = dict(self.phases)
+        return {
+            "phases_ms": phases,
+            "total_ms": round(sum(phases.values()), 1)
+        }
+    
+    def log(self):
+        report = self.report()
+        phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report["phases_ms"].items())
+        logger.info(f"⏱️  Startup: {phases} (total {report['total_ms']:.0f} ms)")
 
-class LocalEmbeddingProvider(EmbeddingProvider):
-    """Local embedding provider using sentence-transformers"""
+class QueryEmbeddingCache:
+    """Bounded, thread-safe LRU cache of query embeddings with TTL expiry"""
     
-    def __init__(self):
-        if not SENTENCE_TRANSFORMERS_AVAILABLE:
-            raise ImportError("sentence-transformers not available")
-        
-        logger.info("🔄 Loading local embedding model...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        logger.info("✅ Local embedding model loaded")
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
     
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using sentence-transformers"""
-        return self.model.encode(texts).tolist()
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalize query text so trivial variations share a cache entry"""
+        return " ".join(query.lower().split())
+    
+    def make_key(self, query: str, provider: "EmbeddingProvider") -> tuple:
+        """Build a cache key from normalized query text, provider and model"""
+        return (
+            provider.__class__.__name__,
+            getattr(provider, "model_name", ""),
+            self.normalize(query)
+        )
+    
+    def get(self, key: tuple) -> Optional[List[float]]:
+        """Return the cached embedding for key, or None on miss/expiry"""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, embedding = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+    
+    def put(self, key: tuple, embedding: List[float]):
+        """Store an embedding, evicting the least recently used entry when full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all cached embeddings"""
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
 
-class OpenAIEmbeddingProvider(EmbeddingProvider):
-    """OpenAI embedding provider"""
+class MicroBatcher:
+    """
+    Collects concurrent embed() calls into shared provider batches
     
-    def __init__(self, api_key: str, model: str = "text-embedding-3-small"):
-        if not OPENAI_AVAILABLE:
-            raise ImportError("OpenAI library not available")
-        
-        if not api_key or api_key == "your_openai_api_key_here":
-            raise ValueError("OpenAI API key not set")
-        
-        self.client = openai.OpenAI(api_key=api_key)
-        self.model = model
-        logger.info(f"✅ OpenAI client initialized with model: {model}")
+    Requests arriving within window_ms of the first queued request (or until
+    max_batch_size texts are queued) are encoded with a single provider call,
+    and each caller receives its own slice of the result.
+    """
+    
+    HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+    
+    def __init__(self, provider: "EmbeddingProvider", window_ms: float = 3, max_batch_size: int = 32):
+        self.provider = provider
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.batches = 0
+        self.requests = 0
+        self.max_queue_depth = 0
+        self.batch_size_histogram = {bucket: 0 for bucket in self.HISTOGRAM_BUCKETS}
+        self.batch_size_histogram[f">{self.HISTOGRAM_BUCKETS[-1]}"] = 0
+        self.restart()
+    
+    def restart(self):
+        """Start (or, after fork, recreate) the queue and worker thread"""
+        self._queue: List[tuple] = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-microbatcher", daemon=True)
+        self._worker.start()
+    
+    @property
+    def model_name(self) -> str:
+        return getattr(self.provider, "model_name", "")
     
     def embed(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using OpenAI API"""
-        response = self.client.embeddings.create(
-            model=self.model,
-            input=texts
-        )
-        return [data.embedding for data in response.data]
+        """Queue texts for the next batch and wait for their embeddings"""
+        if not texts:
+            return []
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Micro-batcher is closed")
+            self._queue.append((list(texts), future))
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return future.result()
+    
+    def close(self):
+        """Stop the worker thread after draining queued requests"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join(timeout=5)
+    
+    def _take_batch(self) -> List[tuple]:
+        """Wait for the first request, then gather more until the window closes"""
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return []
+            
+            deadline = time.monotonic() + self.window_seconds
+            while not self._closed and self._queued_texts() < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            
+            batch = [self._queue.pop(0)]
+            size = len(batch[0][0])
+            while self._queue and size + len(self._queue[0][0]) <= self.max_batch_size:
+                item = self._queue.pop(0)
+                size += len(item[0])
+                batch.append(item)
+            return batch
+    
+    def _queued_texts(self) -> int:
+        return sum(len(texts) for texts, _ in self._queue)
+    
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            self._record_batch(len(texts))
+            try:
+                embeddings = self.provider.embed(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(embeddings[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+    
+    def _record_batch(self, size: int):
+        with self._condition:
+            self.batches += 1
+            for bucket in self.HISTOGRAM_BUCKETS:
+                if size <= bucket:
+                    self.batch_size_histogram[bucket] += 1
+                    break
+            else:
+                self.batch_size_histogram[f">{self.HISTOGRAM_BUCKETS[-1]}"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and batch-size counters"""
+        with self._condition:
+            return {
+                "window_ms": self.window_seconds * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_requests": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                # Non-cumulative counts keyed by bucket upper bound
+                "batch_size_histogram": {str(bucket): count for bucket, count in self.batch_size_histogram.items()}
+            }
 
 # Global service instance
 _service_instance = None
+_service_lock = threading.Lock()
 
 def get_chromadb_service() -> ChromaDBSearchService:
     """Get or create the global ChromaDB service instance"""
     global _service_instance
     if _service_instance is None:
-        _service_instance = ChromaDBSearchService()
+        # Concurrent first requests must not each load the model
+        with _service_lock:
+            if _service_instance is None:
+                _service_instance = ChromaDBSearchService()
     return _service_instance
 
+def _collect_query_cache_metrics() -> List[tuple]:
+    """Query cache hits and misses, read from the cache's own counters at scrape time"""
+    if _service_instance is None:
+        return []
+    stats = _service_instance.query_cache.stats()
+    name = "query_cache_lookups_total"
+    return [(name, {"result": "hit"}, stats["hits"]), (name, {"result": "miss"}, stats["misses"])]
+
+REGISTRY.add_collector(
+    "query_cache_lookups_total", "counter",
+    "Query embedding cache lookups by result",
+    _collect_query_cache_metrics
+)
+
+def _collect_result_cache_metrics() -> List[tuple]:
+    """Semantic result cache hits and misses, read at scrape time"""
+    if _service_instance is None or not _service_instance.result_cache.enabled:
+        return []
+    stats = _service_instance.result_cache.stats()
+    name = "result_cache_lookups_total"
+    return [(name, {"result": "hit"}, stats["hits"]), (name, {"result": "miss"}, stats["misses"])]
+
+REGISTRY.add_collector(
+    "result_cache_lookups_total", "counter",
+    "Semantic result cache lookups by result",
+    _collect_result_cache_metrics
+)
+
 def search_similar_chunks(query: str, max_results: int = 5, filter_metadata: Optional[Dict] = None) -> List[Dict[str, Any]]:
     """Convenience function for searching similar chunks"""
     service = get_chromadb_service()
     return service.search(query, max_results, filter_metadata)
 
+def search_similar_chunks_batch(queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Convenience function for searching several queries at once"""
+    service = get_chromadb_service()
+    return service.search_batch(queries)
+
 def get_service_stats() -> Dict[str, Any]:
     """Get service statistics"""
     service = get_chromadb_service()
@@ -260,25 +1167,3 @@ def health_check() -> Dict[str, Any]:
     """Check service health"""
     service = get_chromadb_service()
     return service.health_check()
-
-if __name__ == "__main__":
-    # Test the service
-    print("🧪 Testing ChromaDB Search Service...")
-    
-    try:
-        service = ChromaDBSearchService()
-        
-        # Health check
-        health = service.health_check()
-        print(f"Health Status: {health['status']}")
-        print(f"Collection Stats: {health['stats']}")
-        
-        # Test search
-        if health['status'] == 'healthy':
-            results = service.search("asker fotball spillere", max_results=3)
-            print(f"\n🔍 Test search results: {len(results)} chunks found")
-            for i, result in enumerate(results):
-                print(f"  {i+1}. {result['chunk_id']} (score: {result['similarity_score']:.3f})")
-        
-    except Exception as e:
-        print(f"❌ Service test failed: {e}")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Chunk metadata for Asker Fotball
+Builds the collection metadata written at ingest (scripts/embed.py),
+including normalized, filterable fields so searches can filter on site
+section, team and crawl date with plain equality/range conditions
+"""
+
+import re
+import json
+import hashlib
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+PARSED_DIR = Path(__file__).parent.parent / "storage" / "parsed"
+
+# Fields written by chunk_filter_fields(); the search service indexes them up front
+FILTER_FIELDS = ("section", "team", "crawl_date", "chunk_type")
+
+# Overview pages under /lag that are not about a single team
+_TEAM_OVERVIEW_SLUGS = {"utviklingslag", "samfunn", "om-samfunnslagene", "om-utviklingslagene"}
+
+_TEAM_PATTERNS = (
+    (re.compile(r"^gutter-(\d+)$"), "G{}"),
+    (re.compile(r"^jenter-(\d+)$"), "J{}"),
+    (re.compile(r"^g(\d+)(?:-.*)?$"), "G{}"),
+    (re.compile(r"^j(\d+)(?:-.*)?$"), "J{}"),
+    (re.compile(r"^(\d{4})-kullet$"), "{}"),
+)
+
+def source_file_of(chunk_id: str) -> str:
+    """Name of the chunks file (without .jsonl) a chunk came from"""
+    return chunk_id.split("_chunk_")[0]
+
+def section_of(source_file: str) -> str:
+    """Top-level site section, e.g. lag, nyheter, om-klubben or om-stadion"""
+    return source_file.split("_")[0]
+
+def team_of(source_file: str) -> Optional[str]:
+    """
+    Normalized team of a /lag page: "A-laget" for /lag itself, G15 for
+    gutter-15, G19 for g19-junior, 2012 for 2012-kullet, otherwise the page
+    slug; None for overview pages and other sections
+    """
+    parts = source_file.split("_")
+    if parts[0] != "lag":
+        return None
+    if len(parts) == 1:
+        return "A-laget"
+    slug = parts[-1].lower()
+    if slug in _TEAM_OVERVIEW_SLUGS:
+        return None
+    for pattern, template in _TEAM_PATTERNS:
+        match = pattern.match(slug)
+        if match:
+            return template.format(match.group(1))
+    return slug
+
+@lru_cache(maxsize=1024)
+def _parsed_at(source_file: str) -> Optional[str]:
+    try:
+        with open(PARSED_DIR / f"{source_file}.json", "r", encoding="utf-8") as f:
+            return json.load(f).get("parsed_at")
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def crawl_date_of(chunk: Dict[str, Any], source_file: str) -> Optional[int]:
+    """
+    Crawl date as an integer YYYYMMDD, so it supports $gte/$lt filters
+    
+    Taken from the parse time of the page (parsing runs right after the
+    fetch), falling back to the time the chunk was created.
+    """
+    timestamp = _parsed_at(source_file) or chunk.get("created_at")
+    if not timestamp:
+        return None
+    try:
+        return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).strftime("%Y%m%d"))
+    except ValueError:
+        return None
+
+def chunk_filter_fields(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """Filterable fields of a chunk; fields without a value are left out (Chroma metadata has no null)"""
+    source_file = source_file_of(chunk["chunk_id"])
+    fields = {
+        "section": section_of(source_file),
+        "team": team_of(source_file),
+        "crawl_date": crawl_date_of(chunk, source_file),
+        "chunk_type": chunk.get("chunk_type")
+    }
+    return {key: value for key, value in fields.items() if value is not None}
+
+def content_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """Hash chunk text and metadata so unchanged chunks can be skipped"""
+    payload = json.dumps({"content": text, "metadata": metadata}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def chunk_metadata(chunk: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Collection metadata of a chunk record from storage/chunks
+    
+    Includes the filterable fields, the near-duplicates collapsed into it
+    (chunk["duplicates"], set by ingest) and the content hash. Everything
+    that shows chunk metadata builds it here, so it matches what is stored.
+    """
+    metadata = {
+        "title": chunk["title"],
+        "url": chunk["url"],
+        "breadcrumbs": json.dumps(chunk["breadcrumbs"]),
+        "idx": chunk["idx"],
+        "total_chunks": chunk["total_chunks"],
+        "original_word_count": chunk["original_word_count"],
+        "chunk_word_count": chunk["chunk_word_count"],
+        "source_file": source_file_of(chunk["chunk_id"]),
+        **chunk_filter_fields(chunk)
+    }
+    # Collapsed near-duplicates stay citable through their representative
+    duplicates = chunk.get("duplicates")
+    if duplicates:
+        metadata["duplicate_count"] = len(duplicates)
+        metadata["duplicate_ids"] = json.dumps([d["chunk_id"] for d in duplicates])
+        metadata["duplicate_urls"] = json.dumps(sorted({d["url"] for d in duplicates if d["url"] != chunk["url"]}))
+    metadata["content_hash"] = content_hash(chunk["content"], metadata)
+    return metadata
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Byte-offset index over the chunk JSONL files for Asker Fotball
+Maps every chunk_id to (file, offset, length) of its line, so single chunks
+and their neighbours on the same page are read with one positioned read
+instead of loading whole files or the full corpus
+"""
+
+import os
+import re
+import json
+import threading
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Configuration
+CHUNKS_DIR = Path(__file__).parent.parent / "storage" / "chunks"
+CHUNK_OFFSETS_DIR = Path(os.getenv(
+    "CHUNK_OFFSETS_DIR",
+    str(Path(__file__).parent.parent / "storage" / "index" / "offsets")
+))
+# Largest number of neighbours returned on each side of a chunk
+MAX_CONTEXT_WINDOW = int(os.getenv("MAX_CONTEXT_WINDOW", "5"))
+
+_CHUNK_ID_PATTERN = re.compile(r"^(.*)_chunk_(\d+)$")
+
+logger = logging.getLogger(__name__)
+
+class _Stale(Exception):
+    """A chunk file no longer matches the offset index"""
+
+def split_chunk_id(chunk_id: str) -> Optional[tuple]:
+    """(page, n) of a chunk id of the form <page>_chunk_<n>, or None"""
+    match = _CHUNK_ID_PATTERN.match(chunk_id)
+    if not match:
+        return None
+    return match.group(1), int(match.group(2))
+
+class ChunkOffsetIndex:
+    """
+    chunk_id -> (file, byte offset, length) of its JSONL line
+    
+    The table is a NumPy structured array stored as .npy and opened
+    memory-mapped; ids are kept in a dict for O(1) lookup. Reading a chunk is
+    one os.pread on a cached file descriptor and one json.loads. The index
+    records each file's size and mtime; chunk.js rewrites files in place, so
+    every read first checks the file against them and the index rebuilds
+    itself when a file changed.
+    """
+    
+    OFFSETS_FILE = "offsets.npy"
+    MANIFEST_FILE = "manifest.json"
+    ENTRY_DTYPE = [("file", "<u2"), ("offset", "<u8"), ("length", "<u4")]
+    
+    def __init__(self, chunks_dir: Path, files: List[str], ids: List[str], entries,
+                 file_states: Dict[str, List[int]], directory: Optional[Path] = None):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy not available")
+        self.chunks_dir = Path(chunks_dir)
+        self.directory = directory
+        self.files = files
+        self.ids = ids
+        self.entries = entries
+        self.file_states = file_states
+        self.row_of = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self.rebuilds = 0
+        self._fds: Dict[int, int] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.row_of
+    
+    @staticmethod
+    def _state(stat_result) -> List[int]:
+        return [stat_result.st_size, stat_result.st_mtime_ns]
+    
+    @classmethod
+    def _file_states(cls, chunks_dir: Path) -> Dict[str, List[int]]:
+        return {path.name: cls._state(path.stat()) for path in sorted(Path(chunks_dir).glob("*.jsonl"))}
+    
+    @classmethod
+    def build(cls, chunks_dir: Path = CHUNKS_DIR, directory: Optional[Path] = None) -> "ChunkOffsetIndex":
+        """Scan every JSONL file once and record the byte range of each chunk line"""
+        files = sorted(path.name for path in Path(chunks_dir).glob("*.jsonl"))
+        ids, rows, file_states = [], [], {}
+        for file_no, name in enumerate(files):
+            offset = 0
+            with open(Path(chunks_dir) / name, "rb") as f:
+                # State of the file as scanned; a write during the scan makes the next read rebuild again
+                file_states[name] = cls._state(os.fstat(f.fileno()))
+                for line in f:
+                    stripped = line.strip()
+                    if stripped:
+                        try:
+                            chunk_id = json.loads(stripped)["chunk_id"]
+                        except (json.JSONDecodeError, KeyError) as e:
+                            logger.warning(f"⚠️  Skipping unreadable line in {name}: {e}")
+                        else:
+                            ids.append(chunk_id)
+                            rows.append((file_no, offset, len(line.rstrip(b"\r\n"))))
+                    offset += len(line)
+        entries = np.array(rows, dtype=cls.ENTRY_DTYPE)
+        return cls(chunks_dir, files, ids, entries, file_states, directory)
+    
+    def save(self, directory: Path = CHUNK_OFFSETS_DIR):
+        """
+        Write the offset table and a manifest of ids and file states
+        
+        Both files are replaced atomically: other processes may have the old
+        table memory-mapped, and truncating it under them would crash them.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        tmp_offsets = directory / (self.OFFSETS_FILE + ".tmp")
+        with open(tmp_offsets, "wb") as f:
+            np.save(f, self.entries)
+        tmp_manifest = directory / (self.MANIFEST_FILE + ".tmp")
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump({
+                "files": self.files,
+                "file_states": self.file_states,
+                "ids": self.ids
+            }, f, ensure_ascii=False)
+        os.replace(tmp_offsets, directory / self.OFFSETS_FILE)
+        os.replace(tmp_manifest, directory / self.MANIFEST_FILE)
+    
+    @classmethod
+    def load(cls, chunks_dir: Path = CHUNKS_DIR, directory: Path = CHUNK_OFFSETS_DIR) -> Optional["ChunkOffsetIndex"]:
+        """Open a saved index memory-mapped, or None when it is missing or out of date"""
+        directory = Path(directory)
+        try:
+            with open(directory / cls.MANIFEST_FILE, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            entries = np.load(directory / cls.OFFSETS_FILE, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.info(f"ℹ️  No usable chunk offset index in {directory}: {e}")
+            return None
+        if manifest.get("file_states") != cls._file_states(chunks_dir):
+            logger.info("🔄 Chunk files changed since the offset index was built")
+            return None
+        return cls(chunks_dir, manifest["files"], manifest["ids"], entries, manifest["file_states"], directory)
+    
+    @classmethod
+    def open(cls, chunks_dir: Path = CHUNKS_DIR, directory: Path = CHUNK_OFFSETS_DIR) -> "ChunkOffsetIndex":
+        """Load the saved index, rebuilding and saving it when missing or stale"""
+        index = cls.load(chunks_dir, directory)
+        if index is None:
+            index = cls.build(chunks_dir, directory)
+            try:
+                index.save(directory)
+            except OSError as e:
+                logger.warning(f"⚠️  Could not save chunk offset index: {e}")
+            logger.info(f"✅ Built chunk offset index: {len(index)} chunks in {len(index.files)} files")
+        return index
+    
+    def _fd(self, file_no: int) -> int:
+        fd = self._fds.get(file_no)
+        if fd is None:
+            fd = os.open(self.chunks_dir / self.files[file_no], os.O_RDONLY)
+            self._fds[file_no] = fd
+        return fd
+    
+    def _read(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a chunk line if its file is still in the state the index was
+        built from; None for unknown ids, raises _Stale when the file changed
+        """
+        row = self.row_of.get(chunk_id)
+        if row is None:
+            return None
+        file_no, offset, length = (int(value) for value in self.entries[row])
+        name = self.files[file_no]
+        try:
+            current = self._state(os.stat(self.chunks_dir / name))
+        except FileNotFoundError:
+            raise _Stale(f"{name} was removed")
+        if current != self.file_states.get(name):
+            raise _Stale(f"{name} changed")
+        data = os.pread(self._fd(file_no), length, offset)
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            raise _Stale(f"{name} has no chunk line at offset {offset}")
+        if chunk.get("chunk_id") != chunk_id:
+            raise _Stale(f"{name} has another chunk at offset {offset}")
+        return chunk
+    
+    def get(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """The full chunk record, or None for an unknown id; rebuilds the index once if the files changed"""
+        with self._lock:
+            try:
+                return self._read(chunk_id)
+            except _Stale as e:
+                logger.info(f"🔄 Chunk offsets are stale ({e}), rebuilding")
+                self._rebuild()
+            try:
+                return self._read(chunk_id)
+            except _Stale as e:
+                # Still being rewritten; the next read tries again
+                logger.warning(f"⚠️  Could not read chunk {chunk_id}: {e}")
+                return None
+    
+    def _rebuild(self):
+        """Rescan the chunk files in place (caller holds the lock) and save the new table if it has a home"""
+        fresh = self.build(self.chunks_dir, self.directory)
+        self._close_files()
+        self.files, self.ids, self.entries = fresh.files, fresh.ids, fresh.entries
+        self.file_states, self.row_of = fresh.file_states, fresh.row_of
+        self.rebuilds += 1
+        if self.directory is not None:
+            try:
+                self.save(self.directory)
+            except OSError as e:
+                logger.warning(f"⚠️  Could not save chunk offset index: {e}")
+    
+    def neighbors(self, chunk_id: str, window: int) -> List[Dict[str, Any]]:
+        """
+        Chunks of the same page within window positions of chunk_id, in page
+        order and without the chunk itself; each with its relative position
+        """
+        parts = split_chunk_id(chunk_id)
+        if parts is None or window <= 0:
+            return []
+        page, n = parts
+        found = []
+        for position in range(-window, window + 1):
+            if position == 0 or n + position < 0:
+                continue
+            chunk = self.get(f"{page}_chunk_{n + position}")
+            if chunk is not None:
+                found.append({
+                    "chunk_id": chunk["chunk_id"],
+                    "idx": chunk.get("idx"),
+                    "position": position,
+                    "content": chunk.get("content")
+                })
+        return found
+    
+    def _close_files(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+    
+    def close(self):
+        with self._lock:
+            self._close_files()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self.ids),
+            "files": len(self.files),
+            "open_files": len(self._fds),
+            "rebuilds": self.rebuilds,
+            "table_bytes": int(self.entries.nbytes)
+        }
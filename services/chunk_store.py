@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory chunk store for Asker Fotball
+Keeps chunk text and metadata resident at a fraction of the size of one
+dict per chunk: repeated strings are pooled, integer fields live in typed
+arrays and all chunk text is one contiguous UTF-8 buffer with offsets
+"""
+
+import sys
+import logging
+from array import array
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+from chunk_fields import chunk_metadata
+
+logger = logging.getLogger(__name__)
+
+class ChunkStore:
+    """
+    Columnar store of chunks, addressed by row number or chunk_id
+    
+    Metadata is the collection metadata of each chunk (chunk_fields.chunk_metadata).
+    String fields (title, url, breadcrumbs, ...) repeat across the chunks of
+    a page, so each column holds 4-byte codes into one pool of distinct
+    strings. Integer fields are array("q") columns with MISSING for absent
+    values. Hashes are unique per chunk, so pooling would only add overhead;
+    they are stored as 32-byte digests in one fixed-width buffer and given
+    back as hex. Any other metadata entry is kept per row in a sparse dict. Text
+    is appended to a single bytearray; row r spans
+    text_offsets[r]:text_offsets[r + 1].
+    """
+    
+    STRING_FIELDS = ("title", "url", "breadcrumbs", "source_file", "chunk_type", "section", "team",
+                     "duplicate_ids", "duplicate_urls")
+    INT_FIELDS = ("idx", "total_chunks", "original_word_count", "chunk_word_count", "crawl_date", "duplicate_count")
+    # Hex SHA-256 digests (chunk_fields.content_hash)
+    HASH_FIELDS = ("content_hash",)
+    DIGEST_BYTES = 32
+    MISSING = -1
+    
+    def __init__(self):
+        self.ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self._text = bytearray()
+        self._text_offsets = array("Q", [0])
+        self._pool: List[Optional[str]] = [None]
+        self._pool_codes: Dict[str, int] = {}
+        self._strings = {field: array("I") for field in self.STRING_FIELDS}
+        self._ints = {field: array("q") for field in self.INT_FIELDS}
+        # Row r of a hash column is bytes r * DIGEST_BYTES onwards; a zero flag marks a missing hash
+        self._hashes = {field: bytearray() for field in self.HASH_FIELDS}
+        self._has_hash = {field: bytearray() for field in self.HASH_FIELDS}
+        self._extra: Dict[int, Dict[str, Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self.row_of
+    
+    def _code(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        code = self._pool_codes.get(value)
+        if code is None:
+            code = len(self._pool)
+            self._pool.append(value)
+            self._pool_codes[value] = code
+        return code
+    
+    def _fits_column(self, field: str, value: Any) -> bool:
+        """Whether value can be stored in the typed column of field"""
+        if field in self._strings:
+            return isinstance(value, str)
+        if field in self._ints:
+            return isinstance(value, int) and not isinstance(value, bool) and value != self.MISSING
+        if field in self._hashes:
+            # Only lowercase hex of the right length comes back unchanged from .hex()
+            if not isinstance(value, str) or len(value) != 2 * self.DIGEST_BYTES:
+                return False
+            try:
+                return bytes.fromhex(value).hex() == value
+            except ValueError:
+                return False
+        return False
+    
+    def add(self, chunk_id: str, content: str, metadata: Dict[str, Any]) -> int:
+        """Append a chunk with its collection metadata and return its row; duplicates keep the first"""
+        if chunk_id in self.row_of:
+            logger.warning(f"⚠️  Duplicate chunk_id {chunk_id}, keeping the first")
+            return self.row_of[chunk_id]
+        row = len(self.ids)
+        self.ids.append(chunk_id)
+        self.row_of[chunk_id] = row
+        
+        self._text += (content or "").encode("utf-8")
+        self._text_offsets.append(len(self._text))
+        
+        metadata = metadata or {}
+        for field, column in self._strings.items():
+            value = metadata.get(field)
+            column.append(self._code(value) if self._fits_column(field, value) else 0)
+        for field, column in self._ints.items():
+            value = metadata.get(field)
+            column.append(value if self._fits_column(field, value) else self.MISSING)
+        for field, column in self._hashes.items():
+            value = metadata.get(field)
+            fits = self._fits_column(field, value)
+            column += bytes.fromhex(value) if fits else bytes(self.DIGEST_BYTES)
+            self._has_hash[field].append(1 if fits else 0)
+        extra = {
+            key: value for key, value in metadata.items()
+            if value is not None and not self._fits_column(key, value)
+        }
+        if extra:
+            self._extra[row] = extra
+        return row
+    
+    def row(self, chunk_id: str) -> Optional[int]:
+        """Row number of a chunk, or None"""
+        return self.row_of.get(chunk_id)
+    
+    def text(self, row: int) -> str:
+        """Content of the chunk in row"""
+        return self._text[self._text_offsets[row]:self._text_offsets[row + 1]].decode("utf-8")
+    
+    def value(self, row: int, field: str) -> Any:
+        """One metadata field of the chunk in row"""
+        if field in self._strings:
+            return self._pool[self._strings[field][row]]
+        if field in self._hashes:
+            if not self._has_hash[field][row]:
+                return None
+            start = row * self.DIGEST_BYTES
+            return self._hashes[field][start:start + self.DIGEST_BYTES].hex()
+        value = self._ints[field][row]
+        return None if value == self.MISSING else value
+    
+    def metadata(self, row: int) -> Dict[str, Any]:
+        """Metadata of the chunk in row, equal to the collection metadata it was added with"""
+        metadata = {}
+        for field in self.STRING_FIELDS + self.INT_FIELDS + self.HASH_FIELDS:
+            value = self.value(row, field)
+            if value is not None:
+                metadata[field] = value
+        metadata.update(self._extra.get(row, {}))
+        return metadata
+    
+    def get(self, row: int) -> Dict[str, Any]:
+        """Chunk in row as {'chunk_id', 'content', 'metadata'}"""
+        return {
+            "chunk_id": self.ids[row],
+            "content": self.text(row),
+            "metadata": self.metadata(row)
+        }
+    
+    def get_by_id(self, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """Chunk by id, or None"""
+        row = self.row_of.get(chunk_id)
+        return None if row is None else self.get(row)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self.ids)):
+            yield self.get(row)
+    
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        """(chunk_id, content) pairs in row order, e.g. to build the BM25 index"""
+        for row, chunk_id in enumerate(self.ids):
+            yield chunk_id, self.text(row)
+    
+    def memory_bytes(self) -> int:
+        """Approximate resident size: buffers, columns, pooled strings and the id index"""
+        total = sys.getsizeof(self._text) + sys.getsizeof(self._text_offsets)
+        total += sum(sys.getsizeof(column) for column in self._strings.values())
+        total += sum(sys.getsizeof(column) for column in self._ints.values())
+        total += sum(sys.getsizeof(column) for column in self._hashes.values())
+        total += sum(sys.getsizeof(flags) for flags in self._has_hash.values())
+        total += sys.getsizeof(self._pool) + sys.getsizeof(self._pool_codes)
+        total += sum(sys.getsizeof(value) for value in self._pool if value is not None)
+        total += sys.getsizeof(self.ids) + sys.getsizeof(self.row_of)
+        total += sum(sys.getsizeof(chunk_id) for chunk_id in self.ids)
+        total += sys.getsizeof(self._extra) + sum(sys.getsizeof(extra) for extra in self._extra.values())
+        return total
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "chunks": len(self.ids),
+            "text_bytes": len(self._text),
+            "pooled_strings": len(self._pool) - 1,
+            "memory_bytes": self.memory_bytes()
+        }
+    
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str, Dict[str, Any]]]) -> "ChunkStore":
+        """Build a store from (chunk_id, content, metadata) records"""
+        store = cls()
+        for chunk_id, content, metadata in records:
+            store.add(chunk_id, content, metadata)
+        return store
+    
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Dict[str, Any]]) -> "ChunkStore":
+        """Build a store from chunk records as read from storage/chunks"""
+        return cls.from_records((chunk["chunk_id"], chunk.get("content"), chunk_metadata(chunk)) for chunk in chunks)
+    
+    @classmethod
+    def from_collection(cls, collection) -> "ChunkStore":
+        """Build a store from every document and metadata entry of a collection"""
+        data = collection.get(include=["documents", "metadatas"])
+        store = cls.from_records(zip(data["ids"], data["documents"], data["metadatas"]))
+        logger.info(f"✅ Loaded {len(store)} chunks into chunk store ({store.memory_bytes() / 1e6:.1f} MB)")
+        return store
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Versioned Chroma collections for Asker Fotball
+Each full rebuild writes a new collection (<alias>__<timestamp>); a small
+alias file names the live version and is replaced atomically once the new
+version has passed its smoke check, so readers never see a partial index
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+# Configuration
+COLLECTION_ALIAS_FILE = Path(os.getenv(
+    "COLLECTION_ALIAS_FILE",
+    str(Path(__file__).parent.parent / "storage" / "index" / "collection-alias.json")
+))
+# Versions kept besides the live one, so services that have not reloaded yet keep working
+COLLECTION_KEEP_VERSIONS = int(os.getenv("COLLECTION_KEEP_VERSIONS", "2"))
+
+VERSION_SEPARATOR = "__"
+
+logger = logging.getLogger(__name__)
+
+def versioned_name(alias: str, when: Optional[datetime] = None) -> str:
+    """Collection name for a new build of alias"""
+    return f"{alias}{VERSION_SEPARATOR}{(when or datetime.now()).strftime('%Y%m%dT%H%M%S')}"
+
+def read_alias(alias: str, alias_file: Path = COLLECTION_ALIAS_FILE) -> Optional[Dict[str, Any]]:
+    """Alias entry ({collection, updated_at, previous, synced_at}) or None if alias is not versioned yet"""
+    try:
+        with open(alias_file, "r", encoding="utf-8") as f:
+            return json.load(f).get(alias)
+    except FileNotFoundError:
+        return None
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"⚠️  Could not read collection alias file {alias_file}: {e}")
+        return None
+
+def resolve_collection_name(alias: str, alias_file: Path = COLLECTION_ALIAS_FILE) -> str:
+    """Name of the live collection for alias; the alias itself before the first versioned build"""
+    entry = read_alias(alias, alias_file)
+    return entry["collection"] if entry else alias
+
+def resolve_collection_version(alias: str, alias_file: Path = COLLECTION_ALIAS_FILE) -> Tuple[str, Optional[str]]:
+    """
+    (collection name, sync marker) of the live version of alias
+    
+    The marker changes whenever scripts/embed.py writes to the live
+    collection, including incremental syncs that keep its name, so caches
+    derived from the collection can tell they are stale.
+    """
+    entry = read_alias(alias, alias_file)
+    if not entry:
+        return alias, None
+    return entry["collection"], entry.get("synced_at")
+
+def write_alias(alias: str, collection_name: str, alias_file: Path = COLLECTION_ALIAS_FILE,
+                synced_at: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Point alias at collection_name, replacing the alias file atomically
+    
+    Also used after an incremental sync of the live collection: the name
+    stays, but the sync marker (synced_at) moves on.
+    """
+    alias_file = Path(alias_file)
+    alias_file.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(alias_file, "r", encoding="utf-8") as f:
+            aliases = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        aliases = {}
+    
+    current = aliases.get(alias)
+    if current and current["collection"] == collection_name:
+        previous = current.get("previous")
+    else:
+        previous = current["collection"] if current else None
+    now = datetime.now().isoformat()
+    aliases[alias] = {
+        "collection": collection_name,
+        "updated_at": now,
+        # The version swapped out, for rollback (kept by collect_garbage while keep >= 1)
+        "previous": previous,
+        "synced_at": synced_at or now
+    }
+    
+    tmp_file = alias_file.with_suffix(alias_file.suffix + ".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(aliases, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, alias_file)
+    return aliases[alias]
+
+def alias_mtime(alias_file: Path = COLLECTION_ALIAS_FILE) -> Optional[float]:
+    """Modification time of the alias file, used to notice swaps cheaply"""
+    try:
+        return os.stat(alias_file).st_mtime
+    except OSError:
+        return None
+
+def list_versions(client, alias: str) -> List[str]:
+    """Versioned collections of alias, oldest first"""
+    names = [getattr(c, "name", c) for c in client.list_collections()]
+    prefix = alias + VERSION_SEPARATOR
+    return sorted(name for name in names if name.startswith(prefix))
+
+def collect_garbage(client, alias: str, keep: int = COLLECTION_KEEP_VERSIONS,
+                    alias_file: Path = COLLECTION_ALIAS_FILE) -> List[str]:
+    """
+    Delete versions of alias other than the live one and the newest keep others
+    
+    A legacy collection named like the alias itself (built before versioning)
+    counts as the oldest version once the alias points elsewhere.
+    """
+    live = resolve_collection_name(alias, alias_file)
+    names = {getattr(c, "name", c) for c in client.list_collections()}
+    legacy = [alias] if alias in names and alias != live else []
+    candidates = legacy + [name for name in list_versions(client, alias) if name != live]
+    stale = candidates[:-keep] if keep > 0 else candidates
+    for name in stale:
+        client.delete_collection(name)
+        logger.info(f"🗑️  Deleted old collection version: {name}")
+    return stale
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Embedding providers for Asker Fotball
+Shared by the ingest script (scripts/embed.py) and the search service
+"""
+
+import os
+import re
+import math
+import time
+import zlib
+import random
+import logging
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from embedding_store import EmbeddingStore, StoreBackedProvider, NUMPY_AVAILABLE
+
+# Availability is checked without importing: sentence-transformers pulls in
+# torch and openai is large, so each is imported when its provider is created
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if not SENTENCE_TRANSFORMERS_AVAILABLE:
+    print("⚠️  sentence-transformers not available. Install with: pip install sentence-transformers")
+
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not OPENAI_AVAILABLE:
+    print("⚠️  OpenAI not available. Install with: pip install openai")
+
+# Configuration
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "local")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+OPENAI_MAX_BATCH_TOKENS = int(os.getenv("OPENAI_MAX_BATCH_TOKENS", "100000"))
+OPENAI_MAX_BATCH_INPUTS = int(os.getenv("OPENAI_MAX_BATCH_INPUTS", "512"))
+OPENAI_EMBED_CONCURRENCY = int(os.getenv("OPENAI_EMBED_CONCURRENCY", "4"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+LOCAL_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+LOCAL_EMBED_BATCH_SIZE = int(os.getenv("LOCAL_EMBED_BATCH_SIZE", "32"))
+LOCAL_LONG_TEXT_MODE = os.getenv("LOCAL_LONG_TEXT_MODE", "pool")  # pool or truncate
+LOCAL_WINDOW_OVERLAP = int(os.getenv("LOCAL_WINDOW_OVERLAP", "32"))
+STUB_EMBEDDING_DIMENSION = int(os.getenv("STUB_EMBEDDING_DIMENSION", "384"))
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingProvider:
+    """Base class for embedding providers"""
+    
+    model_name = ""
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts"""
+        raise NotImplementedError
+    
+    def warmup(self):
+        """Pay one-off costs (lazy initialisation, kernel selection) before the first real query"""
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    Local embedding provider using sentence-transformers
+    
+    Texts are encoded in batches of similar token length, so short texts are
+    not padded up to the longest text in the batch, and vectors are returned
+    in input order. Texts longer than the model's max_seq_length would be
+    truncated by the model; in "pool" mode they are split into overlapping
+    windows whose vectors are averaged (weighted by window length), so the
+    whole text is represented.
+    
+    Pool mode reports model_name "<model>+window-pool". Switching modes
+    therefore starts an empty embedding store directory, changes the query
+    embedding cache key and makes the next incremental embed a full rebuild,
+    since the collection was built with another embedding_model.
+    """
+    
+    def __init__(self, model_name: str = LOCAL_MODEL, batch_size: int = LOCAL_EMBED_BATCH_SIZE,
+                 long_text_mode: str = LOCAL_LONG_TEXT_MODE, window_overlap: int = LOCAL_WINDOW_OVERLAP):
+        if not SENTENCE_TRANSFORMERS_AVAILABLE:
+            raise ImportError("sentence-transformers not available")
+        if long_text_mode not in ("pool", "truncate"):
+            raise ValueError(f"Unknown long text mode: {long_text_mode}")
+        
+        from sentence_transformers import SentenceTransformer
+        
+        logger.info("🔄 Loading local embedding model...")
+        self.model = SentenceTransformer(model_name)
+        self.batch_size = max(1, batch_size)
+        self.long_text_mode = long_text_mode
+        # Pooled vectors differ from truncated ones, so they get their own name
+        # (embedding store directory, collection metadata, query cache key)
+        self.model_name = model_name if long_text_mode == "truncate" else f"{model_name}+window-pool"
+        # Room for [CLS] and [SEP]
+        self.max_tokens = max(1, self.model.max_seq_length - 2)
+        self.window_step = max(1, self.max_tokens - window_overlap)
+        self.windowed_texts = 0
+        self.windows = 0
+        logger.info("✅ Local embedding model loaded")
+    
+    def _split(self, texts: List[str]) -> List[List[Tuple[str, int]]]:
+        """(window text, token count) pieces of each text; one piece unless it is too long"""
+        encodings = self.model.tokenizer(list(texts), add_special_tokens=False,
+                                         return_offsets_mapping=True, verbose=False)
+        pieces = []
+        for text, offsets in zip(texts, encodings["offset_mapping"]):
+            if len(offsets) <= self.max_tokens or self.long_text_mode == "truncate":
+                pieces.append([(text, min(len(offsets), self.max_tokens))])
+                continue
+            windows = []
+            for start in range(0, len(offsets), self.window_step):
+                span = offsets[start:start + self.max_tokens]
+                windows.append((text[span[0][0]:span[-1][1]], len(span)))
+                if start + self.max_tokens >= len(offsets):
+                    break
+            pieces.append(windows)
+            self.windowed_texts += 1
+            self.windows += len(windows)
+        return pieces
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings using sentence-transformers"""
+        if not texts:
+            return []
+        import numpy as np
+        
+        pieces = self._split(texts)
+        flat = [piece for text_pieces in pieces for piece in text_pieces]
+        
+        # Length-sorted buckets: each model call pads to a similar length
+        order = sorted(range(len(flat)), key=lambda i: flat[i][1])
+        vectors = None
+        for start in range(0, len(order), self.batch_size):
+            bucket = order[start:start + self.batch_size]
+            encoded = self.model.encode([flat[i][0] for i in bucket], batch_size=len(bucket),
+                                        show_progress_bar=False, convert_to_numpy=True)
+            if vectors is None:
+                vectors = np.empty((len(flat), encoded.shape[1]), dtype=np.float32)
+            vectors[bucket] = encoded
+        
+        if len(flat) == len(texts):
+            return vectors.tolist()
+        
+        # Weighted mean of window vectors, rescaled to the windows' average norm
+        embeddings = []
+        offset = 0
+        for text_pieces in pieces:
+            window_vectors = vectors[offset:offset + len(text_pieces)]
+            offset += len(text_pieces)
+            if len(text_pieces) == 1:
+                embeddings.append(window_vectors[0].tolist())
+                continue
+            weights = np.array([n_tokens for _, n_tokens in text_pieces], dtype=np.float32)
+            pooled = weights @ window_vectors / weights.sum()
+            target_norm = weights @ np.linalg.norm(window_vectors, axis=1) / weights.sum()
+            norm = np.linalg.norm(pooled)
+            embeddings.append((pooled * (target_norm / norm) if norm > 0 else pooled).tolist())
+        return embeddings
+    
+    def warmup(self):
+        """Run a dummy encode; the first forward pass is several times slower than later ones"""
+        self.model.encode(["warmup"])
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """
+    OpenAI embedding provider
+    
+    Inputs are split into batches by estimated token count and sent
+    concurrently; 429/5xx and connection errors are retried with jittered
+    exponential backoff. Results are returned in input order.
+    """
+    
+    # Rough characters-per-token ratio; errs on the side of smaller batches
+    CHARS_PER_TOKEN = 3
+    
+    def __init__(self, api_key: str, model: str = "text-embedding-3-small",
+                 base_url: Optional[str] = OPENAI_BASE_URL,
+                 max_batch_tokens: int = OPENAI_MAX_BATCH_TOKENS,
+                 max_batch_inputs: int = OPENAI_MAX_BATCH_INPUTS,
+                 concurrency: int = OPENAI_EMBED_CONCURRENCY,
+                 max_retries: int = OPENAI_MAX_RETRIES):
+        if not OPENAI_AVAILABLE:
+            raise ImportError("OpenAI library not available")
+        
+        if not api_key or api_key == "your_openai_api_key_here":
+            raise ValueError("OpenAI API key not set")
+        
+        import openai
+        
+        # Retries are handled here so they can be jittered and counted
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        self.model = model
+        self.model_name = model
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.retries = 0
+        logger.info(f"✅ OpenAI client initialized with model: {model}")
+    
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        """Estimate the token count of a text without a tokenizer"""
+        return max(1, len(text) // cls.CHARS_PER_TOKEN)
+    
+    def make_batches(self, texts: List[str]) -> List[range]:
+        """Split input positions into batches bounded by tokens and input count"""
+        batches = []
+        start = 0
+        tokens = 0
+        for i, text in enumerate(texts):
+            text_tokens = self.estimate_tokens(text)
+            full = i > start and (
+                tokens + text_tokens > self.max_batch_tokens or
+                i - start >= self.max_batch_inputs
+            )
+            if full:
+                batches.append(range(start, i))
+                start = i
+                tokens = 0
+            tokens += text_tokens
+        if start < len(texts):
+            batches.append(range(start, len(texts)))
+        return batches
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings using OpenAI API"""
+        if not texts:
+            return []
+        
+        batches = self.make_batches(texts)
+        if len(batches) == 1:
+            return self._embed_batch(texts)
+        
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+            futures = [
+                (batch, executor.submit(self._embed_batch, [texts[i] for i in batch]))
+                for batch in batches
+            ]
+            for batch, future in futures:
+                for i, embedding in zip(batch, future.result()):
+                    embeddings[i] = embedding
+        return embeddings
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one batch, retrying transient failures"""
+        attempt = 0
+        while True:
+            try:
+                response = self.client.embeddings.create(
+                    model=self.model,
+                    input=texts
+                )
+                # The API may return items out of order; index restores it
+                data = sorted(response.data, key=lambda item: item.index)
+                return [item.embedding for item in data]
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                delay = self._backoff_delay(attempt, e)
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"⚠️  OpenAI embedding request failed ({e.__class__.__name__}), "
+                               f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Rate limits, server errors and connection problems are worth retrying"""
+        import openai
+        
+        if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+    
+    @staticmethod
+    def _backoff_delay(attempt: int, error: Exception, base: float = 0.5, cap: float = 30.0) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(cap, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+class StubEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic offline embeddings from hashed word and character trigram features
+    
+    Needs no model download or network access, so benchmarks and tests run
+    anywhere. Texts sharing words get similar vectors, which is enough for
+    lexical-ish retrieval but not for semantic quality measurements.
+    """
+    
+    _TOKEN_PATTERN = re.compile(r"\w+")
+    
+    def __init__(self, dimension: int = STUB_EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self.model_name = f"stub-hashing-{dimension}"
+    
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in self._TOKEN_PATTERN.findall(text.lower()):
+            features.append(token)
+            padded = f"#{token}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Generate normalized feature-hashing embeddings"""
+        embeddings = []
+        for text in texts:
+            vector = [0.0] * self.dimension
+            for feature in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode("utf-8"))
+                vector[h % self.dimension] += 1.0 if h & 0x80000000 else -1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            embeddings.append([v / norm for v in vector])
+        return embeddings
+
+def import_provider_library(provider_name: Optional[str] = None):
+    """
+    Import the library behind a provider without creating it
+    
+    Lets callers time (or pay up front) the import separately from model
+    loading. Missing libraries are ignored; creating the provider reports them.
+    """
+    provider_name = provider_name or EMBEDDING_PROVIDER
+    if provider_name == "stub":
+        return
+    module = "openai" if provider_name == "openai" else "sentence_transformers"
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        pass
+
+def get_embedding_provider(provider_name: Optional[str] = None) -> EmbeddingProvider:
+    """Get the appropriate embedding provider based on configuration"""
+    provider_name = provider_name or EMBEDDING_PROVIDER
+    if provider_name == "openai":
+        try:
+            return OpenAIEmbeddingProvider(OPENAI_API_KEY, OPENAI_MODEL)
+        except (ImportError, ValueError) as e:
+            logger.warning(f"⚠️  OpenAI provider failed: {e}")
+            logger.info("🔄 Falling back to local embeddings...")
+            return LocalEmbeddingProvider()
+    elif provider_name == "stub":
+        return StubEmbeddingProvider()
+    else:
+        return LocalEmbeddingProvider()
+
+def with_embedding_store(provider: EmbeddingProvider, write_back: bool = True) -> EmbeddingProvider:
+    """
+    Wrap a provider so it reads through the persistent embedding store
+    
+    Returns the provider unchanged when the store is disabled or NumPy is
+    not installed.
+    """
+    if not EMBEDDING_STORE_ENABLED or not NUMPY_AVAILABLE:
+        return provider
+    store = EmbeddingStore.for_model(provider.model_name or provider.__class__.__name__)
+    return StoreBackedProvider(provider, store, write_back=write_back)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Persistent embedding store for Asker Fotball
+Keeps computed vectors on disk, keyed by (model, content hash), so that
+reindexing or switching vector backends never re-encodes unchanged text
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Configuration
+EMBEDDING_STORE_DIR = Path(os.getenv(
+    "EMBEDDING_STORE_DIR",
+    str(Path(__file__).parent.parent / "storage" / "index" / "embeddings")
+))
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "float32")
+
+logger = logging.getLogger(__name__)
+
+def text_hash(text: str) -> bytes:
+    """Content hash (32-byte SHA-256 digest) used as the store key for a text"""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+class EmbeddingStore:
+    """
+    Append-only, memory-mapped matrix of embeddings for a single model
+    
+    Layout (one directory per model):
+        store.json  - dtype and dimension, written once
+        vectors.bin - raw row-major float32/float16 matrix
+        keys.bin    - content hash of each row, 32 bytes per row, same order
+    
+    A batch appends its vectors and then its keys, so a write costs only the
+    new rows and a reader that sees the key log grow reads just the new tail.
+    The row count is the number of complete keys; a crash mid-write only
+    leaves trailing bytes that are truncated by the next write. Rows are
+    never rewritten or removed, so the log needs no compaction.
+    """
+    
+    HEADER_FILE = "store.json"
+    VECTORS_FILE = "vectors.bin"
+    KEYS_FILE = "keys.bin"
+    # Key/row map of stores written before the key log; converted on open
+    LEGACY_INDEX_FILE = "index.json"
+    KEY_BYTES = 32
+    
+    def __init__(self, directory: Path, dtype: str = EMBEDDING_STORE_DTYPE):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy not available")
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported embedding store dtype: {dtype}")
+        
+        self.directory = Path(directory)
+        self.dtype = dtype
+        self.dimension: Optional[int] = None
+        self.rows: Dict[bytes, int] = {}
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._lock:
+            self._migrate_legacy_index()
+            self._load()
+    
+    @classmethod
+    def for_model(cls, model_name: str, root: Path = EMBEDDING_STORE_DIR) -> "EmbeddingStore":
+        """Open the store directory for a model name"""
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_") or "default"
+        return cls(Path(root) / slug)
+    
+    @property
+    def header_path(self) -> Path:
+        return self.directory / self.HEADER_FILE
+    
+    @property
+    def vectors_path(self) -> Path:
+        return self.directory / self.VECTORS_FILE
+    
+    @property
+    def keys_path(self) -> Path:
+        return self.directory / self.KEYS_FILE
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    @property
+    def _row_bytes(self) -> int:
+        return self.dimension * np.dtype(self.dtype).itemsize
+    
+    def _load(self):
+        """Read the header and any keys appended since the last load, then map the vectors (caller holds the lock)"""
+        if self.dimension is None:
+            try:
+                with open(self.header_path, "r", encoding="utf-8") as f:
+                    header = json.load(f)
+            except FileNotFoundError:
+                return
+            # The dtype on disk always wins over the requested one
+            self.dtype = header["dtype"]
+            self.dimension = header["dimension"]
+        
+        try:
+            key_count = os.path.getsize(self.keys_path) // self.KEY_BYTES
+            vector_count = os.path.getsize(self.vectors_path) // self._row_bytes
+        except FileNotFoundError:
+            return
+        count = min(key_count, vector_count)
+        known = len(self.rows)
+        if count <= known:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(known * self.KEY_BYTES)
+            tail = f.read((count - known) * self.KEY_BYTES)
+        for offset in range(0, len(tail), self.KEY_BYTES):
+            self.rows.setdefault(tail[offset:offset + self.KEY_BYTES], known + offset // self.KEY_BYTES)
+        self._map(count)
+    
+    def _migrate_legacy_index(self):
+        """Convert an index.json key/row map into store.json and keys.bin (caller holds the lock)"""
+        legacy_path = self.directory / self.LEGACY_INDEX_FILE
+        if not legacy_path.exists() or self.header_path.exists():
+            return
+        with open(legacy_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        keys = [None] * len(index["rows"])
+        for hex_key, row in index["rows"].items():
+            keys[row] = bytes.fromhex(hex_key)
+        with open(self.keys_path, "wb") as f:
+            f.write(b"".join(keys))
+        self._write_header(index["dtype"], index["dimension"])
+        legacy_path.unlink()
+        logger.info(f"🔄 Converted embedding store index of {self.directory} ({len(keys)} vectors) to a key log")
+    
+    def _write_header(self, dtype: str, dimension: int):
+        """Atomically write store.json"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.header_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dtype": dtype, "dimension": dimension}, f)
+        os.replace(tmp_path, self.header_path)
+    
+    def _map(self, count: int):
+        """Memory-map the first count rows of the vector file"""
+        if count == 0 or not self.dimension:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(
+            self.vectors_path, dtype=self.dtype, mode="r", shape=(count, self.dimension)
+        )
+    
+    def refresh(self):
+        """Pick up rows another process has appended to the store"""
+        with self._lock:
+            self._load()
+    
+    def get_many(self, texts: List[str], count: bool = True) -> List[Optional[List[float]]]:
+        """Look up stored vectors for texts; missing entries are None. count=False leaves hits/misses alone"""
+        with self._lock:
+            results: List[Optional[List[float]]] = []
+            for text in texts:
+                row = self.rows.get(text_hash(text))
+                if row is None or self._matrix is None:
+                    results.append(None)
+                else:
+                    results.append(self._matrix[row].astype(np.float32).tolist())
+            if count:
+                self._count(results)
+            return results
+    
+    def _count(self, results: List[Optional[List[float]]]):
+        hits = sum(1 for embedding in results if embedding is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+    
+    def count_lookups(self, results: List[Optional[List[float]]]):
+        """Record the final outcome of lookups made with count=False"""
+        with self._lock:
+            self._count(results)
+    
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Append vectors for texts not yet in the store, then their keys"""
+        if not texts:
+            return
+        with self._lock:
+            new_rows = []
+            new_keys = []
+            seen = set()
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                if key in self.rows or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_rows:
+                return
+            
+            matrix = np.asarray(new_rows, dtype=self.dtype)
+            if self.dimension is None:
+                self.dimension = int(matrix.shape[1])
+            elif matrix.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match store dimension {self.dimension}"
+                )
+            
+            if not self.header_path.exists():
+                self._write_header(self.dtype, self.dimension)
+            
+            # Another writer may have appended since the last look; rows never move
+            self._load()
+            count = len(self.rows)
+            with open(self.vectors_path, "ab") as f:
+                # Drop bytes left behind by an interrupted write
+                f.truncate(count * self._row_bytes)
+                f.write(matrix.tobytes())
+            with open(self.keys_path, "ab") as f:
+                f.truncate(count * self.KEY_BYTES)
+                f.write(b"".join(new_keys))
+            
+            for offset, key in enumerate(new_keys):
+                self.rows[key] = count + offset
+            self._map(len(self.rows))
+    
+    def matrix(self):
+        """Return the full memory-mapped matrix (rows ordered by insertion)"""
+        return self._matrix
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.directory),
+                "vectors": len(self.rows),
+                "dimension": self.dimension,
+                "dtype": self.dtype,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class StoreBackedProvider:
+    """Embedding provider wrapper that reads through an EmbeddingStore"""
+    
+    def __init__(self, provider, store: EmbeddingStore, write_back: bool = True):
+        self.provider = provider
+        self.store = store
+        self.write_back = write_back
+    
+    @property
+    def model_name(self) -> str:
+        return getattr(self.provider, "model_name", "")
+    
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return stored vectors where available and encode only the rest"""
+        # A read-only lookup may be retried below; count each text once, by its final outcome
+        embeddings = self.store.get_many(texts, count=self.write_back)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing and not self.write_back:
+            # Pick up vectors written by an ingest run since we last looked
+            self.store.refresh()
+            for i, embedding in zip(missing, self.store.get_many([texts[i] for i in missing], count=False)):
+                embeddings[i] = embedding
+            missing = [i for i in missing if embeddings[i] is None]
+        if not self.write_back:
+            self.store.count_lookups(embeddings)
+        
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self.provider.embed(missing_texts)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+            if self.write_back:
+                self.store.put_many(missing_texts, computed)
+            logger.debug(f"Embedding store: {len(texts) - len(missing)} reused, {len(missing)} encoded")
+        return embeddings
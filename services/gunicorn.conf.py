@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Gunicorn configuration for the ChromaDB Search API
+Production serving mode: the master preloads the embedding model and the
+collection once, then forks workers that share the weights copy-on-write.
+
+Usage (from the services directory):
+    gunicorn -c gunicorn.conf.py chromadb_api:app
+"""
+
+import gc
+import os
+import multiprocessing
+from dotenv import load_dotenv
+
+# Load environment variables before reading settings and importing the app
+load_dotenv()
+
+# Server socket
+bind = os.getenv("CHROMADB_API_BIND", "0.0.0.0:5001")
+
+# Worker processes; each runs a small thread pool for concurrent requests
+workers = int(os.getenv("CHROMADB_API_WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.getenv("CHROMADB_API_THREADS", "4"))
+worker_class = "gthread"
+timeout = int(os.getenv("CHROMADB_API_TIMEOUT", "60"))
+keepalive = 5
+
+# Inference threads per worker, so workers * threads does not oversubscribe the CPU
+inference_threads = int(os.getenv(
+    "CHROMADB_INFERENCE_THREADS",
+    str(max(1, multiprocessing.cpu_count() // max(1, workers)))
+))
+
+# Pin math-library thread pools; the config file is read before the app
+# (and torch) is imported, so this takes effect in every worker
+for _name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(_name, str(inference_threads))
+# Tokenizer threads do not survive fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+# Load the app (and with it the model and collection) in the master before forking
+preload_app = True
+
+accesslog = "-"
+loglevel = os.getenv("CHROMADB_API_LOG_LEVEL", "info")
+
+def when_ready(server):
+    """Build the service in the master and freeze it out of the garbage collector"""
+    from chromadb_service import get_chromadb_service
+    service = get_chromadb_service()
+    # A warm-up thread must not be mid-inference when the workers fork
+    service.wait_for_warmup()
+    server.log.info(f"Preloaded search service: {service.get_collection_stats()}")
+    # Objects created so far are never collected, so GC passes in the
+    # workers do not touch (and copy) their pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Per-worker setup: inference thread count and fork-unsafe resources"""
+    try:
+        import torch
+        torch.set_num_threads(inference_threads)
+    except ImportError:
+        pass
+    
+    from chromadb_service import get_chromadb_service
+    get_chromadb_service().after_fork()
+    server.log.info(f"Worker {worker.pid} ready with {inference_threads} inference threads")
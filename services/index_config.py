@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Chroma index settings for Asker Fotball
+Distance space and HNSW parameters come from the environment, are written
+into the collection metadata at build time, and are read back by the
+search service so scores are converted according to the space in use
+"""
+
+import os
+from typing import Dict, Any, Optional
+
+# Configuration
+HNSW_SPACE = os.getenv("HNSW_SPACE", "cosine")  # cosine, l2 or ip
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "50"))
+
+DISTANCE_SPACES = ("cosine", "l2", "ip")
+
+# Chroma's space when a collection was created without hnsw:space
+DEFAULT_CHROMA_SPACE = "l2"
+
+# Metadata keys that fix the index structure; changing any of them requires a rebuild
+STRUCTURAL_KEYS = ("hnsw:space", "hnsw:M", "hnsw:construction_ef")
+
+def hnsw_metadata(space: str = HNSW_SPACE, m: int = HNSW_M, construction_ef: int = HNSW_CONSTRUCTION_EF,
+                  search_ef: int = HNSW_SEARCH_EF) -> Dict[str, Any]:
+    """Collection metadata entries that configure Chroma's HNSW index"""
+    if space not in DISTANCE_SPACES:
+        raise ValueError(f"Unknown distance space: {space} (expected one of {', '.join(DISTANCE_SPACES)})")
+    return {
+        "hnsw:space": space,
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef
+    }
+
+def collection_space(collection) -> str:
+    """Distance space of a collection, from its metadata"""
+    metadata = getattr(collection, "metadata", None) or {}
+    return metadata.get("hnsw:space") or metadata.get("space") or DEFAULT_CHROMA_SPACE
+
+def index_settings_differ(metadata: Optional[Dict[str, Any]], expected: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether a collection was built with other structural index settings than configured"""
+    metadata = metadata or {}
+    expected = expected or hnsw_metadata()
+    actual = {key: metadata.get(key) for key in STRUCTURAL_KEYS}
+    if actual["hnsw:space"] is None:
+        actual["hnsw:space"] = DEFAULT_CHROMA_SPACE
+    return any(actual[key] != expected[key] for key in STRUCTURAL_KEYS
+               if key == "hnsw:space" or actual[key] is not None)
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    """
+    Convert a Chroma distance into a similarity where 1.0 is identical
+    
+    cosine: distance = 1 - cos, so similarity = cos
+    ip: distance = 1 - dot, which is 1 - cos for normalized embeddings
+    l2: Chroma returns the squared L2 distance, which is 2 - 2cos for
+        normalized embeddings
+    """
+    if space == "l2":
+        return 1.0 - distance / 2.0
+    return 1.0 - distance
+
+def exact_nearest(embeddings, query_embedding, space: str, k: int):
+    """
+    Positions and distances of the k rows of embeddings nearest to the query
+    
+    Distances follow Chroma's definitions for the space (1 - cos, squared
+    L2, 1 - dot), so they convert to the same similarity scores as HNSW hits.
+    """
+    import numpy as np
+    
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    if space == "cosine":
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        norms[norms == 0] = 1.0
+        distances = 1.0 - (matrix @ query) / norms
+    elif space == "ip":
+        distances = 1.0 - matrix @ query
+    else:
+        distances = ((matrix - query) ** 2).sum(axis=1)
+    k = min(k, len(distances))
+    if k <= 0:
+        return [], []
+    top = np.argpartition(distances, k - 1)[:k]
+    order = top[np.argsort(distances[top], kind="stable")]
+    return order.tolist(), distances[order].tolist()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+In-process metrics for the search service
+Counters and fixed-bucket histograms rendered in the Prometheus text
+exposition format. Recording is a bisect and an increment under a lock;
+all formatting work happens when /metrics is scraped.
+
+Metrics are per process: with preforked workers each worker reports its own.
+"""
+
+import time
+import bisect
+import threading
+import contextlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow API calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (name, labels, value) produced by a collector at scrape time
+Sample = Tuple[str, Dict[str, str], float]
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """Monotonically increasing count"""
+    
+    def __init__(self, labels: Dict[str, str]):
+        self.labels = labels
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+    
+    def samples(self, name: str) -> List[Sample]:
+        return [(name, self.labels, self.value)]
+
+class Histogram:
+    """Fixed-bucket histogram of observed values (seconds for latencies)"""
+    
+    def __init__(self, labels: Dict[str, str], buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.labels = labels
+        self.bounds = sorted(buckets)
+        # Non-cumulative per-bucket counts; the last slot is the +Inf bucket
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+    
+    @contextlib.contextmanager
+    def time(self):
+        """Observe the wall-clock duration of the enclosed block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+    
+    def samples(self, name: str) -> List[Sample]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.total
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.bounds + [float("inf")], counts):
+            cumulative += count
+            samples.append((f"{name}_bucket", dict(self.labels, le=_format_value(bound)), cumulative))
+        samples.append((f"{name}_sum", self.labels, total))
+        samples.append((f"{name}_count", self.labels, cumulative))
+        return samples
+
+class MetricsRegistry:
+    """Named metric families plus collectors evaluated at scrape time"""
+    
+    def __init__(self):
+        # name -> (type, help, {label values: metric})
+        self._families: Dict[str, Tuple[str, str, Dict[tuple, object]]] = {}
+        self._collectors: List[Tuple[str, str, str, Callable[[], List[Sample]]]] = []
+        self._lock = threading.Lock()
+    
+    def _get(self, kind: str, name: str, help_text: str, labels: Dict[str, str], factory: Callable):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, (kind, help_text, {}))
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} already registered as a {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = factory()
+            return metric
+    
+    def counter(self, name: str, help_text: str, **labels: str) -> Counter:
+        """Get or create the counter with this name and label values"""
+        return self._get("counter", name, help_text, labels, lambda: Counter(labels))
+    
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS,
+                  **labels: str) -> Histogram:
+        """Get or create the histogram with this name and label values"""
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(labels, buckets))
+    
+    def add_collector(self, name: str, kind: str, help_text: str, collect: Callable[[], List[Sample]]):
+        """
+        Register a metric family whose samples are read from existing state
+        at scrape time (e.g. cache statistics), costing nothing on the hot path
+        """
+        with self._lock:
+            self._collectors.append((name, kind, help_text, collect))
+    
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            families = [(name, kind, help_text, list(metrics.values()))
+                        for name, (kind, help_text, metrics) in self._families.items()]
+            collectors = list(self._collectors)
+        
+        lines = []
+        for name, kind, help_text, metrics in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric in metrics:
+                for sample_name, labels, value in metric.samples(name):
+                    lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        
+        for name, kind, help_text, collect in collectors:
+            try:
+                samples = collect()
+            except Exception:
+                continue
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry shared by the service and the API servers
+REGISTRY = MetricsRegistry()
+
+# Content type Prometheus expects for the text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def stage_histogram(stage: str) -> Histogram:
+    """Latency histogram for one stage of the search path"""
+    return REGISTRY.histogram(
+        "search_stage_duration_seconds",
+        "Latency of each stage of the search path in seconds",
+        stage=stage
+    )
+
+def count_api_error(endpoint: str, status: int):
+    """Count an API request answered with an error status"""
+    REGISTRY.counter(
+        "api_errors_total",
+        "API requests answered with an error status",
+        endpoint=endpoint,
+        status=str(status)
+    ).inc()
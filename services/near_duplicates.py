@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate chunk detection for the Asker Fotball ingest pipeline
+Chunks are reduced to MinHash signatures over word shingles; locality
+sensitive hashing (banded signatures) finds candidate pairs, and a chunk
+whose estimated Jaccard similarity to an earlier representative reaches the
+threshold becomes an alias of it instead of being embedded again.
+Only chunks of the same section and team are grouped, so a metadata filter
+that matches an alias also matches its representative
+"""
+
+import os
+import zlib
+import logging
+from typing import List, Dict, Any, Optional, Iterable, Tuple, Callable
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from bm25_index import tokenize
+from chunk_fields import source_file_of, section_of, team_of
+
+# Configuration
+# Off unless set: collapsed chunks are only reachable through their representative
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "false").lower() == "true"
+# Estimated Jaccard similarity of word shingles at which two chunks count as duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+# 16 bands of 8 rows: pairs at 0.85 similarity share a band with ~99% probability
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+
+logger = logging.getLogger(__name__)
+
+class MinHasher:
+    """MinHash signatures of word shingles using multiply-shift hashing"""
+    
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = DEDUP_SHINGLE_SIZE, seed: int = 1):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy not available")
+        rng = np.random.default_rng(seed)
+        # Odd multipliers keep multiply-shift hashing universal
+        self.a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+    
+    def shingles(self, text: str) -> set:
+        """Word n-grams of the normalized text; short texts are one shingle"""
+        tokens = tokenize(text)
+        size = min(self.shingle_size, len(tokens))
+        return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)} if size else set()
+    
+    def signature(self, text: str):
+        """uint32 signature of num_perm minimum hash values, or None for text without words"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            values = (hashes[:, None] * self.a + self.b) >> np.uint64(32)
+        return values.min(axis=0).astype(np.uint32)
+
+class NearDuplicateIndex:
+    """
+    LSH index of representative signatures
+    
+    Each signature is split into bands; chunks sharing any band bucket are
+    candidates, and a candidate is a match when the share of equal MinHash
+    values (the Jaccard estimate) reaches the threshold.
+    """
+    
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 bands: int = DEDUP_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be a multiple of DEDUP_BANDS ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures = []
+        self.ids: List[str] = []
+        self.candidate_checks = 0
+    
+    def _keys(self, signature) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+    
+    def find(self, signature) -> Optional[Tuple[str, float]]:
+        """Most similar representative at or above the threshold, with its similarity"""
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        best = None
+        for candidate in candidates:
+            self.candidate_checks += 1
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (self.ids[candidate], similarity)
+        return best
+    
+    def add(self, chunk_id: str, signature):
+        """Register a representative"""
+        position = len(self.ids)
+        self.ids.append(chunk_id)
+        self._signatures.append(signature)
+        for bucket, key in zip(self._buckets, self._keys(signature)):
+            bucket.setdefault(key, []).append(position)
+
+class DedupResult:
+    """Outcome of a deduplication pass: which chunks are aliases of which representative"""
+    
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.seen = 0
+        self.alias_of: Dict[str, str] = {}
+        self.aliases: Dict[str, List[Dict[str, Any]]] = {}
+        self.representatives: Dict[str, Dict[str, Any]] = {}
+        self.collapsed_chars = 0
+        self.candidate_checks = 0
+    
+    def is_alias(self, chunk_id: str) -> bool:
+        return chunk_id in self.alias_of
+    
+    def aliases_for(self, chunk_id: str) -> List[Dict[str, Any]]:
+        """Chunks collapsed into a representative, as {chunk_id, url, title, similarity}"""
+        return self.aliases.get(chunk_id, [])
+    
+    def report(self) -> Dict[str, Any]:
+        """Summary and every collapsed group, largest first"""
+        groups = [
+            {**self.representatives[chunk_id], "duplicates": aliases}
+            for chunk_id, aliases in sorted(self.aliases.items(), key=lambda item: -len(item[1]))
+        ]
+        by_section: Dict[str, int] = {}
+        for alias_id in self.alias_of:
+            section = alias_id.split("_")[0]
+            by_section[section] = by_section.get(section, 0) + 1
+        return {
+            "threshold": self.threshold,
+            "chunks": self.seen,
+            "stored": self.seen - len(self.alias_of),
+            "collapsed": len(self.alias_of),
+            "groups": len(self.aliases),
+            "collapsed_chars": self.collapsed_chars,
+            "collapsed_by_section": dict(sorted(by_section.items())),
+            "candidate_checks": self.candidate_checks,
+            "duplicate_groups": groups
+        }
+
+def filter_scope(chunk: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    """Section and team of a chunk, the filterable fields an alias must share with its representative"""
+    source_file = source_file_of(chunk["chunk_id"])
+    return section_of(source_file), team_of(source_file)
+
+def find_near_duplicates(chunks: Iterable[Dict[str, Any]], threshold: float = DEDUP_THRESHOLD,
+                         num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS,
+                         shingle_size: int = DEDUP_SHINGLE_SIZE,
+                         scope: Callable[[Dict[str, Any]], Any] = filter_scope) -> DedupResult:
+    """
+    Group near-duplicate chunks in one streaming pass
+    
+    The first chunk of each group (in input order) is its representative;
+    only signatures of representatives are kept in memory. Chunks are only
+    grouped with chunks of the same scope (by default section and team).
+    """
+    hasher = MinHasher(num_perm, shingle_size)
+    indexes: Dict[Any, NearDuplicateIndex] = {}
+    result = DedupResult(threshold)
+    for chunk in chunks:
+        result.seen += 1
+        chunk_id = chunk["chunk_id"]
+        signature = hasher.signature(chunk.get("content") or "")
+        if signature is None:
+            continue
+        key = scope(chunk)
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = NearDuplicateIndex(threshold, num_perm, bands)
+        match = index.find(signature)
+        if match is None:
+            index.add(chunk_id, signature)
+            result.representatives[chunk_id] = {
+                "chunk_id": chunk_id,
+                "url": chunk.get("url", ""),
+                "title": chunk.get("title", "")
+            }
+            continue
+        representative, similarity = match
+        result.alias_of[chunk_id] = representative
+        result.aliases.setdefault(representative, []).append({
+            "chunk_id": chunk_id,
+            "url": chunk.get("url", ""),
+            "title": chunk.get("title", ""),
+            "similarity": round(similarity, 4)
+        })
+        result.collapsed_chars += len(chunk.get("content") or "")
+    result.candidate_checks = sum(index.candidate_checks for index in indexes.values())
+    # Only representatives that absorbed something are worth reporting
+    result.representatives = {chunk_id: result.representatives[chunk_id] for chunk_id in result.aliases}
+    logger.info(f"🧬 Near-duplicates: {len(result.alias_of)} of {result.seen} chunks collapsed "
+                f"into {len(result.aliases)} groups")
+    return result
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Cross-encoder re-ranking for the search service
+A cross-encoder reads query and chunk together and orders first-stage
+candidates more precisely than embedding distance. Scoring runs in batches
+under a per-request time budget; when the budget runs out the first-stage
+order is kept, so re-ranking never adds more than the budget to a search.
+"""
+
+import os
+import time
+import threading
+import importlib.util
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+# Configuration
+# Local directory of a sentence-transformers CrossEncoder model; re-ranking is unavailable when unset
+RERANK_MODEL_PATH = os.getenv("RERANK_MODEL_PATH", "")
+RERANK_DEFAULT = os.getenv("RERANK_DEFAULT", "false").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+CROSS_ENCODER_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+logger = logging.getLogger(__name__)
+
+class PairScoreCache:
+    """Bounded, thread-safe LRU cache of cross-encoder scores per (query, chunk) pair"""
+    
+    def __init__(self, max_size: int = 20000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(query: str, result: Dict[str, Any]) -> tuple:
+        """Key on normalized query text, chunk id and content, so edited chunks are re-scored"""
+        return (" ".join(query.lower().split()), result.get('chunk_id'), hash(result.get('content') or ""))
+    
+    def get(self, key: tuple) -> Optional[float]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return score
+    
+    def put(self, key: tuple, score: float):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class CrossEncoderReranker:
+    """
+    Re-ranks search results with a local cross-encoder model
+    
+    Uncached pairs are scored batch by batch. Each batch is sized to fit the
+    remaining budget, using a running average of the time per pair; when no
+    pair fits, re-ranking stops and the caller keeps the first-stage order.
+    Scores computed so far are cached, so a repeated query can be re-ranked
+    within budget next time.
+    """
+    
+    # Weight of the newest batch in the running time-per-pair estimate
+    SMOOTHING = 0.3
+    
+    def __init__(self, model_path: str = RERANK_MODEL_PATH, batch_size: int = RERANK_BATCH_SIZE,
+                 max_length: int = RERANK_MAX_LENGTH, cache_size: int = RERANK_CACHE_SIZE):
+        if not CROSS_ENCODER_AVAILABLE:
+            raise ImportError("sentence-transformers not available")
+        if not model_path or not os.path.isdir(model_path):
+            raise FileNotFoundError(f"Cross-encoder model directory not found: {model_path or '(RERANK_MODEL_PATH unset)'}")
+        
+        from sentence_transformers import CrossEncoder
+        
+        logger.info(f"🔄 Loading cross-encoder from {model_path}...")
+        self.model_path = model_path
+        self.model = CrossEncoder(model_path, max_length=max_length)
+        self.batch_size = max(1, batch_size)
+        self.cache = PairScoreCache(cache_size)
+        self.seconds_per_pair: Optional[float] = None
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.fallbacks = 0
+        logger.info("✅ Cross-encoder loaded")
+    
+    def warmup(self):
+        """Score one full dummy batch, which also seeds the time-per-pair estimate"""
+        self._score([("warmup", "warmup")] * self.batch_size)
+    
+    def _score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        started = time.perf_counter()
+        scores = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        per_pair = (time.perf_counter() - started) / len(pairs)
+        with self._lock:
+            if self.seconds_per_pair is None:
+                self.seconds_per_pair = per_pair
+            else:
+                self.seconds_per_pair += self.SMOOTHING * (per_pair - self.seconds_per_pair)
+        return [float(score) for score in scores]
+    
+    def rerank(self, query: str, results: List[Dict[str, Any]],
+               budget_ms: float = RERANK_BUDGET_MS) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Order results by cross-encoder score within budget_ms
+        
+        Returns the results (re-ordered, each with a rerank_score, or in their
+        original order on fallback) and a summary of what was done.
+        """
+        started = time.perf_counter()
+        deadline = started + budget_ms / 1000.0
+        keys = [self.cache.make_key(query, r) for r in results]
+        scores = [self.cache.get(key) for key in keys]
+        cached = sum(1 for score in scores if score is not None)
+        
+        missing = [i for i, score in enumerate(scores) if score is None]
+        position = 0
+        while position < len(missing):
+            # Shrink the batch to what is expected to fit in the remaining time
+            size = self.batch_size
+            if self.seconds_per_pair:
+                size = min(size, int((deadline - time.perf_counter()) / self.seconds_per_pair))
+            if size < 1:
+                break
+            batch = missing[position:position + size]
+            position += len(batch)
+            batch_scores = self._score([(query, results[i].get('content') or "") for i in batch])
+            for i, score in zip(batch, batch_scores):
+                scores[i] = score
+                self.cache.put(keys[i], score)
+        
+        info = {
+            "candidates": len(results),
+            "cached": cached,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        if any(score is None for score in scores):
+            with self._lock:
+                self.fallbacks += 1
+            info.update(reranked=False, reason="budget")
+            return results, info
+        
+        order = sorted(range(len(results)), key=lambda i: scores[i], reverse=True)
+        reranked = []
+        for i in order:
+            result = dict(results[i])
+            result['rerank_score'] = scores[i]
+            reranked.append(result)
+        with self._lock:
+            self.reranked += 1
+        info["reranked"] = True
+        return reranked, info
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model_path": self.model_path,
+                "batch_size": self.batch_size,
+                "ms_per_pair": round(self.seconds_per_pair * 1000, 3) if self.seconds_per_pair else None,
+                "reranked": self.reranked,
+                "budget_fallbacks": self.fallbacks,
+                "pair_cache": self.cache.stats()
+            }
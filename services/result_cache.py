@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Semantic result cache for the search service
+Recent query embeddings are kept in a small in-memory matrix; a new query
+whose embedding is close enough (cosine) to a cached one, with the same
+mode, filter and options, is answered with the cached result list without
+touching the vector store
+"""
+
+import os
+import copy
+import json
+import time
+import threading
+from typing import List, Dict, Any, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Configuration
+# Off unless set: a query that is merely similar gets another query's results,
+# so enable it only with a threshold checked against config/search-golden.jsonl
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "0"))  # 0 disables the cache
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "300"))
+# Cosine similarity above which two queries are treated as the same question
+RESULT_CACHE_THRESHOLD = float(os.getenv("RESULT_CACHE_THRESHOLD", "0.93"))
+
+def context_key(mode: str, filter_metadata: Optional[Dict], rerank: bool) -> str:
+    """Everything besides the query text that changes a result list"""
+    return json.dumps([mode, filter_metadata, rerank], sort_keys=True)
+
+class SemanticResultCache:
+    """
+    Bounded, thread-safe cache of result lists looked up by query embedding
+    
+    Entries live in fixed slots of a pre-allocated, normalized embedding
+    matrix, so a lookup is one matrix-vector product over at most max_size
+    rows. Eviction is least recently used; entries expire after ttl_seconds.
+    An entry stored for n results also answers requests for fewer. Results
+    are copied in and out, so callers may modify what they get back.
+    """
+    
+    def __init__(self, max_size: int = RESULT_CACHE_SIZE, ttl_seconds: float = RESULT_CACHE_TTL,
+                 threshold: float = RESULT_CACHE_THRESHOLD):
+        # Without NumPy the cache is disabled rather than slow
+        self.max_size = max(0, max_size) if NUMPY_AVAILABLE else 0
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._reset(dimension=None)
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+    
+    def _reset(self, dimension: Optional[int]):
+        if not self.enabled:
+            return
+        self._matrix = None if dimension is None else np.zeros((self.max_size, dimension), dtype=np.float32)
+        self._used = np.zeros(self.max_size, dtype=bool)
+        self._stored_at = np.zeros(self.max_size, dtype=np.float64)
+        self._last_used = np.zeros(self.max_size, dtype=np.float64)
+        self._contexts: List[Optional[str]] = [None] * self.max_size
+        self._entries: List[Optional[tuple]] = [None] * self.max_size
+    
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+    
+    def get(self, embedding, context: str, max_results: int) -> Optional[List[Dict[str, Any]]]:
+        """Cached results of the most similar query above the threshold, or None"""
+        if not self.enabled:
+            return None
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(vector):
+                self.misses += 1
+                return None
+            
+            now = time.monotonic()
+            if self.ttl_seconds > 0:
+                expired = self._used & (now - self._stored_at > self.ttl_seconds)
+                if expired.any():
+                    self._release(np.flatnonzero(expired))
+                    self.expirations += int(expired.sum())
+            
+            similarities = self._matrix @ vector
+            similarities[~self._used] = -np.inf
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            for slot in candidates[np.argsort(-similarities[candidates])]:
+                stored_results, stored_max = self._entries[slot]
+                # Fewer stored results than asked for is only complete if the search found no more
+                if self._contexts[slot] == context and (stored_max >= max_results or len(stored_results) < stored_max):
+                    self._last_used[slot] = now
+                    self.hits += 1
+                    return copy.deepcopy(stored_results[:max_results])
+            self.misses += 1
+            return None
+    
+    def put(self, embedding, context: str, max_results: int, results: List[Dict[str, Any]]):
+        """Store a result list, evicting the least recently used entry when full"""
+        if not self.enabled:
+            return
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(vector):
+                self._reset(dimension=len(vector))
+            
+            free = np.flatnonzero(~self._used)
+            if len(free):
+                slot = free[0]
+            else:
+                slot = int(np.argmin(self._last_used))
+                self.evictions += 1
+            now = time.monotonic()
+            self._matrix[slot] = vector
+            self._used[slot] = True
+            self._stored_at[slot] = now
+            self._last_used[slot] = now
+            self._contexts[slot] = context
+            self._entries[slot] = (copy.deepcopy(results), max_results)
+    
+    def _release(self, slots):
+        for slot in slots:
+            self._used[slot] = False
+            self._contexts[slot] = None
+            self._entries[slot] = None
+    
+    def clear(self):
+        """Drop all entries, e.g. when the collection version or its sync marker changes"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._release(np.flatnonzero(self._used))
+            self.invalidations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": int(self._used.sum()) if self.enabled else 0,
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Request parsing and response shaping for the search APIs
+Shared by the Flask API (chromadb_api.py) and the ASGI API (chromadb_asgi.py)
+so both expose the same contract
+"""
+
+import os
+import gzip
+import hmac
+import json
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from chromadb_service import SEARCH_MODES
+from chunk_offsets import MAX_CONTEXT_WINDOW
+from vector_backends import where_problem
+
+# Maximum number of queries accepted by /search/batch
+MAX_BATCH_QUERIES = 32
+
+# Responses at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "1"))
+
+# Shared secret for /admin endpoints (sent as X-Admin-Token); when unset every
+# admin call is refused
+ADMIN_TOKEN = os.getenv("CHROMADB_ADMIN_TOKEN", "")
+
+# Let loopback clients use /admin endpoints without a token. Only safe when no
+# reverse proxy runs on the same host, since proxied requests arrive from loopback
+ALLOW_LOOPBACK_ADMIN = os.getenv("ALLOW_LOOPBACK_ADMIN", "false").lower() == "true"
+
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1", "localhost")
+
+# Top-level fields of a search result that can be requested with `fields`;
+# "metadata.<key>" selects a single metadata entry
+RESULT_FIELDS = ("chunk_id", "content", "metadata", "similarity_score", "distance",
+                 "vector_score", "bm25_score", "hybrid_score", "rerank_score", "neighbors")
+
+# Keys of a parsed request that are passed on to ChromaDBSearchService.search
+SEARCH_PARAMS = ("query", "max_results", "filter_metadata", "mode", "rerank", "rerank_budget_ms")
+
+# Upper bound for a client-supplied re-ranking budget
+MAX_RERANK_BUDGET_MS = 5000
+
+# Maximum number of chunk ids accepted by /expand
+MAX_EXPAND_CHUNKS = 50
+
+# Upper bound for a client-supplied request deadline; the ASGI server caps it
+# further at ASGI_REQUEST_TIMEOUT_MS, the Flask server accepts and ignores it
+MAX_REQUEST_TIMEOUT_MS = 60000
+
+def admin_authorized(token: Optional[str], client_host: Optional[str] = None) -> bool:
+    """Check the X-Admin-Token header value against CHROMADB_ADMIN_TOKEN; without a token, deny unless ALLOW_LOOPBACK_ADMIN"""
+    if not ADMIN_TOKEN:
+        return ALLOW_LOOPBACK_ADMIN and client_host in LOOPBACK_ADDRESSES
+    return hmac.compare_digest(token or "", ADMIN_TOKEN)
+
+def validate_search_params(query: Any, max_results: Any, mode: Any = 'vector') -> Optional[Dict[str, str]]:
+    """Validate query parameters, returning an error body or None"""
+    if not isinstance(query, str) or not query.strip():
+        return {
+            'error': 'Invalid query',
+            'message': 'Query must be a non-empty string'
+        }
+    
+    if not isinstance(max_results, int) or max_results < 1 or max_results > 50:
+        return {
+            'error': 'Invalid max_results',
+            'message': 'max_results must be an integer between 1 and 50'
+        }
+    
+    if mode not in SEARCH_MODES:
+        return {
+            'error': 'Invalid mode',
+            'message': f"mode must be one of: {', '.join(SEARCH_MODES)}"
+        }
+    
+    return None
+
+def validate_projection(fields: Any, include_content: Any) -> Optional[Dict[str, str]]:
+    """Validate the fields/include_content response options, returning an error body or None"""
+    if fields is not None:
+        valid = isinstance(fields, list) and fields and all(
+            isinstance(f, str) and (f in RESULT_FIELDS or (f.startswith('metadata.') and len(f) > 9))
+            for f in fields
+        )
+        if not valid:
+            return {
+                'error': 'Invalid fields',
+                'message': f"fields must be a non-empty list of: {', '.join(RESULT_FIELDS)} or metadata.<key>"
+            }
+    
+    if not isinstance(include_content, bool):
+        return {
+            'error': 'Invalid include_content',
+            'message': 'include_content must be true or false'
+        }
+    
+    return None
+
+def validate_filter(filter_metadata: Any) -> Optional[Dict[str, str]]:
+    """Validate the filter_metadata (where clause) option, returning an error body or None"""
+    problem = where_problem(filter_metadata) if filter_metadata is not None else None
+    if problem:
+        return {
+            'error': 'Invalid filter_metadata',
+            'message': f'filter_metadata is not a valid filter: {problem}'
+        }
+    return None
+
+def validate_rerank(rerank: Any, budget_ms: Any) -> Optional[Dict[str, str]]:
+    """Validate the rerank/rerank_budget_ms options, returning an error body or None"""
+    if rerank is not None and not isinstance(rerank, bool):
+        return {
+            'error': 'Invalid rerank',
+            'message': 'rerank must be true or false'
+        }
+    
+    if budget_ms is not None and (isinstance(budget_ms, bool) or not isinstance(budget_ms, (int, float)) or
+                                  budget_ms < 0 or budget_ms > MAX_RERANK_BUDGET_MS):
+        return {
+            'error': 'Invalid rerank_budget_ms',
+            'message': f'rerank_budget_ms must be a number between 0 and {MAX_RERANK_BUDGET_MS}'
+        }
+    
+    return None
+
+def validate_window(window: Any) -> Optional[Dict[str, str]]:
+    """Validate the window (neighbouring chunks per side) option, returning an error body or None"""
+    if isinstance(window, bool) or not isinstance(window, int) or window < 0 or window > MAX_CONTEXT_WINDOW:
+        return {
+            'error': 'Invalid window',
+            'message': f'window must be an integer between 0 and {MAX_CONTEXT_WINDOW}'
+        }
+    return None
+
+def validate_timeout(timeout_ms: Any) -> Optional[Dict[str, str]]:
+    """Validate the timeout_ms (request deadline) option, returning an error body or None"""
+    if timeout_ms is not None and (isinstance(timeout_ms, bool) or not isinstance(timeout_ms, int) or
+                                   timeout_ms < 1 or timeout_ms > MAX_REQUEST_TIMEOUT_MS):
+        return {
+            'error': 'Invalid timeout_ms',
+            'message': f'timeout_ms must be an integer between 1 and {MAX_REQUEST_TIMEOUT_MS}'
+        }
+    return None
+
+def parse_search_request(data: Any) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, str]]]:
+    """Parse a /search body into search parameters, or return an error body"""
+    if not isinstance(data, dict) or 'query' not in data:
+        return None, {
+            'error': 'Query is required',
+            'message': 'Please provide a query in the request body'
+        }
+    
+    params = {
+        'query': data['query'],
+        'max_results': data.get('max_results', 5),
+        'filter_metadata': data.get('filter_metadata'),
+        'mode': data.get('mode', 'vector'),
+        'rerank': data.get('rerank'),
+        'rerank_budget_ms': data.get('rerank_budget_ms'),
+        'window': data.get('window', 0),
+        'fields': data.get('fields'),
+        'include_content': data.get('include_content', True),
+        'timeout_ms': data.get('timeout_ms')
+    }
+    error = (validate_search_params(params['query'], params['max_results'], params['mode']) or
+             validate_filter(params['filter_metadata']) or
+             validate_rerank(params['rerank'], params['rerank_budget_ms']) or
+             validate_window(params['window']) or
+             validate_timeout(params['timeout_ms']) or
+             validate_projection(params['fields'], params['include_content']))
+    if error:
+        return None, error
+    # Asking for a window implies returning it
+    if params['window'] and params['fields'] is not None and 'neighbors' not in params['fields']:
+        params['fields'] = params['fields'] + ['neighbors']
+    return params, None
+
+def search_kwargs(params: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of parsed parameters accepted by ChromaDBSearchService.search"""
+    return {key: params[key] for key in SEARCH_PARAMS}
+
+def parse_batch_request(data: Any) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, str]]]:
+    """
+    Parse a /search/batch body into a list of search parameters, or return an error body
+    
+    timeout_ms is a deadline for the whole batch, so only the top-level value
+    counts and every query carries it.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('queries'), list) or not data['queries']:
+        return None, {
+            'error': 'Queries are required',
+            'message': 'Please provide a non-empty list of queries in the request body'
+        }
+    
+    if len(data['queries']) > MAX_BATCH_QUERIES:
+        return None, {
+            'error': 'Too many queries',
+            'message': f'A batch may contain at most {MAX_BATCH_QUERIES} queries'
+        }
+    
+    timeout_ms = data.get('timeout_ms')
+    error = validate_timeout(timeout_ms)
+    if error:
+        return None, error
+    
+    # Top-level response and re-ranking options apply to every query that does not set its own
+    defaults = {key: data[key] for key in ('fields', 'include_content', 'rerank', 'rerank_budget_ms', 'window')
+                if key in data}
+    
+    queries = []
+    for i, item in enumerate(data['queries']):
+        if not isinstance(item, dict):
+            return None, {
+                'error': 'Invalid query',
+                'message': f'queries[{i}] must be an object with a query field'
+            }
+        
+        params, error = parse_search_request({**defaults, **item})
+        if error:
+            error['message'] = f"queries[{i}]: {error['message']}"
+            return None, error
+        params['timeout_ms'] = timeout_ms
+        queries.append(params)
+    
+    return queries, None
+
+def parse_expand_request(data: Any) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, str]]]:
+    """Parse an /expand body (chunk_ids, window and timeout_ms), or return an error body"""
+    chunk_ids = data.get('chunk_ids') if isinstance(data, dict) else None
+    if not isinstance(chunk_ids, list) or not chunk_ids or not all(isinstance(c, str) and c for c in chunk_ids):
+        return None, {
+            'error': 'Chunk ids are required',
+            'message': 'Please provide a non-empty list of chunk_ids in the request body'
+        }
+    
+    if len(chunk_ids) > MAX_EXPAND_CHUNKS:
+        return None, {
+            'error': 'Too many chunk ids',
+            'message': f'At most {MAX_EXPAND_CHUNKS} chunk_ids may be expanded at once'
+        }
+    
+    window = data.get('window', 1)
+    timeout_ms = data.get('timeout_ms')
+    error = validate_window(window) or validate_timeout(timeout_ms)
+    if error:
+        return None, error
+    return {'chunk_ids': chunk_ids, 'window': window, 'timeout_ms': timeout_ms}, None
+
+def project_results(results: List[Dict[str, Any]], fields: Optional[List[str]] = None,
+                    include_content: bool = True) -> List[Dict[str, Any]]:
+    """Keep only the requested fields of each result"""
+    if fields is None:
+        if include_content:
+            return results
+        return [{key: value for key, value in r.items() if key != 'content'} for r in results]
+    
+    top_fields = [f for f in fields if f in RESULT_FIELDS and (include_content or f != 'content')]
+    # A full metadata projection makes metadata.<key> selections redundant
+    metadata_keys = [] if 'metadata' in top_fields else [f[9:] for f in fields if f.startswith('metadata.')]
+    
+    projected = []
+    for r in results:
+        item = {key: r[key] for key in top_fields if key in r}
+        if metadata_keys:
+            metadata = r.get('metadata') or {}
+            item['metadata'] = {key: metadata.get(key) for key in metadata_keys}
+        projected.append(item)
+    return projected
+
+def search_response(params: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response body for /search"""
+    return {
+        'query': params['query'],
+        'mode': params['mode'],
+        'results': project_results(results, params.get('fields'), params.get('include_content', True)),
+        'total_found': len(results)
+    }
+
+def batch_response(queries: List[Dict[str, Any]], batch_results: List[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Response body for /search/batch"""
+    return {
+        'results': [
+            {
+                'query': q['query'],
+                'results': project_results(results, q.get('fields'), q.get('include_content', True)),
+                'total_found': len(results)
+            }
+            for q, results in zip(queries, batch_results)
+        ],
+        'total_queries': len(queries)
+    }
+
+def expand_response(params: Dict[str, Any], chunks: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Response body for /expand; unknown chunk ids are listed under missing"""
+    return {
+        'window': params['window'],
+        'results': [chunk for chunk in chunks if chunk is not None],
+        'missing': [chunk_id for chunk_id, chunk in zip(params['chunk_ids'], chunks) if chunk is None]
+    }
+
+def encode_json(payload: Any) -> bytes:
+    """Compact UTF-8 JSON, using orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip
+    
+    An explicit gzip entry decides, otherwise "*" does; a q-value of 0 (or
+    one that is not a number) refuses the coding.
+    """
+    qualities = {}
+    for entry in (accept_encoding or '').lower().split(','):
+        coding, _, params = entry.partition(';')
+        coding = coding.strip()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+def encode_response(payload: Any, accept_encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Encode a JSON response body, gzipping it when it is large enough and
+    the client accepts gzip; returns the body and extra headers
+    """
+    body = encode_json(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+    if len(body) >= GZIP_MIN_BYTES and accepts_gzip(accept_encoding):
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
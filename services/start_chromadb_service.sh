@@ -34,6 +34,8 @@ pip install -r requirements.txt
 # Check if ChromaDB collection exists and has data
 echo "🔍 Checking ChromaDB collection..."
 python3 -c "
+from dotenv import load_dotenv
+load_dotenv()
 from chromadb_service import get_chromadb_service
 try:
     service = get_chromadb_service()
@@ -54,4 +56,10 @@ echo ""
 echo "Press Ctrl+C to stop the service"
 echo ""
 
-python3 chromadb_api.py
+# CHROMADB_SERVE_MODE=production runs preforked gunicorn workers sharing one preloaded model
+if [ "$CHROMADB_SERVE_MODE" = "production" ]; then
+    echo "🏭 Production mode: ${CHROMADB_API_WORKERS:-$(nproc)} workers (see gunicorn.conf.py)"
+    exec gunicorn -c gunicorn.conf.py chromadb_api:app
+else
+    python3 chromadb_api.py
+fi
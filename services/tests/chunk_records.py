@@ -0,0 +1,27 @@
+"""Chunk records shaped like the lines of storage/chunks/*.jsonl"""
+
+import json
+from pathlib import Path
+
+def make_chunk(chunk_id, content, **fields):
+    """A chunk record with the fields chunk.js writes; fields override them"""
+    page = chunk_id.split("_chunk_")[0]
+    words = len(content.split())
+    return {
+        "title": page.replace("_", " / "),
+        "url": "https://askerfotball.no/" + page.replace("_", "/"),
+        "breadcrumbs": [],
+        "chunk_id": chunk_id,
+        "idx": int(chunk_id.rsplit("_", 1)[1]),
+        "content": content,
+        "total_chunks": 1,
+        "original_word_count": words,
+        "chunk_word_count": words,
+        **fields
+    }
+
+def write_chunks(path, chunks):
+    """Write chunk records as one JSONL file"""
+    with open(Path(path), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
@@ -0,0 +1,44 @@
+"""
+Shared setup for the search service tests
+The service modules import their siblings directly, as they do when run
+from services/, so that directory goes on sys.path. Configuration that
+would read or write storage/ points at a temporary directory instead
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_TMP = Path(tempfile.mkdtemp(prefix="search-service-tests-"))
+os.environ.setdefault("EMBEDDING_STORE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_STORE_DIR", str(_TMP / "embeddings"))
+os.environ.setdefault("EMBEDDING_WARMUP", "off")
+os.environ.setdefault("COLLECTION_ALIAS_FILE", str(_TMP / "collection-alias.json"))
+os.environ.setdefault("COLLECTION_ALIAS_CHECK_SECONDS", "0")
+os.environ.setdefault("CHUNK_OFFSETS_DIR", str(_TMP / "offsets"))
+os.environ.setdefault("NUMPY_SNAPSHOT_DIR", str(_TMP / "numpy"))
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SCRIPTS_DIR = Path(__file__).parent.parent.parent / "scripts"
+
+@pytest.fixture
+def embed_module(monkeypatch, tmp_path):
+    """scripts/embed.py on a fake chromadb, with chunks, Chroma and reports under tmp_path"""
+    import importlib
+    import fake_chroma
+    
+    for name, module in fake_chroma.chromadb_modules().items():
+        monkeypatch.setitem(sys.modules, name, module)
+    monkeypatch.syspath_prepend(str(SCRIPTS_DIR))
+    fake_chroma.FakeClient.collections = {}
+    Path(os.environ["COLLECTION_ALIAS_FILE"]).unlink(missing_ok=True)
+    embed = importlib.import_module("embed")
+    (tmp_path / "chunks").mkdir()
+    monkeypatch.setattr(embed, "CHUNKS_DIR", tmp_path / "chunks")
+    monkeypatch.setattr(embed, "CHROMA_DIR", tmp_path / "chroma")
+    monkeypatch.setattr(embed, "DEDUP_REPORT", tmp_path / "dedup-report.json")
+    return embed
@@ -0,0 +1,76 @@
+"""
+In-memory stand-in for the parts of chromadb used by the ingest scripts
+Installed into sys.modules by the embed_module fixture, so scripts that
+import chromadb run without it
+"""
+
+import types
+
+import numpy as np
+
+class FakeCollection:
+    """Collection with the add/upsert/get/query/delete/count interface"""
+    
+    def __init__(self, name, metadata=None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.records = {}
+    
+    def add(self, ids, embeddings, metadatas, documents):
+        for chunk_id, embedding, metadata, document in zip(ids, embeddings, metadatas, documents):
+            self.records[chunk_id] = (list(embedding), dict(metadata), document)
+    
+    upsert = add
+    
+    def count(self):
+        return len(self.records)
+    
+    def get(self, ids=None, include=None, limit=None, **kwargs):
+        keys = [i for i in ids if i in self.records] if ids is not None else list(self.records)
+        keys = keys[:limit] if limit else keys
+        return {
+            "ids": keys,
+            "embeddings": [self.records[i][0] for i in keys],
+            "metadatas": [self.records[i][1] for i in keys],
+            "documents": [self.records[i][2] for i in keys]
+        }
+    
+    def query(self, query_embeddings, n_results=10, include=None, **kwargs):
+        query = np.asarray(query_embeddings[0])
+        distances = {i: float(((np.asarray(e) - query) ** 2).sum()) for i, (e, _, _) in self.records.items()}
+        best = sorted(distances, key=distances.get)[:n_results]
+        return {"ids": [best], "distances": [[distances[i] for i in best]]}
+    
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.records.pop(chunk_id, None)
+
+class FakeClient:
+    """PersistentClient whose collections live in a dict shared by every instance"""
+    
+    collections = {}
+    
+    def __init__(self, **kwargs):
+        pass
+    
+    def create_collection(self, name, metadata=None):
+        collection = FakeCollection(name, metadata)
+        FakeClient.collections[name] = collection
+        return collection
+    
+    def get_collection(self, name):
+        return FakeClient.collections[name]
+    
+    def delete_collection(self, name):
+        del FakeClient.collections[name]
+    
+    def list_collections(self):
+        return list(FakeClient.collections.values())
+
+def chromadb_modules():
+    """Module objects for chromadb and chromadb.config"""
+    chromadb = types.ModuleType("chromadb")
+    chromadb.PersistentClient = FakeClient
+    config = types.ModuleType("chromadb.config")
+    config.Settings = lambda **kwargs: None
+    return {"chromadb": chromadb, "chromadb.config": config}
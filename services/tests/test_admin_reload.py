@@ -0,0 +1,49 @@
+"""Tests for access control on /admin/reload"""
+
+import pytest
+
+import chromadb_api
+import search_requests
+
+class ReloadingService:
+    def __init__(self):
+        self.reloads = 0
+    
+    def reload(self):
+        self.reloads += 1
+        return {"reloaded": True}
+
+@pytest.fixture
+def client(monkeypatch):
+    service = ReloadingService()
+    monkeypatch.setattr(chromadb_api, "get_chromadb_service", lambda: service)
+    return chromadb_api.app.test_client(), service
+
+def test_proxied_request_without_configured_token_is_refused(client, monkeypatch):
+    client, service = client
+    monkeypatch.setattr(search_requests, "ADMIN_TOKEN", "")
+    monkeypatch.setattr(search_requests, "ALLOW_LOOPBACK_ADMIN", False)
+    # A reverse proxy on the same host forwards outside requests from 127.0.0.1
+    response = client.post("/admin/reload", headers={"X-Forwarded-For": "203.0.113.7"},
+                           environ_base={"REMOTE_ADDR": "127.0.0.1"})
+    assert response.status_code == 401
+    assert service.reloads == 0
+
+def test_loopback_without_token_needs_the_opt_in(monkeypatch):
+    monkeypatch.setattr(search_requests, "ADMIN_TOKEN", "")
+    monkeypatch.setattr(search_requests, "ALLOW_LOOPBACK_ADMIN", True)
+    assert search_requests.admin_authorized(None, "127.0.0.1")
+    assert search_requests.admin_authorized(None, "::1")
+    assert not search_requests.admin_authorized(None, "203.0.113.7")
+
+def test_configured_token_is_required_even_from_loopback(client, monkeypatch):
+    client, service = client
+    monkeypatch.setattr(search_requests, "ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(search_requests, "ALLOW_LOOPBACK_ADMIN", True)
+    assert client.post("/admin/reload").status_code == 401
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert response.get_json() == {"reloaded": True}
+    assert service.reloads == 1
@@ -0,0 +1,80 @@
+"""Tests for per-request deadlines in the ASGI server"""
+
+import time
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+import chromadb_asgi
+from search_requests import parse_search_request, parse_batch_request
+
+class SlowService:
+    """Search service whose stages each take stage_seconds"""
+    
+    def __init__(self, stage_seconds):
+        self.stage_seconds = stage_seconds
+        self.calls = []
+    
+    def search(self, **kwargs):
+        self.calls.append("search")
+        time.sleep(self.stage_seconds)
+        return [{"chunk_id": "a_chunk_0", "content": "x", "metadata": {}, "similarity_score": 1.0, "distance": 0.0}]
+    
+    def expand_results(self, results, window):
+        self.calls.append("expand_results")
+        time.sleep(self.stage_seconds)
+        return results
+
+@pytest.fixture
+def client(monkeypatch):
+    service = SlowService(0.15)
+    monkeypatch.setattr(chromadb_asgi, "get_chromadb_service", lambda: service)
+    # Not entered as a context manager, so the lifespan does not shut the executor down
+    return TestClient(chromadb_asgi.app), service
+
+def test_stages_share_one_request_deadline(client):
+    client, service = client
+    # Each stage fits in 250 ms on its own, both together do not
+    response = client.post("/search", json={"query": "x", "window": 1, "timeout_ms": 250})
+    assert response.status_code == 504
+    assert service.calls == ["search", "expand_results"]
+    
+    response = client.post("/search", json={"query": "x", "window": 1, "timeout_ms": 1000})
+    assert response.status_code == 200
+
+def test_expired_deadline_does_not_submit_work():
+    calls = []
+    
+    async def run():
+        deadline = chromadb_asgi.request_deadline(0)
+        await chromadb_asgi.run_blocking(calls.append, "ran", deadline=deadline)
+    
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert calls == []
+
+def test_run_blocking_gets_the_remaining_budget():
+    async def run():
+        deadline = chromadb_asgi.request_deadline(300)
+        await chromadb_asgi.run_blocking(time.sleep, 0.2, deadline=deadline)
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await chromadb_asgi.run_blocking(time.sleep, 0.5, deadline=deadline)
+        return time.monotonic() - started
+    
+    assert asyncio.run(run()) < 0.2
+
+def test_request_timeout_is_capped_at_the_server_default():
+    default = chromadb_asgi.ASGI_REQUEST_TIMEOUT_MS
+    assert chromadb_asgi.request_timeout_ms({"timeout_ms": None}) == default
+    assert chromadb_asgi.request_timeout_ms({"timeout_ms": 100}) == 100
+    assert chromadb_asgi.request_timeout_ms({"timeout_ms": default + 1}) == default
+
+def test_timeout_ms_is_validated_and_shared_by_a_batch():
+    for timeout_ms in (0, -5, "100", True):
+        assert parse_search_request({"query": "x", "timeout_ms": timeout_ms})[1]["error"] == "Invalid timeout_ms"
+    queries, error = parse_batch_request({"queries": [{"query": "a"}, {"query": "b", "timeout_ms": 1}],
+                                          "timeout_ms": 300})
+    assert error is None
+    assert [q["timeout_ms"] for q in queries] == [300, 300]
@@ -0,0 +1,66 @@
+"""Tests for the in-process BM25 index, rank fusion and hybrid search"""
+
+import math
+
+import pytest
+
+from bm25_index import BM25Index, tokenize, reciprocal_rank_fusion, weighted_score_fusion
+from chromadb_service import ChromaDBSearchService
+from embedding_providers import StubEmbeddingProvider
+from vector_backends import NumpyVectorBackend
+
+DOCUMENTS = [
+    ("a", "Treningstider for G15 på Føyka kunstgress"),
+    ("b", "Billetter og sesongkort til A-laget"),
+    ("c", "G15 spiller cup i juni, G15 trener tirsdag"),
+    ("d", "Kontakt klubben")
+]
+
+@pytest.fixture
+def index():
+    return BM25Index.from_documents(DOCUMENTS)
+
+def test_tokenize_matches_the_node_index():
+    # ASCII \W, as in build-bm25.js: æ/ø/å split words
+    assert tokenize("Føyka Stadion, G15!") == ["f", "yka", "stadion", "g15"]
+
+def test_scores_follow_the_bm25_formula(index):
+    results = index.search("billetter")
+    assert [doc_id for doc_id, _ in results] == ["b"]
+    n, df, tf, length = 4, 1, 1, 6
+    avg = sum(len(tokenize(text)) for _, text in DOCUMENTS) / n
+    idf = math.log((n - df + 0.5) / (df + 0.5) + 1)
+    expected = idf * tf * 2.2 / (tf + 1.2 * (1 - 0.75 + 0.75 * length / avg))
+    assert results[0][1] == pytest.approx(expected)
+
+def test_term_frequency_ranks_higher_and_limit_applies(index):
+    assert [doc_id for doc_id, _ in index.search("g15")] == ["c", "a"]
+    assert len(index.search("g15", limit=1)) == 1
+    assert index.search("ukjent") == []
+
+def test_allowed_restricts_scoring(index):
+    assert [doc_id for doc_id, _ in index.search("g15", allowed=["a", "d"])] == ["a"]
+    assert index.search("g15", allowed=["missing"]) == []
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60)
+    assert fused["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert max(fused, key=fused.get) == "b"
+    weighted = reciprocal_rank_fusion([["a"], ["c"]], k=0, weights=[0.25, 0.75])
+    assert weighted == {"a": 0.25, "c": 0.75}
+
+def test_weighted_score_fusion_normalizes_each_map():
+    fused = weighted_score_fusion([{"a": 10.0, "b": 5.0}, {"b": 0.9, "c": 0.1}], [0.5, 0.5])
+    assert fused == pytest.approx({"a": 0.5, "b": 0.5, "c": 0.0})
+
+def test_hybrid_search_finds_lexical_and_vector_matches():
+    provider = StubEmbeddingProvider(dimension=64)
+    ids = [doc_id for doc_id, _ in DOCUMENTS]
+    texts = [text for _, text in DOCUMENTS]
+    backend = NumpyVectorBackend(ids, provider.embed(texts), texts, [{} for _ in ids])
+    service = ChromaDBSearchService(collection=backend, embedding_provider=provider)
+    
+    results = service.search("G15 trener", max_results=2, mode="hybrid")
+    assert [r["chunk_id"] for r in results] == ["c", "a"]
+    assert all("hybrid_score" in r for r in results)
+    assert [r["chunk_id"] for r in service.search("sesongkort", max_results=1, mode="bm25")] == ["b"]
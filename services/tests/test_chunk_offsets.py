@@ -0,0 +1,73 @@
+"""Tests for the byte-offset index over the chunk JSONL files"""
+
+import pytest
+
+from chunk_offsets import ChunkOffsetIndex, split_chunk_id
+from chunk_records import make_chunk, write_chunks
+
+PAGE = [make_chunk(f"lag_g15_chunk_{n}", f"Del {n} om G15 på Føyka") for n in range(4)]
+OTHER = [make_chunk("klubb_kontakt_chunk_0", "Kontakt klubben")]
+
+@pytest.fixture
+def chunks_dir(tmp_path):
+    directory = tmp_path / "chunks"
+    directory.mkdir()
+    write_chunks(directory / "lag.jsonl", PAGE)
+    write_chunks(directory / "klubb.jsonl", OTHER)
+    return directory
+
+@pytest.fixture
+def index(chunks_dir, tmp_path):
+    index = ChunkOffsetIndex.open(chunks_dir, tmp_path / "offsets")
+    yield index
+    index.close()
+
+def test_split_chunk_id():
+    assert split_chunk_id("lag_g15_chunk_12") == ("lag_g15", 12)
+    assert split_chunk_id("no-chunk-suffix") is None
+
+def test_reads_chunks_by_id(index):
+    assert len(index) == 5
+    assert index.get("lag_g15_chunk_2") == PAGE[2]
+    assert index.get("klubb_kontakt_chunk_0") == OTHER[0]
+    assert index.get("lag_g15_chunk_9") is None
+    assert "lag_g15_chunk_0" in index
+
+def test_saved_index_is_reused_memory_mapped(index, chunks_dir, tmp_path):
+    loaded = ChunkOffsetIndex.load(chunks_dir, tmp_path / "offsets")
+    assert loaded is not None
+    assert loaded.ids == index.ids
+    assert loaded.get("lag_g15_chunk_3") == PAGE[3]
+    loaded.close()
+
+def test_neighbors_stay_on_the_page_in_order(index):
+    neighbors = index.neighbors("lag_g15_chunk_1", window=2)
+    assert [(n["chunk_id"], n["position"]) for n in neighbors] == [
+        ("lag_g15_chunk_0", -1), ("lag_g15_chunk_2", 1), ("lag_g15_chunk_3", 2)
+    ]
+    assert neighbors[0]["content"] == PAGE[0]["content"]
+    assert index.neighbors("lag_g15_chunk_1", window=0) == []
+    assert index.neighbors("klubb_kontakt_chunk_0", window=3) == []
+
+def test_rewritten_file_triggers_one_rebuild(index, chunks_dir, tmp_path):
+    index.get("lag_g15_chunk_0")
+    # chunk.js rewrites files in place; longer content moves every later line
+    rewritten = [make_chunk(c["chunk_id"], c["content"] + " (oppdatert med mer tekst)") for c in PAGE]
+    write_chunks(chunks_dir / "lag.jsonl", rewritten)
+    
+    assert index.get("lag_g15_chunk_3") == rewritten[3]
+    assert index.get("lag_g15_chunk_1") == rewritten[1]
+    assert index.stats()["rebuilds"] == 1
+    # The rebuilt table was saved, so a fresh process does not rebuild again
+    assert ChunkOffsetIndex.load(chunks_dir, tmp_path / "offsets") is not None
+
+def test_truncated_and_removed_files(index, chunks_dir, tmp_path):
+    write_chunks(chunks_dir / "lag.jsonl", PAGE[:2])
+    assert index.get("lag_g15_chunk_3") is None
+    assert index.get("lag_g15_chunk_1") == PAGE[1]
+    assert len(index) == 3
+    
+    (chunks_dir / "klubb.jsonl").unlink()
+    assert index.get("klubb_kontakt_chunk_0") is None
+    assert index.stats()["rebuilds"] == 2
+    assert ChunkOffsetIndex.load(chunks_dir, tmp_path / "missing") is None
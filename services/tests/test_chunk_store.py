@@ -0,0 +1,63 @@
+"""Tests for the columnar in-memory chunk store"""
+
+import pytest
+
+from chunk_fields import chunk_metadata
+from chunk_records import make_chunk
+from chunk_store import ChunkStore
+
+CHUNKS = [
+    make_chunk(f"lag_g15_chunk_{n}", f"Del {n}: G15 trener på Føyka ⚽", total_chunks=3,
+               breadcrumbs=["Lag", "G15"])
+    for n in range(3)
+] + [make_chunk("klubb_kontakt_chunk_0", "Kontakt klubben")]
+
+@pytest.fixture
+def store():
+    return ChunkStore.from_chunks(CHUNKS)
+
+def test_round_trip_matches_collection_metadata(store):
+    assert len(store) == 4
+    for chunk in CHUNKS:
+        stored = store.get_by_id(chunk["chunk_id"])
+        assert stored == {
+            "chunk_id": chunk["chunk_id"],
+            "content": chunk["content"],
+            "metadata": chunk_metadata(chunk)
+        }
+    assert store.get_by_id("missing") is None
+    assert [chunk_id for chunk_id, _ in store.documents()] == [c["chunk_id"] for c in CHUNKS]
+
+def test_repeated_strings_are_pooled(store):
+    title_codes = {store._strings["title"][row] for row in range(3)}
+    assert len(title_codes) == 1
+    assert store.value(0, "title") == store.value(2, "title") == CHUNKS[0]["title"]
+
+def test_content_hash_is_a_fixed_width_digest_column(store):
+    assert "content_hash" not in store.STRING_FIELDS
+    assert len(store._hashes["content_hash"]) == len(store) * ChunkStore.DIGEST_BYTES
+    hashes = {store.value(row, "content_hash") for row in range(len(store))}
+    assert hashes == {chunk_metadata(chunk)["content_hash"] for chunk in CHUNKS}
+    # Unique hashes no longer grow the string pool
+    assert not hashes & set(store._pool[1:])
+
+def test_unusual_hash_values_still_round_trip():
+    store = ChunkStore()
+    values = {"a": "ABCDEF" * 10 + "ABCD", "b": "not-a-digest", "c": 42, "d": None}
+    for chunk_id, value in values.items():
+        store.add(f"{chunk_id}_chunk_0", "x", {"content_hash": value} if value is not None else {})
+    assert store.get(0)["metadata"] == {"content_hash": "ABCDEF" * 10 + "ABCD"}
+    assert store.get(1)["metadata"] == {"content_hash": "not-a-digest"}
+    assert store.get(2)["metadata"] == {"content_hash": 42}
+    assert store.get(3)["metadata"] == {}
+    assert store.value(3, "content_hash") is None
+
+def test_missing_ints_extra_fields_and_duplicate_ids():
+    store = ChunkStore()
+    row = store.add("a_chunk_0", "første", {"idx": 0, "title": "A", "score": 0.5, "total_chunks": True})
+    assert store.add("a_chunk_0", "andre", {"idx": 1}) == row
+    assert len(store) == 1
+    assert store.text(row) == "første"
+    assert store.value(row, "crawl_date") is None
+    assert store.metadata(row) == {"idx": 0, "title": "A", "score": 0.5, "total_chunks": True}
+    assert store.stats()["pooled_strings"] == 1
@@ -0,0 +1,76 @@
+"""Tests for collection version aliases and garbage collection"""
+
+import json
+
+import pytest
+
+from fake_chroma import FakeClient
+from collection_versions import (
+    write_alias, read_alias, resolve_collection_name, resolve_collection_version, list_versions, collect_garbage
+)
+
+def make_client(names):
+    """Fake Chroma client holding empty collections with the given names"""
+    FakeClient.collections = {}
+    client = FakeClient()
+    for name in names:
+        client.create_collection(name)
+    return client
+
+def collection_names():
+    return sorted(FakeClient.collections)
+
+@pytest.fixture
+def alias_file(tmp_path):
+    return tmp_path / "collection-alias.json"
+
+VERSIONS = ["docs__20260101T000000", "docs__20260201T000000", "docs__20260301T000000", "docs__20260401T000000"]
+
+def test_unversioned_alias_resolves_to_itself(alias_file):
+    assert resolve_collection_name("docs", alias_file) == "docs"
+    assert resolve_collection_version("docs", alias_file) == ("docs", None)
+
+def test_write_alias_tracks_previous_and_sync_marker(alias_file):
+    write_alias("docs", VERSIONS[0], alias_file, synced_at="t0")
+    write_alias("docs", VERSIONS[1], alias_file, synced_at="t1")
+    assert read_alias("docs", alias_file)["previous"] == VERSIONS[0]
+    
+    # An incremental sync keeps the name and the rollback target, but moves the marker
+    write_alias("docs", VERSIONS[1], alias_file, synced_at="t2")
+    entry = read_alias("docs", alias_file)
+    assert entry["previous"] == VERSIONS[0]
+    assert resolve_collection_version("docs", alias_file) == (VERSIONS[1], "t2")
+    assert not alias_file.with_suffix(".json.tmp").exists()
+
+def test_unreadable_alias_file(alias_file):
+    alias_file.write_text("{not json")
+    assert read_alias("docs", alias_file) is None
+    write_alias("docs", VERSIONS[0], alias_file)
+    assert json.loads(alias_file.read_text())["docs"]["collection"] == VERSIONS[0]
+
+def test_list_versions_ignores_other_collections():
+    client = make_client(["docs", "other__20260101T000000", VERSIONS[1], VERSIONS[0]])
+    assert list_versions(client, "docs") == VERSIONS[:2]
+
+def test_collect_garbage_keeps_live_and_newest(alias_file):
+    client = make_client(VERSIONS)
+    write_alias("docs", VERSIONS[2], alias_file)
+    assert collect_garbage(client, "docs", keep=1, alias_file=alias_file) == VERSIONS[:2]
+    assert collection_names() == VERSIONS[2:]
+
+def test_collect_garbage_keep_zero(alias_file):
+    client = make_client(VERSIONS)
+    write_alias("docs", VERSIONS[3], alias_file)
+    collect_garbage(client, "docs", keep=0, alias_file=alias_file)
+    assert collection_names() == [VERSIONS[3]]
+
+def test_legacy_collection_is_oldest_once_alias_moved(alias_file):
+    client = make_client(["docs", VERSIONS[0]])
+    # Before the first versioned build the legacy collection is live
+    assert collect_garbage(client, "docs", keep=0, alias_file=alias_file) == [VERSIONS[0]]
+    assert collection_names() == ["docs"]
+    
+    client = make_client(["docs", VERSIONS[0], VERSIONS[1]])
+    write_alias("docs", VERSIONS[1], alias_file)
+    assert collect_garbage(client, "docs", keep=1, alias_file=alias_file) == ["docs"]
+    assert collection_names() == [VERSIONS[0], VERSIONS[1]]
@@ -0,0 +1,80 @@
+"""Tests for token-aware batching, concurrency and retries of the OpenAI provider"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from embedding_providers import OpenAIEmbeddingProvider
+
+def make_provider(max_batch_tokens, max_batch_inputs):
+    # Batching needs no client; skip __init__ so neither openai nor an API key is required
+    provider = OpenAIEmbeddingProvider.__new__(OpenAIEmbeddingProvider)
+    provider.max_batch_tokens = max_batch_tokens
+    provider.max_batch_inputs = max_batch_inputs
+    return provider
+
+def test_batches_cover_every_input_in_order():
+    provider = make_provider(max_batch_tokens=10, max_batch_inputs=100)
+    texts = ["x" * 12] * 7  # 4 estimated tokens each
+    batches = provider.make_batches(texts)
+    assert [list(batch) for batch in batches] == [[0, 1], [2, 3], [4, 5], [6]]
+
+def test_input_count_limit():
+    provider = make_provider(max_batch_tokens=10_000, max_batch_inputs=3)
+    assert [len(batch) for batch in provider.make_batches(["kort"] * 7)] == [3, 3, 1]
+
+def test_oversized_text_gets_its_own_batch():
+    provider = make_provider(max_batch_tokens=10, max_batch_inputs=100)
+    batches = provider.make_batches(["abc", "x" * 300, "abc"])
+    assert [list(batch) for batch in batches] == [[0], [1], [2]]
+
+def test_no_texts_no_batches():
+    assert make_provider(10, 10).make_batches([]) == []
+
+class FakeEmbeddings:
+    """client.embeddings of the OpenAI SDK: returns items out of order and fails the first calls"""
+    
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.inputs = []
+    
+    def create(self, model, input):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection reset")
+        self.inputs.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+def make_client_provider(embeddings, monkeypatch, **limits):
+    provider = make_provider(limits.get("max_batch_tokens", 10), limits.get("max_batch_inputs", 100))
+    provider.client = SimpleNamespace(embeddings=embeddings)
+    provider.model = "text-embedding-3-small"
+    provider.concurrency = 3
+    provider.max_retries = 2
+    provider.retries = 0
+    monkeypatch.setattr(OpenAIEmbeddingProvider, "_is_retryable", staticmethod(lambda e: isinstance(e, ConnectionError)))
+    monkeypatch.setattr("embedding_providers.time.sleep", lambda seconds: None)
+    return provider
+
+def test_concurrent_batches_keep_input_order(monkeypatch):
+    embeddings = FakeEmbeddings()
+    provider = make_client_provider(embeddings, monkeypatch)
+    texts = ["x" * n for n in range(3, 30, 3)]
+    assert provider.embed(texts) == [[float(len(text))] for text in texts]
+    assert len(embeddings.inputs) > 1
+
+def test_transient_errors_are_retried(monkeypatch):
+    provider = make_client_provider(FakeEmbeddings(failures=2), monkeypatch)
+    assert provider.embed(["abc"]) == [[3.0]]
+    assert provider.retries == 2
+
+def test_retries_give_up_after_max_retries(monkeypatch):
+    provider = make_client_provider(FakeEmbeddings(failures=3), monkeypatch)
+    with pytest.raises(ConnectionError):
+        provider.embed(["abc"])
+
+def test_backoff_honours_retry_after():
+    error = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "7"}))
+    assert OpenAIEmbeddingProvider._backoff_delay(0, error) == 7.0
+    assert 0 <= OpenAIEmbeddingProvider._backoff_delay(3, ValueError()) <= 4.0
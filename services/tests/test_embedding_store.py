@@ -0,0 +1,96 @@
+"""Tests for the persistent embedding store and the provider wrapper reading through it"""
+
+import json
+
+import numpy as np
+import pytest
+
+from embedding_store import EmbeddingStore, StoreBackedProvider, text_hash
+
+class CountingProvider:
+    model_name = "counting"
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def embed(self, texts):
+        self.encoded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+def test_vectors_survive_reopening(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put_many(["a", "bb"], [[1.0, 2.0], [3.0, 4.0]])
+    store.put_many(["bb", "ccc"], [[9.0, 9.0], [5.0, 6.0]])
+    
+    reopened = EmbeddingStore(tmp_path)
+    assert len(reopened) == 3
+    assert reopened.get_many(["ccc", "bb", "missing"]) == [[5.0, 6.0], [3.0, 4.0], None]
+    assert (tmp_path / "keys.bin").stat().st_size == 3 * EmbeddingStore.KEY_BYTES
+
+def test_writes_append_only_new_rows(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put_many(["a"], [[1.0, 2.0]])
+    keys_before = (tmp_path / "keys.bin").read_bytes()
+    store.put_many(["b"], [[3.0, 4.0]])
+    assert (tmp_path / "keys.bin").read_bytes() == keys_before + text_hash("b")
+
+def test_reader_refresh_picks_up_appended_rows(tmp_path):
+    writer = EmbeddingStore(tmp_path)
+    writer.put_many(["a"], [[1.0, 2.0]])
+    reader = EmbeddingStore(tmp_path)
+    writer.put_many(["b"], [[3.0, 4.0]])
+    assert reader.get_many(["b"]) == [None]
+    reader.refresh()
+    assert reader.get_many(["a", "b"]) == [[1.0, 2.0], [3.0, 4.0]]
+
+def test_interrupted_write_is_ignored_and_truncated(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put_many(["a"], [[1.0, 2.0]])
+    # A crash after the vectors but in the middle of the keys
+    with open(tmp_path / "vectors.bin", "ab") as f:
+        f.write(np.array([[7.0, 8.0]], dtype=np.float32).tobytes())
+    with open(tmp_path / "keys.bin", "ab") as f:
+        f.write(text_hash("b")[:10])
+    
+    reopened = EmbeddingStore(tmp_path)
+    assert len(reopened) == 1
+    reopened.put_many(["c"], [[5.0, 6.0]])
+    assert EmbeddingStore(tmp_path).get_many(["a", "b", "c"]) == [[1.0, 2.0], None, [5.0, 6.0]]
+
+def test_legacy_index_is_converted(tmp_path):
+    np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32).tofile(tmp_path / "vectors.bin")
+    with open(tmp_path / "index.json", "w") as f:
+        json.dump({"dtype": "float32", "dimension": 2, "count": 2,
+                   "rows": {text_hash("b").hex(): 1, text_hash("a").hex(): 0}}, f)
+    store = EmbeddingStore(tmp_path)
+    assert store.get_many(["a", "b"]) == [[1.0, 2.0], [3.0, 4.0]]
+    assert not (tmp_path / "index.json").exists()
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put_many(["a"], [[1.0, 2.0]])
+    with pytest.raises(ValueError):
+        store.put_many(["b"], [[1.0, 2.0, 3.0]])
+
+def test_float16_store(tmp_path):
+    store = EmbeddingStore(tmp_path, dtype="float16")
+    store.put_many(["a"], [[0.5, 0.25]])
+    reopened = EmbeddingStore(tmp_path)
+    assert reopened.dtype == "float16"
+    assert reopened.get_many(["a"]) == [[0.5, 0.25]]
+
+def test_provider_encodes_only_missing_texts(tmp_path):
+    provider = CountingProvider()
+    wrapped = StoreBackedProvider(provider, EmbeddingStore(tmp_path))
+    wrapped.embed(["a", "bb"])
+    assert wrapped.embed(["bb", "ccc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert provider.encoded == ["a", "bb", "ccc"]
+
+def test_read_only_provider_does_not_write(tmp_path):
+    store = EmbeddingStore(tmp_path)
+    store.put_many(["a"], [[1.0, 1.0]])
+    wrapped = StoreBackedProvider(CountingProvider(), store, write_back=False)
+    wrapped.embed(["a", "query"])
+    assert len(EmbeddingStore(tmp_path)) == 1
+    stats = store.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
@@ -0,0 +1,49 @@
+"""Tests for content-hash based incremental sync in scripts/embed.py"""
+
+from chunk_records import make_chunk, write_chunks as write_jsonl
+from embedding_providers import StubEmbeddingProvider
+
+def write_chunks(embed, chunks):
+    write_jsonl(embed.CHUNKS_DIR / "lag_g15.jsonl", chunks)
+
+def chunk(n, content):
+    return make_chunk(f"lag_g15_chunk_{n}", content)
+
+def build(embed, provider):
+    client = embed.setup_chroma_client()
+    collection = embed.store_embeddings_in_chroma(embed.iter_chunks(), provider, client)
+    embed.write_alias(embed.COLLECTION_NAME, collection.name)
+    return client, collection
+
+def test_only_changed_chunks_are_embedded_and_removed_ones_deleted(embed_module):
+    embed, provider = embed_module, StubEmbeddingProvider(dimension=16)
+    write_chunks(embed, [chunk(0, "Trening tirsdag"), chunk(1, "Kamp lørdag"), chunk(2, "Dugnad")])
+    client, collection = build(embed, provider)
+    
+    write_chunks(embed, [chunk(0, "Trening tirsdag"), chunk(1, "Kamp søndag"), chunk(3, "Cup i juni")])
+    embedded = []
+    embed_texts = provider.embed
+    provider.embed = lambda texts: embedded.extend(texts) or embed_texts(texts)
+    synced, modified = embed.update_embeddings_in_chroma(embed.iter_chunks(), provider, client)
+    
+    assert synced is collection and modified
+    assert sorted(embedded) == ["Cup i juni", "Kamp søndag"]
+    assert sorted(collection.records) == ["lag_g15_chunk_0", "lag_g15_chunk_1", "lag_g15_chunk_3"]
+    assert collection.records["lag_g15_chunk_1"][2] == "Kamp søndag"
+
+def test_unchanged_chunks_modify_nothing(embed_module):
+    embed, provider = embed_module, StubEmbeddingProvider(dimension=16)
+    write_chunks(embed, [chunk(0, "Trening tirsdag")])
+    client, collection = build(embed, provider)
+    _, modified = embed.update_embeddings_in_chroma(embed.iter_chunks(), provider, client)
+    assert not modified
+
+def test_empty_chunk_files_delete_nothing(embed_module):
+    embed, provider = embed_module, StubEmbeddingProvider(dimension=16)
+    write_chunks(embed, [chunk(0, "Trening tirsdag"), chunk(1, "Kamp lørdag")])
+    client, collection = build(embed, provider)
+    
+    (embed.CHUNKS_DIR / "lag_g15.jsonl").write_text("\n{not json\n", encoding="utf-8")
+    _, modified = embed.update_embeddings_in_chroma(embed.iter_chunks(), provider, client)
+    assert not modified
+    assert collection.count() == 2
@@ -0,0 +1,81 @@
+"""Tests for the streaming encode/write pipeline of scripts/embed.py"""
+
+import threading
+
+import pytest
+
+from fake_chroma import FakeCollection
+
+class StubProvider:
+    model_name = "stub"
+    
+    def embed(self, texts):
+        return [[float(len(text)), 0.0] for text in texts]
+
+def items(n):
+    return ((({"chunk_id": f"c{i}", "content": "x" * i}), {"idx": i}) for i in range(n))
+
+def test_every_chunk_is_written_once_in_batches(embed_module):
+    collection = FakeCollection("docs")
+    pipeline = embed_module.IngestPipeline(collection, StubProvider(), batch_size=3, queue_size=1)
+    assert pipeline.run(items(10)) == 10
+    assert pipeline.batches == 4
+    assert sorted(collection.records, key=lambda i: int(i[1:])) == [f"c{i}" for i in range(10)]
+    assert collection.records["c4"] == ([4.0, 0.0], {"idx": 4}, "xxxx")
+
+def test_writer_errors_reach_the_caller_and_stop_encoding(embed_module):
+    class FailingCollection(FakeCollection):
+        def add(self, **kwargs):
+            raise RuntimeError("disk full")
+    
+    encoded = []
+    
+    class RecordingProvider(StubProvider):
+        def embed(self, texts):
+            encoded.append(len(texts))
+            return super().embed(texts)
+    
+    pipeline = embed_module.IngestPipeline(FailingCollection("docs"), RecordingProvider(), batch_size=2, queue_size=1)
+    with pytest.raises(RuntimeError, match="disk full"):
+        pipeline.run(items(100))
+    assert pipeline.written == 0
+    # Encoding stops soon after the writer fails instead of running through the input
+    assert len(encoded) < 10
+
+def test_encode_errors_stop_the_writer(embed_module):
+    class FailingProvider(StubProvider):
+        def embed(self, texts):
+            raise ValueError("model crashed")
+    
+    pipeline = embed_module.IngestPipeline(FakeCollection("docs"), FailingProvider(), batch_size=2)
+    threads_before = threading.active_count()
+    with pytest.raises(ValueError, match="model crashed"):
+        pipeline.run(items(5))
+    assert threading.active_count() == threads_before
+
+def test_encoding_overlaps_writing(embed_module):
+    """The second batch is encoded while the writer is still busy with the first"""
+    write_started = threading.Event()
+    release_writer = threading.Event()
+    overlapped = []
+    
+    class SlowCollection(FakeCollection):
+        def add(self, **kwargs):
+            write_started.set()
+            release_writer.wait(5)
+            super().add(**kwargs)
+    
+    class WatchingProvider(StubProvider):
+        calls = 0
+        
+        def embed(self, texts):
+            self.calls += 1
+            if self.calls == 2:
+                write_started.wait(5)
+                overlapped.append(not release_writer.is_set())
+                release_writer.set()
+            return super().embed(texts)
+    
+    pipeline = embed_module.IngestPipeline(SlowCollection("docs"), WatchingProvider(), batch_size=2, queue_size=2)
+    assert pipeline.run(items(6)) == 6
+    assert overlapped == [True]
@@ -0,0 +1,87 @@
+"""Tests for length-bucketed batching and window pooling of the local provider"""
+
+import re
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import embedding_providers
+from embedding_providers import LocalEmbeddingProvider
+
+class FakeTokenizer:
+    """One token per word, with character offsets like a fast tokenizer"""
+    
+    def __call__(self, texts, add_special_tokens=False, return_offsets_mapping=True, verbose=False):
+        return {"offset_mapping": [[m.span() for m in re.finditer(r"\S+", text)] for text in texts]}
+
+class FakeSentenceTransformer:
+    """Encodes a text as [words, letters, 1], recording the texts of each call"""
+    
+    max_seq_length = 6
+    
+    def __init__(self, model_name):
+        self.tokenizer = FakeTokenizer()
+        self.calls = []
+    
+    def encode(self, texts, batch_size=32, show_progress_bar=False, convert_to_numpy=True):
+        self.calls.append(list(texts))
+        return np.array([[len(t.split()), len(t.replace(" ", "")), 1.0] for t in texts], dtype=np.float32)
+
+@pytest.fixture
+def make_provider(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.SentenceTransformer = FakeSentenceTransformer
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(embedding_providers, "SENTENCE_TRANSFORMERS_AVAILABLE", True)
+    
+    def make(**kwargs):
+        kwargs.setdefault("batch_size", 2)
+        kwargs.setdefault("window_overlap", 1)
+        return LocalEmbeddingProvider("fake-model", **kwargs)
+    return make
+
+def test_pool_mode_has_its_own_model_name(make_provider):
+    assert make_provider(long_text_mode="pool").model_name == "fake-model+window-pool"
+    assert make_provider(long_text_mode="truncate").model_name == "fake-model"
+    with pytest.raises(ValueError):
+        make_provider(long_text_mode="average")
+
+def test_buckets_are_sorted_by_length_and_results_keep_input_order(make_provider):
+    provider = make_provider()
+    texts = ["a b c d", "a", "a b c", "a b"]
+    embeddings = provider.embed(texts)
+    assert provider.model.calls == [["a", "a b"], ["a b c", "a b c d"]]
+    assert [vector[0] for vector in embeddings] == [4, 1, 3, 2]
+    assert provider.embed([]) == []
+
+def test_long_text_is_pooled_over_overlapping_windows(make_provider):
+    provider = make_provider()
+    # 4 tokens per window (6 minus [CLS]/[SEP]), step 3 with an overlap of 1
+    embedding = np.array(provider.embed(["aa bb cc dd ee ff gg hh"])[0])
+    assert sorted(sum(provider.model.calls, [])) == ["aa bb cc dd", "dd ee ff gg", "gg hh"]
+    assert provider.windowed_texts == 1 and provider.windows == 3
+    
+    # Weighted by window length: the short last window counts half
+    vectors = np.array([[4, 8, 1], [4, 8, 1], [2, 4, 1]], dtype=np.float32)
+    weights = np.array([4, 4, 2], dtype=np.float32)
+    pooled = weights @ vectors / weights.sum()
+    # Direction of the weighted mean, norm of the weighted mean of window norms
+    assert np.allclose(embedding / np.linalg.norm(embedding), pooled / np.linalg.norm(pooled))
+    target_norm = weights @ np.linalg.norm(vectors, axis=1) / weights.sum()
+    assert np.linalg.norm(embedding) == pytest.approx(target_norm, rel=1e-6)
+    assert np.linalg.norm(embedding) > np.linalg.norm(pooled)
+
+def test_pooled_and_short_texts_are_returned_in_input_order(make_provider):
+    provider = make_provider()
+    embeddings = provider.embed(["kort", "aa bb cc dd ee ff g", "to ord"])
+    assert embeddings[0] == [1.0, 4.0, 1.0]
+    assert embeddings[2] == [2.0, 5.0, 1.0]
+    assert len(embeddings) == 3
+
+def test_truncate_mode_encodes_long_text_once(make_provider):
+    provider = make_provider(long_text_mode="truncate")
+    provider.embed(["aa bb cc dd ee ff g"])
+    assert provider.model.calls == [["aa bb cc dd ee ff g"]]
+    assert provider.windowed_texts == 0
@@ -0,0 +1,87 @@
+"""Tests for the NumPy evaluation of Chroma-style where clauses"""
+
+import pytest
+
+from search_requests import parse_search_request, parse_batch_request
+from vector_backends import MetadataFilter, where_problem
+
+METADATAS = [
+    {"team": "G15", "section": "lag", "idx": 0},
+    {"team": "G16", "section": "lag", "idx": 1},
+    {"team": "G15", "section": "nyheter", "idx": 2},
+    {"section": "klubb", "idx": 3},
+    {"team": "A-lag", "section": "lag"}
+]
+
+@pytest.fixture
+def metadata_filter():
+    return MetadataFilter(METADATAS)
+
+def rows(metadata_filter, where):
+    return metadata_filter.rows(where).tolist()
+
+def test_empty_where_matches_everything(metadata_filter):
+    assert rows(metadata_filter, None) == [0, 1, 2, 3, 4]
+    assert rows(metadata_filter, {}) == [0, 1, 2, 3, 4]
+    assert rows(metadata_filter, {"team": {}}) == [0, 1, 2, 3, 4]
+    assert rows(metadata_filter, {"team": {}, "section": "klubb"}) == [3]
+
+def test_equality_and_membership(metadata_filter):
+    assert rows(metadata_filter, {"team": "G15"}) == [0, 2]
+    assert rows(metadata_filter, {"team": {"$eq": "G16"}}) == [1]
+    assert rows(metadata_filter, {"team": {"$in": ["G16", "A-lag"]}}) == [1, 4]
+    assert rows(metadata_filter, {"team": "G99"}) == []
+
+def test_negations_include_rows_without_the_field(metadata_filter):
+    assert rows(metadata_filter, {"team": {"$ne": "G15"}}) == [1, 3, 4]
+    assert rows(metadata_filter, {"team": {"$nin": ["G15", "G16"]}}) == [3, 4]
+
+def test_ordering_skips_missing_values(metadata_filter):
+    assert rows(metadata_filter, {"idx": {"$gte": 2}}) == [2, 3]
+    assert rows(metadata_filter, {"idx": {"$lt": 1}}) == [0]
+    assert rows(metadata_filter, {"team": {"$gt": "G15"}}) == [1]
+
+def test_and_or_and_several_fields(metadata_filter):
+    assert rows(metadata_filter, {"$and": [{"section": "lag"}, {"team": "G15"}]}) == [0]
+    assert rows(metadata_filter, {"$or": [{"section": "klubb"}, {"team": "G16"}]}) == [1, 3]
+    assert rows(metadata_filter, {"section": "lag", "idx": {"$gt": 0}}) == [1]
+
+def test_value_counts_use_postings(metadata_filter):
+    assert metadata_filter.value_counts("section") == {"lag": 3, "nyheter": 1, "klubb": 1}
+
+def test_unsupported_operator(metadata_filter):
+    with pytest.raises(ValueError):
+        metadata_filter.mask({"idx": {"$regex": "1"}})
+
+INVALID_FILTERS = [
+    ["team", "G15"],
+    {"team": {}},
+    {"team": ["G15"]},
+    {"team": {"$eq": ["G15"]}},
+    {"team": {"$ne": {"x": 1}}},
+    {"team": {"$in": []}},
+    {"team": {"$in": "G15"}},
+    {"team": {"$nin": [["G15"]]}},
+    {"team": {"$regex": "G1"}},
+    {"$not": {"team": "G15"}},
+    {"$and": []},
+    {"$or": [{"team": "G15"}, {"team": {}}]},
+    {"team": None}
+]
+
+def test_valid_filters_pass_validation():
+    for where in ({}, {"team": "G15", "idx": {"$gte": 1, "$lt": 3}}, {"team": {"$in": ["G15", "G16"]}},
+                  {"$and": [{"section": "lag"}, {"$or": [{"team": "G15"}, {"idx": 3}]}]}):
+        assert where_problem(where) is None, where
+
+@pytest.mark.parametrize("where", INVALID_FILTERS)
+def test_invalid_filters_are_rejected_before_searching(where):
+    assert where_problem(where)
+    params, error = parse_search_request({"query": "x", "filter_metadata": where})
+    assert params is None
+    assert error["error"] == "Invalid filter_metadata"
+
+def test_invalid_filter_in_a_batch_names_the_query():
+    _, error = parse_batch_request({"queries": [{"query": "a"}, {"query": "b", "filter_metadata": {"team": {}}}]})
+    assert error["error"] == "Invalid filter_metadata"
+    assert error["message"].startswith("queries[1]:")
@@ -0,0 +1,68 @@
+"""Tests for micro-batching of concurrent query embeddings"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chromadb_service import MicroBatcher
+
+class RecordingProvider:
+    """Embeds a text as [len(text)] and records each batch"""
+    
+    model_name = "recording"
+    
+    def __init__(self):
+        self.batches = []
+    
+    def embed(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+@pytest.fixture
+def provider():
+    return RecordingProvider()
+
+def test_each_caller_gets_its_own_slice(provider):
+    batcher = MicroBatcher(provider, window_ms=200, max_batch_size=64)
+    requests = [["a"], ["bb", "ccc"], ["dddd"]]
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(batcher.embed, requests))
+    batcher.close()
+    assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+    # Requests that arrived within the window shared provider calls
+    assert batcher.stats()["batches"] < 3
+    assert sorted(text for batch in provider.batches for text in batch) == ["a", "bb", "ccc", "dddd"]
+
+def test_batches_respect_max_size(provider):
+    batcher = MicroBatcher(provider, window_ms=50, max_batch_size=2)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(batcher.embed, [[str(i)] for i in range(5)]))
+    batcher.close()
+    assert results == [[[1.0]]] * 5
+    assert all(len(batch) <= 2 for batch in provider.batches)
+    assert batcher.stats()["requests"] == 5
+
+def test_provider_errors_reach_every_caller_in_the_batch():
+    class FailingProvider:
+        model_name = "failing"
+        
+        def embed(self, texts):
+            raise RuntimeError("model crashed")
+    
+    batcher = MicroBatcher(FailingProvider(), window_ms=100, max_batch_size=8)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(batcher.embed, [text]) for text in ("a", "b")]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="model crashed"):
+                future.result()
+    # The worker survives a failed batch
+    batcher.provider = RecordingProvider()
+    assert batcher.embed(["abc"]) == [[3.0]]
+    batcher.close()
+
+def test_empty_input_and_closed_batcher(provider):
+    batcher = MicroBatcher(provider, window_ms=1)
+    assert batcher.embed([]) == []
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.embed(["a"])
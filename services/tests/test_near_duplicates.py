@@ -0,0 +1,75 @@
+"""Tests for MinHash/LSH near-duplicate detection"""
+
+from chunk_records import make_chunk, write_chunks
+from chromadb_service import ChromaDBSearchService
+from embedding_providers import StubEmbeddingProvider
+from near_duplicates import find_near_duplicates
+from vector_backends import NumpyVectorBackend
+
+BASE = ("Asker Fotball inviterer alle barn mellom seks og tolv år til fotballskole i sommerferien "
+        "på Føyka stadion med erfarne trenere og lunsj hver dag")
+
+def chunk(chunk_id, content):
+    # All in the news section, so they share a dedup scope
+    chunk_id = f"nyheter_{chunk_id}"
+    return {"chunk_id": chunk_id, "content": content, "url": f"https://example.com/{chunk_id}", "title": chunk_id}
+
+def test_exact_and_near_copies_collapse_into_the_first():
+    chunks = [
+        chunk("a_chunk_0", BASE),
+        chunk("b_chunk_0", BASE),
+        chunk("c_chunk_0", BASE + " og"),
+        chunk("d_chunk_0", "Resultater for A-laget i OBOS-ligaen denne sesongen med tabell og kampoversikt")
+    ]
+    result = find_near_duplicates(chunks, threshold=0.8)
+    assert result.alias_of == {"nyheter_b_chunk_0": "nyheter_a_chunk_0", "nyheter_c_chunk_0": "nyheter_a_chunk_0"}
+    aliases = result.aliases_for("nyheter_a_chunk_0")
+    assert [a["chunk_id"] for a in aliases] == ["nyheter_b_chunk_0", "nyheter_c_chunk_0"]
+    assert aliases[0]["similarity"] == 1.0 and 0.8 <= aliases[1]["similarity"] < 1.0
+    assert not result.is_alias("nyheter_d_chunk_0")
+    
+    report = result.report()
+    assert (report["chunks"], report["stored"], report["collapsed"], report["groups"]) == (4, 2, 2, 1)
+    assert report["duplicate_groups"][0]["chunk_id"] == "nyheter_a_chunk_0"
+
+def test_distinct_and_empty_chunks_are_kept():
+    chunks = [chunk("a_chunk_0", BASE), chunk("b_chunk_0", ""), chunk("c_chunk_0", "")]
+    result = find_near_duplicates(chunks)
+    assert result.alias_of == {}
+    assert result.report()["stored"] == 3
+
+def test_only_chunks_of_the_same_section_and_team_are_grouped():
+    chunks = [
+        make_chunk("lag_utviklingslag_gutter-15_chunk_0", BASE),
+        make_chunk("lag_utviklingslag_g15-sommer_chunk_0", BASE),
+        make_chunk("lag_utviklingslag_gutter-14_chunk_0", BASE),
+        make_chunk("nyheter_fotballskole_chunk_0", BASE)
+    ]
+    result = find_near_duplicates(chunks, threshold=0.8)
+    assert result.alias_of == {"lag_utviklingslag_g15-sommer_chunk_0": "lag_utviklingslag_gutter-15_chunk_0"}
+
+def test_deduplicated_collection_still_answers_filters(embed_module):
+    embed, provider = embed_module, StubEmbeddingProvider(dimension=32)
+    pages = {"gutter-15": BASE, "g15-sommer": BASE, "gutter-14": BASE, "gutter-13": "Kampoppsett for G13 i høst"}
+    for page, content in pages.items():
+        write_chunks(embed.CHUNKS_DIR / f"lag_utviklingslag_{page}.jsonl",
+                     [make_chunk(f"lag_utviklingslag_{page}_chunk_0", content)])
+    
+    dedup = embed.deduplicate_chunks(threshold=0.8)
+    client = embed.setup_chroma_client()
+    collection = embed.store_embeddings_in_chroma(
+        embed.representative_chunks(embed.iter_chunks(), dedup), provider, client
+    )
+    assert collection.count() == 3
+    
+    service = ChromaDBSearchService(collection=NumpyVectorBackend.from_collection(collection),
+                                    embedding_provider=provider)
+    for team in ("G15", "G14", "G13"):
+        results = service.search(BASE, max_results=5, filter_metadata={"team": team})
+        assert [r["metadata"]["team"] for r in results] == [team]
+    
+    # The collapsed G15 page stays citable through its representative
+    representative = service.search(BASE, max_results=1, filter_metadata={"team": "G15"})[0]
+    alias_id = next(iter(dedup.alias_of))
+    assert representative["chunk_id"] == dedup.alias_of[alias_id]
+    assert alias_id in representative["metadata"]["duplicate_ids"]
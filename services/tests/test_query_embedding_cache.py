@@ -0,0 +1,75 @@
+"""Tests for the query-embedding memo cache of the search service"""
+
+from chromadb_service import ChromaDBSearchService, QueryEmbeddingCache
+from embedding_providers import EmbeddingProvider, StubEmbeddingProvider
+from vector_backends import NumpyVectorBackend
+
+class CountingProvider(EmbeddingProvider):
+    """Constant embeddings that record every batch it is asked for"""
+    
+    def __init__(self, model_name="counting-v1"):
+        self.model_name = model_name
+        self.calls = []
+    
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [[1.0, 0.0, 0.0] for _ in texts]
+
+class OtherProvider(CountingProvider):
+    pass
+
+def test_lru_eviction():
+    cache = QueryEmbeddingCache(max_size=2, ttl_seconds=0)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0] and cache.get("c") == [3.0]
+    assert cache.evictions == 1
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("chromadb_service.time.monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(max_size=4, ttl_seconds=10)
+    cache.put("a", [1.0])
+    now[0] = 109.0
+    assert cache.get("a") == [1.0]
+    now[0] = 111.0
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert cache.stats()["size"] == 0
+
+def test_key_includes_provider_class_and_model():
+    cache = QueryEmbeddingCache()
+    key = cache.make_key("  Hvem er  TRENER for G15 ", CountingProvider())
+    assert key == ("CountingProvider", "counting-v1", "hvem er trener for g15")
+    assert cache.make_key("hvem er trener for g15", CountingProvider("counting-v2")) != key
+    assert cache.make_key("hvem er trener for g15", OtherProvider()) != key
+
+def test_hit_and_miss_counters():
+    cache = QueryEmbeddingCache(max_size=4)
+    assert cache.get("a") is None
+    cache.put("a", [1.0])
+    cache.get("a")
+    cache.get("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (2, 1, 0.6667)
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryEmbeddingCache(max_size=0)
+    cache.put("a", [1.0])
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+def test_service_embeds_repeated_queries_once():
+    stub = StubEmbeddingProvider(dimension=3)
+    backend = NumpyVectorBackend(["a_chunk_0"], stub.embed(["treningstider"]), ["treningstider"], [{}])
+    provider = CountingProvider()
+    service = ChromaDBSearchService(collection=backend, embedding_provider=provider)
+    
+    service.search("Treningstider", max_results=1)
+    service.search("  treningstider ", max_results=1)
+    service.search_batch([{"query": "treningstider"}, {"query": "kontakt"}])
+    assert provider.calls == [["Treningstider"], ["kontakt"]]
+    assert service.query_cache.stats()["hits"] == 2
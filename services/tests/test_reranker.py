@@ -0,0 +1,112 @@
+"""Tests for cross-encoder re-ranking and its fallbacks"""
+
+import sys
+import types
+
+import pytest
+
+import reranker
+from reranker import CrossEncoderReranker
+from chromadb_service import ChromaDBSearchService, RERANK_FALLBACKS
+from embedding_providers import StubEmbeddingProvider
+from vector_backends import NumpyVectorBackend
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words occur in the passage"""
+    
+    def __init__(self, model_path, max_length=512):
+        self.pairs = []
+    
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.pairs.extend(pairs)
+        return [sum(word in passage.lower() for word in query.lower().split()) for query, passage in pairs]
+
+RESULTS = [
+    {"chunk_id": "a_chunk_0", "content": "Kontakt klubben"},
+    {"chunk_id": "b_chunk_0", "content": "Treningstider for G15 på Føyka"},
+    {"chunk_id": "c_chunk_0", "content": "G15 trener på Føyka"}
+]
+
+@pytest.fixture
+def cross_encoder(monkeypatch, tmp_path):
+    module = types.ModuleType("sentence_transformers")
+    module.CrossEncoder = FakeCrossEncoder
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(reranker, "CROSS_ENCODER_AVAILABLE", True)
+    return CrossEncoderReranker(str(tmp_path), batch_size=2)
+
+def test_rerank_orders_by_cross_encoder_score(cross_encoder):
+    reranked, info = cross_encoder.rerank("treningstider g15 føyka", RESULTS, budget_ms=10000)
+    assert info["reranked"] and info["cached"] == 0
+    assert [r["chunk_id"] for r in reranked] == ["b_chunk_0", "c_chunk_0", "a_chunk_0"]
+    assert [r["rerank_score"] for r in reranked] == [3.0, 2.0, 0.0]
+    assert "rerank_score" not in RESULTS[0]
+
+def test_scores_are_cached_per_query_and_content(cross_encoder):
+    cross_encoder.rerank("g15", RESULTS, budget_ms=10000)
+    scored = len(cross_encoder.model.pairs)
+    _, info = cross_encoder.rerank("  G15 ", RESULTS, budget_ms=10000)
+    assert info["cached"] == 3
+    assert len(cross_encoder.model.pairs) == scored
+    
+    edited = [dict(RESULTS[0], content="G15 kontakt")] + RESULTS[1:]
+    _, info = cross_encoder.rerank("g15", edited, budget_ms=10000)
+    # Only the edited chunk is scored again
+    assert info["cached"] == 2
+    assert cross_encoder.model.pairs[scored:] == [("g15", "G15 kontakt")]
+
+def test_exhausted_budget_keeps_first_stage_order(cross_encoder):
+    # Estimated at one second per pair, nothing fits in 10 ms
+    cross_encoder.seconds_per_pair = 1.0
+    results, info = cross_encoder.rerank("g15", RESULTS, budget_ms=10)
+    assert results is RESULTS
+    assert info == {"candidates": 3, "cached": 0, "elapsed_ms": info["elapsed_ms"],
+                    "reranked": False, "reason": "budget"}
+    assert cross_encoder.model.pairs == []
+    assert cross_encoder.stats()["budget_fallbacks"] == 1
+
+def test_cached_scores_rerank_without_budget(cross_encoder):
+    cross_encoder.rerank("g15", RESULTS, budget_ms=10000)
+    cross_encoder.seconds_per_pair = 1.0
+    _, info = cross_encoder.rerank("g15", RESULTS, budget_ms=0)
+    assert info["reranked"]
+
+def test_missing_model_directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(reranker, "CROSS_ENCODER_AVAILABLE", True)
+    with pytest.raises(FileNotFoundError):
+        CrossEncoderReranker(str(tmp_path / "missing"))
+
+class FailingReranker:
+    def rerank(self, query, results, budget_ms):
+        raise RuntimeError("model crashed")
+
+@pytest.fixture
+def service():
+    provider = StubEmbeddingProvider(dimension=32)
+    documents = [r["content"] for r in RESULTS]
+    backend = NumpyVectorBackend([r["chunk_id"] for r in RESULTS], provider.embed(documents), documents,
+                                 [{} for _ in RESULTS])
+    service = ChromaDBSearchService(collection=backend, embedding_provider=provider)
+    service.result_cache.max_size = 0
+    return service
+
+@pytest.mark.parametrize("reason", ["unavailable", "error", "budget"])
+def test_service_falls_back_to_first_stage_order(service, cross_encoder, reason):
+    first_stage = [r["chunk_id"] for r in service.search("g15 føyka", max_results=3)]
+    if reason == "error":
+        service.reranker = FailingReranker()
+    elif reason == "budget":
+        cross_encoder.seconds_per_pair = 1.0
+        service.reranker = cross_encoder
+    before = RERANK_FALLBACKS[reason].value
+    
+    results = service.search("g15 føyka", max_results=3, rerank=True, rerank_budget_ms=10)
+    assert [r["chunk_id"] for r in results] == first_stage
+    assert all("rerank_score" not in r for r in results)
+    assert RERANK_FALLBACKS[reason].value == before + 1
+
+def test_service_reranks_within_budget(service, cross_encoder):
+    service.reranker = cross_encoder
+    results = service.search("treningstider g15 føyka", max_results=2, rerank=True, rerank_budget_ms=10000)
+    assert [r["chunk_id"] for r in results] == ["b_chunk_0", "c_chunk_0"]
+    assert results[0]["rerank_score"] == 3.0
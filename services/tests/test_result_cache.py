@@ -0,0 +1,75 @@
+"""Tests for the semantic result cache"""
+
+import pytest
+
+from result_cache import SemanticResultCache, context_key
+
+RESULTS = [{"chunk_id": f"c{i}"} for i in range(5)]
+VECTOR_CONTEXT = context_key("vector", None, False)
+
+@pytest.fixture
+def cache():
+    return SemanticResultCache(max_size=2, ttl_seconds=0, threshold=0.95)
+
+def test_near_identical_query_hits(cache):
+    cache.put([1.0, 0.0, 0.0], VECTOR_CONTEXT, 5, RESULTS)
+    assert cache.get([0.99, 0.05, 0.0], VECTOR_CONTEXT, 5) == RESULTS
+    assert cache.get([0.0, 1.0, 0.0], VECTOR_CONTEXT, 5) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_context_must_match(cache):
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS)
+    assert cache.get([1.0, 0.0], context_key("vector", {"team": "G15"}, False), 5) is None
+    assert cache.get([1.0, 0.0], context_key("hybrid", None, False), 5) is None
+
+def test_larger_entry_answers_smaller_requests(cache):
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS)
+    assert cache.get([1.0, 0.0], VECTOR_CONTEXT, 3) == RESULTS[:3]
+    cache.clear()
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 3, RESULTS[:3])
+    assert cache.get([1.0, 0.0], VECTOR_CONTEXT, 5) is None
+
+def test_short_complete_result_answers_larger_requests(cache):
+    # Two results for max_results=5 means the search found no more
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS[:2])
+    assert cache.get([1.0, 0.0], VECTOR_CONTEXT, 10) == RESULTS[:2]
+
+def test_least_recently_used_is_evicted(cache):
+    cache.put([1.0, 0.0, 0.0], VECTOR_CONTEXT, 5, RESULTS[:1])
+    cache.put([0.0, 1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS[:2])
+    assert cache.get([1.0, 0.0, 0.0], VECTOR_CONTEXT, 5) is not None
+    cache.put([0.0, 0.0, 1.0], VECTOR_CONTEXT, 5, RESULTS[:3])
+    assert cache.get([0.0, 1.0, 0.0], VECTOR_CONTEXT, 5) is None
+    assert cache.get([1.0, 0.0, 0.0], VECTOR_CONTEXT, 5) == RESULTS[:1]
+    assert cache.evictions == 1
+
+def test_expired_entries_are_dropped():
+    cache = SemanticResultCache(max_size=2, ttl_seconds=1e-9, threshold=0.95)
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS)
+    assert cache.get([1.0, 0.0], VECTOR_CONTEXT, 5) is None
+    assert cache.expirations == 1
+
+def test_clear_and_disabled_cache(cache):
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS)
+    cache.clear()
+    assert cache.get([1.0, 0.0], VECTOR_CONTEXT, 5) is None
+    assert cache.stats()["invalidations"] == 1
+    
+    disabled = SemanticResultCache(max_size=0)
+    disabled.put([1.0, 0.0], VECTOR_CONTEXT, 5, RESULTS)
+    assert not disabled.enabled
+    assert disabled.get([1.0, 0.0], VECTOR_CONTEXT, 5) is None
+
+def test_cache_is_off_by_default():
+    assert not SemanticResultCache().enabled
+
+def test_callers_get_copies(cache):
+    results = [{"chunk_id": "c0", "metadata": {"team": "G15"}}]
+    cache.put([1.0, 0.0], VECTOR_CONTEXT, 5, results)
+    results[0]["metadata"]["team"] = "changed after put"
+    
+    first = cache.get([1.0, 0.0], VECTOR_CONTEXT, 5)
+    first[0]["neighbors"] = []
+    first[0]["metadata"]["team"] = "changed after get"
+    first.append({"chunk_id": "c1"})
+    assert cache.get([1.0, 0.0], VECTOR_CONTEXT, 5) == [{"chunk_id": "c0", "metadata": {"team": "G15"}}]
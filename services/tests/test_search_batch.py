@@ -0,0 +1,61 @@
+"""Tests for multi-query retrieval (/search/batch)"""
+
+import pytest
+
+from chromadb_service import ChromaDBSearchService
+from embedding_providers import StubEmbeddingProvider
+from search_requests import parse_batch_request, MAX_BATCH_QUERIES
+from vector_backends import NumpyVectorBackend
+
+DOCUMENTS = {
+    "treningstider_chunk_0": "Treningstider for G15 er tirsdag og torsdag på Føyka",
+    "billetter_chunk_0": "Sesongkort og billetter til A-lagets hjemmekamper",
+    "kontakt_chunk_0": "Kontakt klubbens administrasjon på e-post eller telefon"
+}
+
+@pytest.fixture
+def service():
+    provider = StubEmbeddingProvider(dimension=64)
+    ids = list(DOCUMENTS)
+    backend = NumpyVectorBackend(ids, provider.embed(list(DOCUMENTS.values())), list(DOCUMENTS.values()),
+                                 [{"team": "G15"}, {"team": "A-lag"}, {}])
+    service = ChromaDBSearchService(collection=backend, embedding_provider=provider)
+    service.result_cache.max_size = 0
+    return service
+
+def test_batch_matches_single_searches(service):
+    queries = [
+        {"query": "treningstider G15", "max_results": 2},
+        {"query": "billetter", "max_results": 1, "filter_metadata": {"team": "A-lag"}},
+        {"query": "kontakt", "max_results": 3, "mode": "bm25"}
+    ]
+    batch = service.search_batch(queries)
+    for q, results in zip(queries, batch):
+        single = service.search(q["query"], max_results=q["max_results"], mode=q.get("mode", "vector"),
+                                filter_metadata=q.get("filter_metadata"))
+        assert [r["chunk_id"] for r in results] == [r["chunk_id"] for r in single]
+
+def test_bm25_queries_are_not_embedded(service, monkeypatch):
+    embedded = []
+    embed = service.query_embedder.embed
+    monkeypatch.setattr(service.query_embedder, "embed", lambda texts: embedded.extend(texts) or embed(texts))
+    service.search_batch([{"query": "kontakt", "mode": "bm25"}, {"query": "billetter"}])
+    assert embedded == ["billetter"]
+
+def test_batch_applies_top_level_defaults():
+    queries, error = parse_batch_request({
+        "queries": [{"query": "a"}, {"query": "b", "rerank": False}],
+        "rerank": True
+    })
+    assert error is None
+    assert [q["rerank"] for q in queries] == [True, False]
+
+def test_batch_errors_name_the_query():
+    _, error = parse_batch_request({"queries": [{"query": "a"}, {"query": ""}]})
+    assert error["message"].startswith("queries[1]:")
+    _, error = parse_batch_request({"queries": [{"query": "a"}] * (MAX_BATCH_QUERIES + 1)})
+    assert error["error"] == "Too many queries"
+    _, error = parse_batch_request({"queries": []})
+    assert error["error"] == "Queries are required"
+    _, error = parse_batch_request({"queries": ["a"]})
+    assert error["error"] == "Invalid query"
@@ -0,0 +1,93 @@
+"""Tests for request parsing and response shaping shared by both APIs"""
+
+import gzip
+import json
+
+from search_requests import (
+    parse_search_request, parse_expand_request, search_kwargs, project_results, encode_response,
+    accepts_gzip, GZIP_MIN_BYTES
+)
+
+RESULT = {
+    "chunk_id": "side_chunk_0",
+    "content": "Treningstider for G15",
+    "metadata": {"url": "https://example.com/g15", "team": "G15"},
+    "similarity_score": 0.9,
+    "distance": 0.1
+}
+
+def test_search_defaults():
+    params, error = parse_search_request({"query": "treningstider"})
+    assert error is None
+    assert params["max_results"] == 5
+    assert params["mode"] == "vector"
+    assert params["window"] == 0
+    assert params["timeout_ms"] is None
+    assert search_kwargs(params) == {
+        "query": "treningstider", "max_results": 5, "filter_metadata": None,
+        "mode": "vector", "rerank": None, "rerank_budget_ms": None
+    }
+
+def test_search_rejects_invalid_fields():
+    bodies = [
+        None,
+        {},
+        {"query": "  "},
+        {"query": "x", "max_results": 0},
+        {"query": "x", "max_results": 51},
+        {"query": "x", "mode": "fuzzy"},
+        {"query": "x", "rerank": "yes"},
+        {"query": "x", "rerank_budget_ms": -1},
+        {"query": "x", "window": True},
+        {"query": "x", "fields": ["nope"]},
+        {"query": "x", "include_content": 1},
+        {"query": "x", "timeout_ms": 0},
+        {"query": "x", "timeout_ms": "100"}
+    ]
+    for body in bodies:
+        params, error = parse_search_request(body)
+        assert params is None and error["error"], body
+
+def test_window_implies_neighbors_field():
+    params, _ = parse_search_request({"query": "x", "window": 1, "fields": ["chunk_id"]})
+    assert params["fields"] == ["chunk_id", "neighbors"]
+
+def test_expand_request():
+    params, error = parse_expand_request({"chunk_ids": ["a_chunk_0"]})
+    assert error is None and params["window"] == 1
+    assert parse_expand_request({"chunk_ids": [""]})[1]["error"] == "Chunk ids are required"
+
+def test_project_results():
+    assert project_results([RESULT]) == [RESULT]
+    assert "content" not in project_results([RESULT], include_content=False)[0]
+    assert project_results([RESULT], ["chunk_id", "metadata.url"]) == [
+        {"chunk_id": "side_chunk_0", "metadata": {"url": "https://example.com/g15"}}
+    ]
+    # A full metadata projection wins over single keys
+    projected = project_results([RESULT], ["metadata", "metadata.url", "content"], include_content=False)
+    assert projected == [{"metadata": RESULT["metadata"]}]
+
+def test_accept_encoding_q_values():
+    assert accepts_gzip("gzip, deflate, br")
+    assert accepts_gzip("br;q=1.0, GZIP;q=0.5")
+    assert accepts_gzip("*")
+    assert not accepts_gzip(None)
+    assert not accepts_gzip("br")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("gzip;q=0.000, *")
+    assert not accepts_gzip("*;q=0")
+    assert not accepts_gzip("gzip;q=abc")
+
+def test_large_responses_are_gzipped_only_when_accepted():
+    payload = {"results": [RESULT] * (GZIP_MIN_BYTES // 50 + 1)}
+    body, headers = encode_response(payload, "gzip")
+    assert headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == payload
+    
+    body, headers = encode_response(payload, "gzip;q=0, identity")
+    assert "Content-Encoding" not in headers
+    assert json.loads(body) == payload
+    
+    body, headers = encode_response({"results": []}, "gzip")
+    assert "Content-Encoding" not in headers
+    assert headers["Vary"] == "Accept-Encoding"
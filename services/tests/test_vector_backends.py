@@ -0,0 +1,128 @@
+"""Tests for the exact NumPy vector backend"""
+
+import numpy as np
+import pytest
+
+from fake_chroma import FakeCollection
+from vector_backends import NumpyVectorBackend, QuantizedVectorBackend, create_vector_backend
+
+IDS = ["a", "b", "c", "d"]
+EMBEDDINGS = [
+    [1.0, 0.0, 0.0],
+    [0.8, 0.6, 0.0],
+    [0.0, 3.0, 0.0],
+    [0.0, 0.0, 2.0]
+]
+DOCUMENTS = ["doc a", "doc b", "doc c", "doc d"]
+METADATAS = [
+    {"team": "G15", "chunk_index": 0},
+    {"team": "G15", "chunk_index": 1},
+    {"team": "J14", "chunk_index": 0},
+    {"team": "A-lag", "chunk_index": 2}
+]
+
+@pytest.fixture
+def backend():
+    return NumpyVectorBackend(IDS, EMBEDDINGS, DOCUMENTS, METADATAS, name="test")
+
+def test_query_returns_exact_cosine_top_k(backend):
+    result = backend.query([[2.0, 0.0, 0.0], [0.0, 1.0, 0.1]], n_results=2)
+    assert result["ids"] == [["a", "b"], ["c", "b"]]
+    assert result["documents"][0] == ["doc a", "doc b"]
+    assert result["distances"][0] == pytest.approx([0.0, 0.2])
+    cosine = 1.0 / np.linalg.norm([0.0, 1.0, 0.1])
+    assert result["distances"][1][0] == pytest.approx(1.0 - cosine, abs=1e-6)
+
+def test_query_filters_before_taking_top_k(backend):
+    result = backend.query([[0.0, 1.0, 0.0]], n_results=5, where={"team": "G15"})
+    assert result["ids"] == [["b", "a"]]
+    assert all(m["team"] == "G15" for m in result["metadatas"][0])
+    
+    result = backend.query([[1.0, 0.0, 0.0]], n_results=3,
+                           where={"$or": [{"team": "A-lag"}, {"chunk_index": {"$gte": 1}}]})
+    assert result["ids"] == [["b", "d"]]
+
+def test_query_with_no_matching_rows_returns_empty_lists(backend):
+    result = backend.query([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], where={"team": "ukjent"})
+    assert result["ids"] == [[], []]
+    assert result["distances"] == [[], []]
+
+def test_get_by_ids_where_and_limit(backend):
+    assert backend.get(ids=["c", "missing", "a"])["ids"] == ["c", "a"]
+    assert backend.get(where={"team": "G15"})["ids"] == ["a", "b"]
+    assert backend.get(ids=["d", "b", "a"], where={"team": "G15"})["ids"] == ["b", "a"]
+    assert backend.get(limit=3)["ids"] == ["a", "b", "c"]
+    
+    embeddings = backend.get(ids=["c"], include=["embeddings"])["embeddings"]
+    assert np.allclose(embeddings, [[0.0, 1.0, 0.0]])
+
+def test_snapshot_round_trip_keeps_results_and_manifest(backend, tmp_path):
+    assert not NumpyVectorBackend.has_snapshot(tmp_path)
+    assert NumpyVectorBackend.snapshot_manifest(tmp_path) is None
+    
+    backend.save(tmp_path, synced_at="2026-01-01T00:00:00")
+    assert NumpyVectorBackend.has_snapshot(tmp_path)
+    assert NumpyVectorBackend.snapshot_manifest(tmp_path) == {
+        "name": "test", "synced_at": "2026-01-01T00:00:00", "count": 4
+    }
+    
+    for mmap in (False, True):
+        loaded = NumpyVectorBackend.from_snapshot(tmp_path, mmap=mmap)
+        assert loaded.name == "test"
+        assert loaded.metadatas == METADATAS
+        query = [[0.3, 0.4, 0.5]]
+        assert loaded.query(query, n_results=4) == backend.query(query, n_results=4)
+
+@pytest.fixture
+def random_backend():
+    rng = np.random.default_rng(7)
+    embeddings = rng.normal(size=(300, 32)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(300)]
+    metadatas = [{"team": "G15" if i % 3 == 0 else "J14"} for i in range(300)]
+    return NumpyVectorBackend(ids, embeddings, [""] * 300, metadatas, name="random")
+
+@pytest.mark.parametrize("mode, min_recall", [("int8", 1.0), ("binary", 0.6)])
+def test_quantized_top_k_recalls_exact_results(random_backend, mode, min_recall):
+    quantized = QuantizedVectorBackend.from_backend(random_backend, mode=mode, rescore_factor=10)
+    queries = random_backend.matrix[[3, 42, 198]] + 0.05
+    for where in (None, {"team": "G15"}):
+        exact = random_backend.query(queries, n_results=5, where=where)
+        approximate = quantized.query(queries, n_results=5, where=where)
+        for exact_ids, ids, distances in zip(exact["ids"], approximate["ids"], approximate["distances"]):
+            # Re-scored against the float matrix: best first, with exact distances
+            assert ids[0] == exact_ids[0]
+            assert distances == sorted(distances)
+            assert len(set(ids) & set(exact_ids)) / 5 >= min_recall
+
+def test_int8_codes_are_scored_with_integers(random_backend):
+    quantized = QuantizedVectorBackend.from_backend(random_backend, mode="int8")
+    assert quantized.codes.dtype == np.int8
+    queries = random_backend.matrix[:2]
+    assert quantized.quantize_queries(queries).dtype == np.int8
+    scores = quantized._approximate_scores(queries, np.arange(10))
+    assert scores.dtype == np.int32
+    assert list(scores.argmax(axis=1)) == [0, 1]
+
+def test_binary_codes_pack_sign_bits(backend):
+    quantized = QuantizedVectorBackend.from_backend(backend, mode="binary")
+    assert quantized.codes.shape == (4, 1)
+    assert list(np.unpackbits(quantized.codes[1])[:3]) == [1, 1, 0]
+
+def test_quantized_backend_rescores_from_a_memory_mapped_snapshot(tmp_path):
+    collection = FakeCollection("asker_fotball_docs_v1")
+    collection.add(IDS, EMBEDDINGS, METADATAS, DOCUMENTS)
+    quantized = create_vector_backend(collection, "numpy", snapshot_dir=tmp_path,
+                                      quantization="int8", synced_at="sync-1")
+    # Written from the collection because there was no snapshot to reuse
+    assert NumpyVectorBackend.snapshot_manifest(tmp_path) == {
+        "name": "asker_fotball_docs_v1", "synced_at": "sync-1", "count": 4
+    }
+    report = quantized.memory_report()
+    assert report["float_matrix_memory_mapped"]
+    assert report["resident_bytes"] == report["code_bytes"]
+    assert quantized.query([[0.0, 1.0, 0.0]], n_results=2)["ids"] == [["c", "b"]]
+    
+    exact = create_vector_backend(collection, "numpy", snapshot_dir=tmp_path,
+                                  quantization="none", synced_at="sync-1")
+    assert not isinstance(exact, QuantizedVectorBackend)
+    assert not isinstance(exact.matrix, np.memmap)
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Vector backends for the Asker Fotball search service
+NumpyVectorBackend is an exact, in-process alternative to a Chroma collection
+with the same query/get/count interface
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from chunk_fields import FILTER_FIELDS, chunk_metadata
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Configuration
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "4"))
+NUMPY_SNAPSHOT_DIR = Path(os.getenv(
+    "NUMPY_SNAPSHOT_DIR",
+    str(Path(__file__).parent.parent / "storage" / "index" / "numpy")
+))
+
+logger = logging.getLogger(__name__)
+
+# Operators of a {field: {operator: value}} condition
+FILTER_OPERATORS = ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte")
+
+def where_problem(where: Any) -> Optional[str]:
+    """
+    Why where is not a valid filter for MetadataFilter, or None if it is
+    
+    Values must be strings, numbers or booleans ($in/$nin take a non-empty
+    list of them), operator dicts and $and/$or lists must not be empty.
+    """
+    if not isinstance(where, dict):
+        return "a filter must be an object"
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(condition, list) or not condition:
+                return f"{key} must be a non-empty list of filters"
+            for clause in condition:
+                problem = where_problem(clause)
+                if problem:
+                    return problem
+        elif key.startswith("$"):
+            return f"unsupported filter operator {key}"
+        elif isinstance(condition, dict):
+            if not condition:
+                return f"the condition on {key} has no operator"
+            for operator, value in condition.items():
+                if operator not in FILTER_OPERATORS:
+                    return f"unsupported filter operator {operator}"
+                values = value if operator in ("$in", "$nin") else [value]
+                if operator in ("$in", "$nin") and (not isinstance(value, list) or not value):
+                    return f"{operator} on {key} needs a non-empty list"
+                if not all(isinstance(v, (str, int, float, bool)) for v in values):
+                    return f"{operator} on {key} needs strings, numbers or booleans"
+        elif not isinstance(condition, (str, int, float, bool)):
+            return f"the value of {key} must be a string, number or boolean"
+    return None
+
+class MetadataFilter:
+    """
+    Evaluates Chroma-style where clauses as NumPy boolean masks
+    
+    Supports {field: value}, {field: {"$eq"|"$ne"|"$in"|"$nin"|"$gt"|"$gte"|
+    "$lt"|"$lte": value}} and nested {"$and": [...]}/{"$or": [...]}.
+    Equality and membership are answered from per-field postings (value ->
+    sorted row numbers), so their cost follows the number of matching rows
+    rather than the collection size; ordering comparisons on numbers use a
+    float column. Both are built once per field, or up front via prepare().
+    """
+    
+    def __init__(self, metadatas: List[Dict[str, Any]], fields: Optional[tuple] = None):
+        self.metadatas = metadatas
+        self.size = len(metadatas)
+        self._columns: Dict[str, Any] = {}
+        self._numeric_columns: Dict[str, Any] = {}
+        self._postings: Dict[str, Dict[Any, Any]] = {}
+        if fields:
+            self.prepare(fields)
+    
+    def prepare(self, fields):
+        """Build postings for fields ahead of the first query"""
+        for field in fields:
+            self.postings(field)
+    
+    def column(self, field: str):
+        """Object array of one metadata field, built once per field"""
+        if field not in self._columns:
+            values = np.empty(self.size, dtype=object)
+            values[:] = [metadata.get(field) for metadata in self.metadatas]
+            self._columns[field] = values
+        return self._columns[field]
+    
+    def numeric_column(self, field: str):
+        """Float array of one metadata field; NaN where missing or not a number"""
+        if field not in self._numeric_columns:
+            values = np.full(self.size, np.nan)
+            for row, metadata in enumerate(self.metadatas):
+                value = metadata.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    values[row] = value
+            self._numeric_columns[field] = values
+        return self._numeric_columns[field]
+    
+    def postings(self, field: str) -> Dict[Any, Any]:
+        """Rows per distinct value of one metadata field, built once per field"""
+        if field not in self._postings:
+            rows: Dict[Any, List[int]] = {}
+            for row, metadata in enumerate(self.metadatas):
+                value = metadata.get(field)
+                if value is not None:
+                    rows.setdefault(value, []).append(row)
+            self._postings[field] = {value: np.array(r, dtype=np.int64) for value, r in rows.items()}
+        return self._postings[field]
+    
+    def value_counts(self, field: str) -> Dict[Any, int]:
+        """Number of rows per distinct value of a field"""
+        return {value: len(rows) for value, rows in self.postings(field).items()}
+    
+    def rows(self, where: Optional[Dict[str, Any]]):
+        """Row numbers matching where, ascending"""
+        return np.flatnonzero(self.mask(where))
+    
+    def mask(self, where: Optional[Dict[str, Any]]):
+        """Boolean mask of rows matching where (all rows when where is empty)"""
+        if not where:
+            return np.ones(self.size, dtype=bool)
+        
+        masks = []
+        for key, condition in where.items():
+            if key == "$and":
+                masks.append(np.logical_and.reduce([self.mask(c) for c in condition]))
+            elif key == "$or":
+                masks.append(np.logical_or.reduce([self.mask(c) for c in condition]))
+            elif isinstance(condition, dict):
+                for operator, value in condition.items():
+                    masks.append(self._compare(key, operator, value))
+            else:
+                masks.append(self._compare(key, "$eq", condition))
+        if not masks:
+            # A field with an empty operator dict constrains nothing
+            return np.ones(self.size, dtype=bool)
+        return np.logical_and.reduce(masks) if len(masks) > 1 else masks[0]
+    
+    def _rows_mask(self, field: str, values) -> Any:
+        postings = self.postings(field)
+        result = np.zeros(self.size, dtype=bool)
+        for value in values:
+            rows = postings.get(value)
+            if rows is not None:
+                result[rows] = True
+        return result
+    
+    def _compare(self, field: str, operator: str, value: Any):
+        if operator == "$eq":
+            return self._rows_mask(field, [value])
+        if operator == "$ne":
+            return ~self._rows_mask(field, [value])
+        if operator == "$in":
+            return self._rows_mask(field, value)
+        if operator == "$nin":
+            return ~self._rows_mask(field, value)
+        if operator not in ("$gt", "$gte", "$lt", "$lte"):
+            raise ValueError(f"Unsupported filter operator: {operator}")
+        
+        # Ordering comparisons skip rows where the field is missing
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values = self.numeric_column(field)
+            with np.errstate(invalid="ignore"):
+                return self._order(values, operator, value)
+        column = self.column(field)
+        present = np.array([v is not None for v in column], dtype=bool)
+        result = np.zeros(self.size, dtype=bool)
+        result[present] = self._order(column[present], operator, value)
+        return result
+    
+    @staticmethod
+    def _order(values, operator: str, value: Any):
+        if operator == "$gt":
+            return values > value
+        if operator == "$gte":
+            return values >= value
+        if operator == "$lt":
+            return values < value
+        return values <= value
+
+class NumpyVectorBackend:
+    """
+    Exact cosine search over a pre-normalized embedding matrix
+    
+    One matrix multiply scores a whole query batch; argpartition selects the
+    top k. Distances are cosine distances (1 - cosine similarity).
+    """
+    
+    EMBEDDINGS_FILE = "embeddings.npy"
+    RECORDS_FILE = "records.json"
+    # Small file describing the snapshot, read before deciding to load it
+    MANIFEST_FILE = "snapshot.json"
+    
+    def __init__(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]],
+                 name: str = "numpy", normalized: bool = False):
+        if not NUMPY_AVAILABLE:
+            raise ImportError("NumPy not available")
+        
+        matrix = embeddings if normalized else np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1) if len(ids) else np.zeros((0, 1), dtype=np.float32)
+        if not normalized:
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms
+        self.name = name
+        self.metadata = {"backend": "numpy", "hnsw:space": "cosine"}
+        self.ids = list(ids)
+        self.matrix = matrix
+        self.documents = list(documents)
+        self.metadatas = [dict(m or {}) for m in metadatas]
+        self.row_of = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+        self.filter = MetadataFilter(self.metadatas, fields=FILTER_FIELDS)
+    
+    def count(self) -> int:
+        return len(self.ids)
+    
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None, include: Optional[List[str]] = None,
+              **kwargs) -> Dict[str, List]:
+        """Chroma-compatible query over the in-memory matrix"""
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        query_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        query_norms[query_norms == 0] = 1.0
+        queries = queries / query_norms
+        
+        # Restrict to filtered rows before scoring
+        candidates = None
+        n_rows = len(self.ids)
+        if where:
+            candidates = np.flatnonzero(self.filter.mask(where))
+            n_rows = len(candidates)
+        
+        response = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if n_rows == 0:
+            for key in response:
+                response[key] = [[] for _ in range(len(queries))]
+            return response
+        
+        k = min(n_results, n_rows)
+        for q, (order, similarities) in enumerate(self._top_rows(queries, candidates, k)):
+            rows = candidates[order] if candidates is not None else order
+            response["ids"].append([self.ids[r] for r in rows])
+            response["documents"].append([self.documents[r] for r in rows])
+            response["metadatas"].append([self.metadatas[r] for r in rows])
+            response["distances"].append((1.0 - similarities).tolist())
+        return response
+    
+    def _top_rows(self, queries, candidates, k):
+        """
+        Yield (positions, similarities) of the top k rows per query, best first
+        
+        Positions index into candidates when given, otherwise into the matrix.
+        """
+        matrix = self.matrix if candidates is None else self.matrix[candidates]
+        scores = queries @ matrix.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for q in range(len(queries)):
+            order = top[q][np.argsort(-scores[q, top[q]])]
+            yield order, scores[q, order]
+    
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None, limit: Optional[int] = None, **kwargs) -> Dict[str, List]:
+        """Chroma-compatible lookup by id and/or filter"""
+        if ids is not None:
+            rows = np.array([self.row_of[i] for i in ids if i in self.row_of], dtype=np.int64)
+        else:
+            rows = np.arange(len(self.ids))
+        if where:
+            rows = rows[self.filter.mask(where)[rows]]
+        if limit is not None:
+            rows = rows[:limit]
+        
+        response = {
+            "ids": [self.ids[r] for r in rows],
+            "documents": [self.documents[r] for r in rows],
+            "metadatas": [self.metadatas[r] for r in rows]
+        }
+        if include and "embeddings" in include:
+            response["embeddings"] = self.matrix[rows]
+        return response
+    
+    def memory_bytes(self) -> int:
+        """Resident size of the vector matrix"""
+        return int(self.matrix.nbytes)
+    
+    @classmethod
+    def from_collection(cls, collection) -> "NumpyVectorBackend":
+        """Load every vector, document and metadata entry from a Chroma collection"""
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        backend = cls(data["ids"], data["embeddings"], data["documents"], data["metadatas"],
+                      name=getattr(collection, "name", "numpy"))
+        logger.info(f"✅ Loaded {backend.count()} vectors from Chroma into NumPy backend")
+        return backend
+    
+    @classmethod
+    def from_chunks_dir(cls, chunks_dir: Path, provider, batch_size: int = 100) -> "NumpyVectorBackend":
+        """
+        Embed every chunk in storage/chunks with provider, without Chroma
+        
+        Used for offline benchmarks; metadata is built like scripts/embed.py builds it.
+        """
+        ids, documents, metadatas = [], [], []
+        for jsonl_file in sorted(Path(chunks_dir).glob("*.jsonl")):
+            with open(jsonl_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"⚠️  Error parsing line in {jsonl_file}: {e}")
+                        continue
+                    ids.append(chunk["chunk_id"])
+                    documents.append(chunk["content"])
+                    metadatas.append(chunk_metadata(chunk))
+        
+        embeddings = []
+        for start in range(0, len(documents), batch_size):
+            embeddings.extend(provider.embed(documents[start:start + batch_size]))
+        backend = cls(ids, embeddings, documents, metadatas, name=Path(chunks_dir).name)
+        logger.info(f"✅ Embedded {backend.count()} chunks from {chunks_dir} into NumPy backend")
+        return backend
+    
+    def save(self, directory: Path = NUMPY_SNAPSHOT_DIR, synced_at: Optional[str] = None):
+        """
+        Write a snapshot: normalized matrix as .npy plus ids/documents/metadata
+        
+        The manifest records the collection name, its sync marker and the
+        vector count, so a snapshot is only reused for the exact state it was
+        taken of.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / self.EMBEDDINGS_FILE, self.matrix)
+        with open(directory / self.RECORDS_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "name": self.name,
+                "ids": self.ids,
+                "documents": self.documents,
+                "metadatas": self.metadatas
+            }, f, ensure_ascii=False)
+        # Written last: a snapshot without a matching manifest is never reused
+        with open(directory / self.MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump({"name": self.name, "synced_at": synced_at, "count": self.count()}, f)
+        logger.info(f"💾 Saved NumPy snapshot with {self.count()} vectors to {directory}")
+    
+    @classmethod
+    def from_snapshot(cls, directory: Path = NUMPY_SNAPSHOT_DIR, mmap: bool = False) -> "NumpyVectorBackend":
+        """
+        Load a snapshot written by save()
+        
+        With mmap=True the matrix stays on disk and only touched rows are paged in.
+        """
+        directory = Path(directory)
+        with open(directory / cls.RECORDS_FILE, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        embeddings = np.load(directory / cls.EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+        backend = cls(records["ids"], embeddings, records["documents"], records["metadatas"],
+                      name=records.get("name", "numpy"), normalized=True)
+        logger.info(f"✅ Loaded {backend.count()} vectors from NumPy snapshot {directory}")
+        return backend
+    
+    @classmethod
+    def has_snapshot(cls, directory: Path = NUMPY_SNAPSHOT_DIR) -> bool:
+        directory = Path(directory)
+        return (directory / cls.EMBEDDINGS_FILE).exists() and (directory / cls.RECORDS_FILE).exists()
+    
+    @classmethod
+    def snapshot_manifest(cls, directory: Path = NUMPY_SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+        """{name, synced_at, count} of the snapshot in directory, or None"""
+        try:
+            with open(Path(directory) / cls.MANIFEST_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+# Number of set bits for every byte value, for Hamming distance on packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8) if NUMPY_AVAILABLE else None
+
+class QuantizedVectorBackend(NumpyVectorBackend):
+    """
+    Quantized candidate search with full-precision re-scoring
+    
+    Vectors are kept in RAM as int8 codes (per-dimension scale) or packed
+    sign bits. Candidates are scored on the codes with integer arithmetic,
+    and only the best rescore_factor * k rows per query are re-scored
+    against the float32 matrix. Memory is only saved when that matrix is
+    memory-mapped from a snapshot, which create_vector_backend arranges.
+    """
+    
+    MODES = ("int8", "binary")
+    
+    # Rows per block when expanding int8 codes, bounding temporary memory
+    BLOCK_ROWS = 8192
+    
+    def __init__(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]],
+                 name: str = "numpy", normalized: bool = False, mode: str = "int8",
+                 rescore_factor: int = QUANTIZED_RESCORE_FACTOR):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        super().__init__(ids, embeddings, documents, metadatas, name=name, normalized=normalized)
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+        self.metadata = {"backend": f"numpy-{mode}", "hnsw:space": "cosine"}
+        
+        # Quantized block by block so a memory-mapped matrix is never loaded whole
+        n_rows, dimension = len(self.ids), self.matrix.shape[1]
+        if mode == "int8":
+            max_abs = np.zeros(dimension, dtype=np.float32)
+            for start in range(0, n_rows, self.BLOCK_ROWS):
+                block = np.abs(self.matrix[start:start + self.BLOCK_ROWS])
+                max_abs = np.maximum(max_abs, block.max(axis=0))
+            self.scale = np.where(max_abs > 0, max_abs / 127.0, 1.0).astype(np.float32)
+            self.codes = np.empty((n_rows, dimension), dtype=np.int8)
+            for start in range(0, n_rows, self.BLOCK_ROWS):
+                block = self.matrix[start:start + self.BLOCK_ROWS] / self.scale
+                self.codes[start:start + len(block)] = np.clip(np.rint(block), -127, 127)
+        else:
+            self.scale = None
+            self.codes = np.empty((n_rows, (dimension + 7) // 8), dtype=np.uint8)
+            for start in range(0, n_rows, self.BLOCK_ROWS):
+                block = np.packbits(self.matrix[start:start + self.BLOCK_ROWS] > 0, axis=1)
+                self.codes[start:start + len(block)] = block
+    
+    @classmethod
+    def from_backend(cls, backend: NumpyVectorBackend, mode: str = "int8",
+                     rescore_factor: int = QUANTIZED_RESCORE_FACTOR) -> "QuantizedVectorBackend":
+        """Quantize an existing exact backend, sharing its (possibly memory-mapped) matrix"""
+        return cls(backend.ids, backend.matrix, backend.documents, backend.metadatas,
+                   name=backend.name, normalized=True, mode=mode, rescore_factor=rescore_factor)
+    
+    def _approximate_scores(self, queries, rows):
+        """Score queries against the codes of rows (higher is better)"""
+        if self.mode == "binary":
+            query_codes = np.packbits(queries > 0, axis=1)
+            codes = self.codes[rows]
+            # Negative Hamming distance so that larger means closer
+            return -np.stack([
+                _POPCOUNT[np.bitwise_xor(codes, query_code)].sum(axis=1, dtype=np.int32)
+                for query_code in query_codes
+            ])
+        
+        # Queries are folded with the per-dimension scale and quantized too; a
+        # per-query factor does not change the ranking, so it is dropped
+        query_codes = self.quantize_queries(queries).astype(np.int32)
+        scores = np.empty((len(queries), len(rows)), dtype=np.int32)
+        for start in range(0, len(rows), self.BLOCK_ROWS):
+            block = self.codes[rows[start:start + self.BLOCK_ROWS]].astype(np.int32)
+            scores[:, start:start + len(block)] = query_codes @ block.T
+        return scores
+    
+    def quantize_queries(self, queries):
+        """int8 codes of queries * scale, scaled per query to the full int8 range"""
+        scaled = queries * self.scale
+        max_abs = np.abs(scaled).max(axis=1, keepdims=True)
+        max_abs[max_abs == 0] = 1.0
+        return np.clip(np.rint(scaled * (127.0 / max_abs)), -127, 127).astype(np.int8)
+    
+    def _top_rows(self, queries, candidates, k):
+        rows = np.arange(len(self.ids)) if candidates is None else candidates
+        n_rescore = min(len(rows), k * self.rescore_factor)
+        approximate = self._approximate_scores(queries, rows)
+        shortlist = np.argpartition(-approximate, n_rescore - 1, axis=1)[:, :n_rescore]
+        
+        for q in range(len(queries)):
+            positions = np.sort(shortlist[q])
+            exact = np.asarray(self.matrix[rows[positions]], dtype=np.float32) @ queries[q]
+            best = np.argsort(-exact)[:k]
+            yield positions[best], exact[best]
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Resident bytes compared with an in-memory float32 matrix
+        
+        The codes only save memory when the float matrix used for re-scoring
+        is memory-mapped from a snapshot; otherwise it stays resident next to
+        them and the codes are extra.
+        """
+        float_bytes = len(self.ids) * self.matrix.shape[1] * 4
+        code_bytes = int(self.codes.nbytes) + (int(self.scale.nbytes) if self.scale is not None else 0)
+        memory_mapped = isinstance(self.matrix, np.memmap)
+        resident_bytes = code_bytes + (0 if memory_mapped else int(self.matrix.nbytes))
+        return {
+            "mode": self.mode,
+            "float32_bytes": float_bytes,
+            "code_bytes": code_bytes,
+            "resident_bytes": resident_bytes,
+            "bytes_saved": float_bytes - resident_bytes,
+            "compression_ratio": round(float_bytes / resident_bytes, 2) if resident_bytes else 0.0,
+            "float_matrix_memory_mapped": memory_mapped
+        }
+    
+    def memory_bytes(self) -> int:
+        """Resident size of the codes plus the float matrix unless it is memory-mapped"""
+        return self.memory_report()["resident_bytes"]
+
+def snapshot_problem(manifest: Optional[Dict[str, Any]], collection, synced_at: Optional[str]) -> Optional[str]:
+    """Why a snapshot cannot stand in for the collection, or None if it matches"""
+    if manifest is None:
+        return "it has no manifest"
+    name = getattr(collection, "name", None)
+    if manifest.get("name") != name:
+        return f"it is of {manifest.get('name')}, not {name}"
+    if manifest.get("synced_at") != synced_at:
+        return f"it was taken at sync {manifest.get('synced_at')}, the collection is at {synced_at}"
+    if manifest.get("count") != collection.count():
+        return f"it has {manifest.get('count')} vectors, the collection {collection.count()}"
+    return None
+
+def create_vector_backend(collection, backend: str = VECTOR_BACKEND, snapshot_dir: Path = NUMPY_SNAPSHOT_DIR,
+                          quantization: str = VECTOR_QUANTIZATION, synced_at: Optional[str] = None):
+    """
+    Wrap a Chroma collection in the configured vector backend
+    
+    "chroma" returns the collection itself; "numpy" loads an exact in-memory
+    index from the snapshot directory if it was taken of this collection at
+    its current sync marker (synced_at) and size, otherwise from the collection.
+    With quantization "int8" or "binary" the NumPy index keeps only codes in
+    RAM and re-scores from the memory-mapped snapshot matrix; a missing or
+    stale snapshot is rewritten from the collection first, since a float
+    matrix kept in RAM next to the codes would cost more than the exact index.
+    """
+    if backend == "chroma":
+        return collection
+    if backend == "numpy":
+        quantized = quantization in QuantizedVectorBackend.MODES
+        exact = None
+        if NumpyVectorBackend.has_snapshot(snapshot_dir):
+            # A snapshot of another version, or taken before an in-place sync, would serve stale vectors
+            problem = snapshot_problem(NumpyVectorBackend.snapshot_manifest(snapshot_dir), collection, synced_at)
+            if problem:
+                logger.warning(f"⚠️  Not using the NumPy snapshot: {problem}; loading from the collection")
+            else:
+                exact = NumpyVectorBackend.from_snapshot(snapshot_dir, mmap=quantized)
+        if exact is None:
+            exact = NumpyVectorBackend.from_collection(collection)
+            if quantized:
+                exact.save(snapshot_dir, synced_at=synced_at)
+                exact = NumpyVectorBackend.from_snapshot(snapshot_dir, mmap=True)
+        if not quantized:
+            return exact
+        quantized_backend = QuantizedVectorBackend.from_backend(exact, mode=quantization)
+        logger.info(f"✅ Quantized vectors ({quantization}): {quantized_backend.memory_report()}")
+        return quantized_backend
+    raise ValueError(f"Unknown vector backend: {backend}")